@@ -1,15 +1,33 @@
-from flask import Flask, request, jsonify, session, make_response
+from flask import Flask, request, jsonify, make_response, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
 import requests
 import json
+import asyncio
 import re
-import io
 import os
-import sys
+import time
+import uuid
+import queue
+import threading
 from dotenv import load_dotenv
-from PyPDF2 import PdfReader
+from jobs import JobManager, create_job_store, JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED
+from sandbox import SandboxPool, run_code, precheck_generated
+from code_cache import CodeCache, make_cache_key
+from llm_client import LLMClient
+from session_store import create_session_store
+from chat_history import ChatHistory
+from datasets import save_upload, ingest_csv, cleanup_uploads
+from scenarios import ScenarioRunner, expand_grid
+from results import ResultFrame, ARROW_MIMETYPE, DEFAULT_PAGE_SIZE, gzip_json
+from context_builder import ContextBuilder, summarize_results, format_user_data, fingerprint, memoized
+from documents import PdfIndexer
+from response_cache import ResponseCache
+from code_repair import error_signature, build_repair_prompt, sanitize_code, traceback_tail, unaccepted_parameters
+from metrics import registry as metrics_registry, REQUEST_SECONDS, STAGE_SECONDS, CACHE_EVENTS, TEMPLATE_ROUTES
+from metrics import record_llm_usage, record_solve, parse_gurobi_log
+from solve_control import SOLVE_TIERS, solve_budget as tier_budget
+from contextlib import contextmanager
 
 # Import gurobipy if installed. This will not run if Gurobi is not set up correctly.
 try:
@@ -22,18 +40,30 @@ except ImportError:
     Model = None
     print("Warning: Gurobipy not found. Optimization functions will be disabled.")
 
+if gp is not None:
+    from samplegurobi import REQUIRED_COLUMNS as PRODUCTION_COLUMNS
+    from incremental import ProductionModelCache
+    from solve_control import SolveController
+    from templates import TemplateRouter, profile_dataset
+else:
+    PRODUCTION_COLUMNS = None
+    ProductionModelCache = None
+    SolveController = None
+    TemplateRouter = None
+
 # Load environment variables from .env file
 load_dotenv()
 
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your_strong_secret_key_here'
-CORS(app, origins=[
+CORS_ORIGINS = [
     "http://localhost:5173",
     "http://127.0.0.1:5173",
     "http://localhost:5174",
     "http://127.0.0.1:5174"
-], supports_credentials=True)
+]
+CORS(app, origins=CORS_ORIGINS, supports_credentials=True)
 
 # Handle preflight OPTIONS requests
 
@@ -43,41 +73,259 @@ CONFIG = {
     "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "YOUR_GEMINI_API_KEY"),
     "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "YOUR_OPENAI_API_KEY"),
     "MAX_RETRIES": 3,
-    "TIMEOUT": 60
+    "TIMEOUT": 60,
+    "GEMINI_BASE_URL": os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com"),
+    "OPENAI_BASE_URL": os.getenv("OPENAI_BASE_URL", "https://api.openai.com"),
+    "LLM_POOL_SIZE": int(os.getenv("LLM_POOL_SIZE", 20)),
+    "LLM_LIMITS": {
+        "gemini": {"rate": float(os.getenv("GEMINI_RPS", 5)), "max_concurrency": int(os.getenv("GEMINI_MAX_CONCURRENCY", 8))},
+        "openai": {"rate": float(os.getenv("OPENAI_RPS", 5)), "max_concurrency": int(os.getenv("OPENAI_MAX_CONCURRENCY", 8))}
+    },
+    "JOB_WORKERS": int(os.getenv("JOB_WORKERS", 4)),
+    "MAX_CONCURRENT_SOLVES": int(os.getenv("MAX_CONCURRENT_SOLVES", 2)),
+    "JOB_TTL": int(os.getenv("JOB_TTL", 24 * 3600)),  # seconds job records are kept in Redis after their last update
+    "SANDBOX_WORKERS": int(os.getenv("SANDBOX_WORKERS", 2)),
+    "SANDBOX_TIMEOUT": int(os.getenv("SANDBOX_TIMEOUT", 300)),
+    "SANDBOX_MEMORY_LIMIT_MB": int(os.getenv("SANDBOX_MEMORY_LIMIT_MB", 2048)),
+    "CODE_CACHE_PATH": os.getenv("CODE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "code_cache.sqlite3")),
+    "CODE_CACHE_MAX_ENTRIES": int(os.getenv("CODE_CACHE_MAX_ENTRIES", 1000)),
+    "CODE_CACHE_TTL": int(os.getenv("CODE_CACHE_TTL", 7 * 24 * 3600)),
+    "SESSION_BACKEND": os.getenv("SESSION_BACKEND", "memory"),
+    "REDIS_URL": os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+    # Signs what is stored in Redis; only processes holding it can write sessions and jobs the app unpickles
+    "REDIS_SIGNING_KEY": os.getenv("REDIS_SIGNING_KEY"),
+    "SESSION_TTL": int(os.getenv("SESSION_TTL", 3600)),
+    "SESSION_MAX_COUNT": int(os.getenv("SESSION_MAX_COUNT", 1000)),
+    "SESSION_MEMORY_BUDGET_MB": int(os.getenv("SESSION_MEMORY_BUDGET_MB", 1024)),
+    "UPLOAD_DIR": os.getenv("UPLOAD_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")),
+    "UPLOAD_MAX_AGE": int(os.getenv("UPLOAD_MAX_AGE", 24 * 3600)),
+    "UPLOAD_CHUNK_ROWS": int(os.getenv("UPLOAD_CHUNK_ROWS", 50000)),
+    "WHAT_IF_MAX_MODELS": int(os.getenv("WHAT_IF_MAX_MODELS", 16)),
+    "SWEEP_WORKERS": int(os.getenv("SWEEP_WORKERS", os.cpu_count() or 2)),
+    "RESULT_INLINE_ROWS": int(os.getenv("RESULT_INLINE_ROWS", 1000)),
+    "RESULT_PREVIEW_ROWS": int(os.getenv("RESULT_PREVIEW_ROWS", 20)),
+    "GZIP_MIN_BYTES": int(os.getenv("GZIP_MIN_BYTES", 1024)),
+    "CONTEXT_TOKEN_BUDGET": int(os.getenv("CONTEXT_TOKEN_BUDGET", 6000)),
+    "PDF_WORKERS": int(os.getenv("PDF_WORKERS", 2)),
+    "RESPONSE_CACHE_MAX_ENTRIES": int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2000)),
+    "RESPONSE_CACHE_TTL": int(os.getenv("RESPONSE_CACHE_TTL", 3600)),
+    "RESPONSE_CACHE_SIMILARITY": float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.85)),
+    "MAX_REPAIR_ATTEMPTS": int(os.getenv("MAX_REPAIR_ATTEMPTS", 3)),
+    # Time limit (seconds) and relative MIP gap of every solve, chosen per request with "tier"
+    # (solve_control.SOLVE_TIERS, overridden with e.g. INTERACTIVE_TIME_LIMIT or BATCH_MIP_GAP)
+    "SOLVE_TIERS": {
+        tier: {"time_limit": float(os.getenv(f"{tier.upper()}_TIME_LIMIT", budget["time_limit"])),
+               "mip_gap": float(os.getenv(f"{tier.upper()}_MIP_GAP", budget["mip_gap"]))}
+        for tier, budget in SOLVE_TIERS.items()
+    },
+    "INCUMBENT_MIN_INTERVAL": float(os.getenv("INCUMBENT_MIN_INTERVAL", 0.5)),
+    "TEMPLATE_ROUTING": os.getenv("TEMPLATE_ROUTING", "true").lower() in ("1", "true", "yes"),
+    "CHAT_HISTORY_MAX_CHARS": int(os.getenv("CHAT_HISTORY_MAX_CHARS", 20000)),
+    "CHAT_HISTORY_KEEP_RECENT": int(os.getenv("CHAT_HISTORY_KEEP_RECENT", 20)),
+    "TIMING_HEADERS": os.getenv("TIMING_HEADERS", "false").lower() in ("1", "true", "yes"),
+    # ASGI serving mode (asgi.py): threads for offloaded CPU-bound work and for the routes still served by Flask
+    "ASGI_EXECUTOR_THREADS": int(os.getenv("ASGI_EXECUTOR_THREADS", 8)),
+    "ASGI_WSGI_THREADS": int(os.getenv("ASGI_WSGI_THREADS", 16))
 }
 
-# --- Session Management (Simplified for this example) ---
-# In a real application, you'd use a proper session management system
-# e.g., Flask-Session, a database, or Redis to store per-user state.
-# For simplicity, we'll use a dictionary, which is NOT suitable for production
-# as it's not scalable and not persistent across server restarts.
-user_sessions = {} # {session_id: {"user_data": {}, "uploaded_data": None, "gemini_generated_code": None, ...}}
+job_manager = JobManager(
+    max_workers=CONFIG["JOB_WORKERS"],
+    max_concurrent_solves=CONFIG["MAX_CONCURRENT_SOLVES"],
+    store=create_job_store(backend=CONFIG["SESSION_BACKEND"], redis_url=CONFIG["REDIS_URL"], ttl=CONFIG["JOB_TTL"],
+                           signing_key=CONFIG["REDIS_SIGNING_KEY"])
+)
+sandbox_pool = SandboxPool(
+    workers=CONFIG["SANDBOX_WORKERS"],
+    timeout=CONFIG["SANDBOX_TIMEOUT"],
+    memory_limit_mb=CONFIG["SANDBOX_MEMORY_LIMIT_MB"]
+)
+llm_client = LLMClient(
+    max_retries=CONFIG["MAX_RETRIES"],
+    timeout=CONFIG["TIMEOUT"],
+    pool_size=CONFIG["LLM_POOL_SIZE"],
+    providers=CONFIG["LLM_LIMITS"]
+)
+async_llm_client = None  # AsyncLLMClient while asgi.py serves; the *_async helpers fall back to llm_client
+scenario_runner = ScenarioRunner(workers=CONFIG["SWEEP_WORKERS"])
+production_models = ProductionModelCache(max_models=CONFIG["WHAT_IF_MAX_MODELS"]) if ProductionModelCache else None
+template_router = TemplateRouter() if TemplateRouter else None
+code_cache = CodeCache(CONFIG["CODE_CACHE_PATH"], max_entries=CONFIG["CODE_CACHE_MAX_ENTRIES"], ttl=CONFIG["CODE_CACHE_TTL"])
+context_builder = ContextBuilder(budget=CONFIG["CONTEXT_TOKEN_BUDGET"])
+pdf_indexer = PdfIndexer(workers=CONFIG["PDF_WORKERS"])
+response_cache = ResponseCache(
+    max_entries=CONFIG["RESPONSE_CACHE_MAX_ENTRIES"],
+    ttl=CONFIG["RESPONSE_CACHE_TTL"],
+    similarity_threshold=CONFIG["RESPONSE_CACHE_SIMILARITY"]
+)
+
+# --- Session Management ---
+# Per-user state lives in session_store: an in-memory LRU store with TTL and a
+# memory budget by default, or Redis (SESSION_BACKEND=redis) so several server
+# processes can share sessions. Routes that change a session call
+# mark_session_changed() with the keys they set; when the request finishes,
+# those keys and the new chat messages are merged into the stored session
+# with merge_session_changes(), which reloads it first so changes made
+# meanwhile by other requests or background jobs are kept. Read-only routes
+# never write. Code running after the request (background jobs, streamed
+# responses) calls merge_session_changes() itself.
+session_store = create_session_store(
+    backend=CONFIG["SESSION_BACKEND"],
+    redis_url=CONFIG["REDIS_URL"],
+    ttl=CONFIG["SESSION_TTL"],
+    max_sessions=CONFIG["SESSION_MAX_COUNT"],
+    memory_budget_mb=CONFIG["SESSION_MEMORY_BUDGET_MB"],
+    signing_key=CONFIG["REDIS_SIGNING_KEY"]
+)
+
+def new_session_data():
+    return {
+        "user_data": {},
+        "uploaded_data": None,
+        "gemini_generated_code": None,
+        "problem_type": None,
+        "optimization_results": None,
+        "result_frame": None,
+        "results_key": None,
+        "response_scope": uuid.uuid4().hex,  # keeps cached follow-up answers to this session
+        "ai_explanation": None,
+        "questions_completed": False,
+        "chat_history": new_chat_history([{"role": "bot", "content": "Hello! I'm your AI Business Optimization Assistant. Let's start by understanding your business."}])
+    }
+
+def new_chat_history(messages=()):
+    return ChatHistory(max_chars=CONFIG["CHAT_HISTORY_MAX_CHARS"], keep_recent=CONFIG["CHAT_HISTORY_KEEP_RECENT"], messages=messages)
 
 def get_session_data(session_id):
-    if session_id not in user_sessions:
-        user_sessions[session_id] = {
-            "user_data": {},
-            "uploaded_data": None,
-            "gemini_generated_code": None,
-            "problem_type": None,
-            "optimization_results": None,
-            "ai_explanation": None,
-            "questions_completed": False,
-            "chat_history": [{"role": "bot", "content": "Hello! I'm your AI Business Optimization Assistant. Let's start by understanding your business."}]
-        }
-    return user_sessions[session_id]
+    session_data = session_store.get(session_id)
+    if session_data is None:
+        session_data = new_session_data()
+        session_store.set(session_id, session_data)
+    elif isinstance(session_data["chat_history"], list):
+        session_data["chat_history"] = new_chat_history(session_data["chat_history"])  # stored before chat cursors
+    if session_data["uploaded_data"] is not None:
+        session_data["uploaded_data"].touch()  # keeps the file of an active session from cleanup_uploads
+    if has_request_context():
+        if "loaded_sessions" not in g:
+            g.loaded_sessions = {}
+        g.loaded_sessions[session_id] = (session_data, session_data["chat_history"].cursor)
+    return session_data
+
+def save_session_data(session_id, session_data):
+    session_store.set(session_id, session_data)
+
+def mark_session_changed(session_id, keys=()):
+    """Saves ``keys`` and the new chat messages of the session loaded in this request when the request finishes."""
+    if "changed_sessions" not in g:
+        g.changed_sessions = {}
+    g.changed_sessions.setdefault(session_id, set()).update(keys)
+
+def merge_session_changes(session_id, working, keys=(), chat_cursor=0):
+    """
+    Saves what background work changed on ``working``, its copy of a session.
+
+    The session is reloaded and only ``keys`` and the chat messages
+    ``working`` gained after ``chat_cursor`` are copied onto it, so a
+    concurrent request's changes are not overwritten. Returns the saved session.
+    """
+    current = get_session_data(session_id)
+    if current is not working:  # the memory store returns the same object
+        for key in keys:
+            current[key] = working.get(key)
+        for message in working["chat_history"].added_since(chat_cursor):
+            current["chat_history"].append(message)
+    save_session_data(session_id, current)
+    return current
+
+# --- Chat updates ---
+# Responses carry the chat messages after the client's "chat_cursor" (query
+# string, form field or JSON body) instead of the whole history; see
+# chat_history.py. Without a cursor, or when the cursor predates a compaction,
+# the whole history is sent with chat_reset set.
+
+def parse_chat_cursor(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def request_chat_cursor():
+    value = request.args.get('chat_cursor', request.form.get('chat_cursor'))
+    if value is None:
+        value = (request.get_json(silent=True) or {}).get('chat_cursor')
+    return parse_chat_cursor(value)
+
+def chat_update(session, cursor=None):
+    """chat_history (new messages), chat_cursor and chat_reset fields for a response body."""
+    messages, reset = session["chat_history"].since(cursor)
+    return {"chat_history": messages, "chat_cursor": session["chat_history"].cursor, "chat_reset": reset}
+
+@app.after_request
+def save_changed_sessions(response):
+    loaded_sessions = g.pop("loaded_sessions", {})
+    for session_id, keys in g.pop("changed_sessions", {}).items():
+        if session_id in loaded_sessions:
+            session, chat_cursor = loaded_sessions[session_id]
+            merge_session_changes(session_id, session, sorted(keys), chat_cursor)
+    return response
+
+# --- Metrics ---
+# Every request and pipeline stage is timed into histograms exposed on
+# /metrics (see metrics.py). With TIMING_HEADERS enabled, responses also carry
+# a Server-Timing header listing the stages that ran during the request.
+
+@app.before_request
+def start_request_timer():
+    g.request_started_at = time.perf_counter()
+    g.stage_timings = []
+
+@app.after_request
+def record_request_metrics(response):
+    # Registered after save_changed_sessions, so it runs first (Flask calls after_request hooks in reverse)
+    started_at = g.pop("request_started_at", None)
+    if started_at is None:
+        return response
+    duration = time.perf_counter() - started_at
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    REQUEST_SECONDS.observe(duration, method=request.method, route=route, status=response.status_code)
+    if CONFIG["TIMING_HEADERS"]:
+        timings = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in g.pop("stage_timings", [])]
+        response.headers["Server-Timing"] = ", ".join(timings + [f"total;dur={duration * 1000:.1f}"])
+    return response
+
+@contextmanager
+def timed_stage(stage):
+    """Times a pipeline stage into the stage histogram and, inside a request, its Server-Timing header."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_SECONDS.observe(duration, stage=stage)
+        if has_request_context() and "stage_timings" in g:
+            g.stage_timings.append((stage, duration))
+
+def collect_cache_metrics():
+    code_stats = code_cache.stats()
+    for event in ("hits", "misses", "repair_hits"):
+        CACHE_EVENTS.set(code_stats[event], cache="code", event=event)
+    response_stats = response_cache.stats()
+    for event in ("hits", "similar_hits", "misses", "evictions", "expirations", "invalidations"):
+        CACHE_EVENTS.set(response_stats[event], cache="response", event=event)
+
+metrics_registry.add_collector(collect_cache_metrics)
 
 # --- AI INTEGRATION (Modified for Flask) ---
 # You can switch between Gemini and OpenAI by uncommenting the relevant parts
 # and ensuring the API key is set.
+# All providers share llm_client: a pooled, keep-alive HTTP session with
+# retries (CONFIG["MAX_RETRIES"]), rate limiting and concurrency caps.
 
-# Helper function for Gemini (as per your original code)
-def get_gemini_response(prompt, context=""):
+def _gemini_request(prompt, context="", stream=False):
     api_key = CONFIG["GEMINI_API_KEY"]
-    if not api_key or api_key == "YOUR_GEMINI_API_KEY":
-        return {"error": "Please configure your Gemini API key."}
-
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
+    if stream:
+        url = f"{CONFIG['GEMINI_BASE_URL']}/v1beta/models/gemini-2.0-flash:streamGenerateContent?alt=sse&key={api_key}"
+    else:
+        url = f"{CONFIG['GEMINI_BASE_URL']}/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
     headers = {'Content-Type': 'application/json'}
     full_prompt = f"""
     You are an expert optimization consultant and Python programmer specializing in operations research and Gurobi optimization.
@@ -95,35 +343,23 @@ def get_gemini_response(prompt, context=""):
             }]
         }]
     }
-    try:
-        response = requests.post(url, headers=headers, json=data, timeout=CONFIG["TIMEOUT"])
-        response.raise_for_status() # Raise an exception for HTTP errors
-        result = response.json()
-        if 'candidates' in result and len(result['candidates']) > 0:
-            return {"success": result['candidates'][0]['content']['parts'][0]['text']}
-        else:
-            return {"error": "I couldn't generate a response. Please try again."}
-    except requests.exceptions.Timeout:
-        return {"error": "API request timed out. Please try again."}
-    except requests.exceptions.RequestException as e:
-        return {"error": f"API Error: {e} - {response.text if 'response' in locals() else ''}"}
-    except Exception as e:
-        return {"error": f"An unexpected error occurred: {str(e)}"}
+    return url, data, headers
 
-# Helper function for OpenAI (New)
-def get_openai_response(prompt, context="", model="gpt-3.5-turbo"):
-    api_key = CONFIG["OPENAI_API_KEY"]
-    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
-        return {"error": "Please configure your OpenAI API key."}
+def _parse_gemini_response(result):
+    record_llm_usage("gemini", result)
+    if 'candidates' in result and len(result['candidates']) > 0:
+        return {"success": result['candidates'][0]['content']['parts'][0]['text']}
+    else:
+        return {"error": "I couldn't generate a response. Please try again."}
 
-    # Using the official OpenAI Python client is recommended for robust error handling and features.
-    # For a simple requests-based example:
-    url = "https://api.openai.com/v1/chat/completions"
+def _openai_request(prompt, context="", model="gpt-3.5-turbo", stream=False):
+    api_key = CONFIG["OPENAI_API_KEY"]
+    url = f"{CONFIG['OPENAI_BASE_URL']}/v1/chat/completions"
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {api_key}"
     }
-    
+
     messages = [
         {"role": "system", "content": "You are an expert optimization consultant and Python programmer specializing in operations research and Gurobi optimization."},
         {"role": "user", "content": f"Context: {context}\n\nUser Request: {prompt}\n\nPlease provide detailed, actionable responses. Use markdown formatting for clarity."}
@@ -135,21 +371,67 @@ def get_openai_response(prompt, context="", model="gpt-3.5-turbo"):
         "max_tokens": 1500, # Adjust as needed
         "temperature": 0.7
     }
+    if stream:
+        data["stream"] = True
+        data["stream_options"] = {"include_usage": True}  # token counts in the final event
+    return url, data, headers
+
+def _parse_openai_response(result):
+    record_llm_usage("openai", result)
+    if 'choices' in result and len(result['choices']) > 0:
+        return {"success": result['choices'][0]['message']['content']}
+    else:
+        return {"error": "I couldn't generate a response from OpenAI. Please try again."}
+
+def _request_error(e, label="API"):
+    if isinstance(e, requests.exceptions.Timeout):
+        return {"error": f"{label} request timed out. Please try again."}
+    if isinstance(e, requests.exceptions.RequestException):
+        response = getattr(e, "response", None)
+        return {"error": f"{label} Error: {e} - {response.text if response is not None else ''}"}
+    return {"error": f"An unexpected error occurred: {str(e)}"}
+
+# Helper function for Gemini (as per your original code)
+def get_gemini_response(prompt, context=""):
+    api_key = CONFIG["GEMINI_API_KEY"]
+    if not api_key or api_key == "YOUR_GEMINI_API_KEY":
+        return {"error": "Please configure your Gemini API key."}
+    url, data, headers = _gemini_request(prompt, context)
+    try:
+        return _parse_gemini_response(llm_client.post_json("gemini", url, data, headers))
+    except Exception as e:
+        return _request_error(e)
 
+async def get_gemini_response_async(prompt, context=""):
+    api_key = CONFIG["GEMINI_API_KEY"]
+    if not api_key or api_key == "YOUR_GEMINI_API_KEY":
+        return {"error": "Please configure your Gemini API key."}
+    url, data, headers = _gemini_request(prompt, context)
     try:
-        response = requests.post(url, headers=headers, json=data, timeout=CONFIG["TIMEOUT"])
-        response.raise_for_status()
-        result = response.json()
-        if 'choices' in result and len(result['choices']) > 0:
-            return {"success": result['choices'][0]['message']['content']}
-        else:
-            return {"error": "I couldn't generate a response from OpenAI. Please try again."}
-    except requests.exceptions.Timeout:
-        return {"error": "OpenAI API request timed out. Please try again."}
-    except requests.exceptions.RequestException as e:
-        return {"error": f"OpenAI API Error: {e} - {response.text if 'response' in locals() else ''}"}
+        return _parse_gemini_response(await (async_llm_client or llm_client).apost_json("gemini", url, data, headers))
+    except Exception as e:
+        return _request_error(e)
+
+# Helper function for OpenAI (New)
+def get_openai_response(prompt, context="", model="gpt-3.5-turbo"):
+    api_key = CONFIG["OPENAI_API_KEY"]
+    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
+        return {"error": "Please configure your OpenAI API key."}
+    url, data, headers = _openai_request(prompt, context, model)
+    try:
+        return _parse_openai_response(llm_client.post_json("openai", url, data, headers))
     except Exception as e:
-        return {"error": f"An unexpected error occurred with OpenAI: {str(e)}"}
+        return _request_error(e, "OpenAI API")
+
+async def get_openai_response_async(prompt, context="", model="gpt-3.5-turbo"):
+    api_key = CONFIG["OPENAI_API_KEY"]
+    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
+        return {"error": "Please configure your OpenAI API key."}
+    url, data, headers = _openai_request(prompt, context, model)
+    try:
+        return _parse_openai_response(await (async_llm_client or llm_client).apost_json("openai", url, data, headers))
+    except Exception as e:
+        return _request_error(e, "OpenAI API")
 
 
 # Function to choose which AI model to use
@@ -160,13 +442,89 @@ def get_ai_response(prompt, context=""):
     # return get_openai_response(prompt, context)
     return get_gemini_response(prompt, context)
 
+async def get_ai_response_async(prompt, context=""):
+    return await get_gemini_response_async(prompt, context)
 
-def identify_problem_and_generate_code(session_data):
+async def get_ai_responses_async(prompts, context=""):
+    """Sends several prompts concurrently; results are returned in the same order."""
+    return await asyncio.gather(*(get_ai_response_async(prompt, context) for prompt in prompts))
+
+
+# --- Streaming responses ---
+# These generators yield text chunks as the provider produces them and raise
+# on failure; _request_error() turns the exception into the usual error dict.
+
+def stream_gemini_response(prompt, context=""):
+    api_key = CONFIG["GEMINI_API_KEY"]
+    if not api_key or api_key == "YOUR_GEMINI_API_KEY":
+        raise ValueError("Please configure your Gemini API key.")
+    url, data, headers = _gemini_request(prompt, context, stream=True)
+    usage = None
+    for event in llm_client.stream_sse("gemini", url, data, headers):
+        usage = event if 'usageMetadata' in event else usage  # cumulative; the last one counts
+        for candidate in event.get('candidates', []):
+            for part in candidate.get('content', {}).get('parts', []):
+                if part.get('text'):
+                    yield part['text']
+    record_llm_usage("gemini", usage)
+
+def stream_openai_response(prompt, context="", model="gpt-3.5-turbo"):
+    api_key = CONFIG["OPENAI_API_KEY"]
+    if not api_key or api_key == "YOUR_OPENAI_API_KEY":
+        raise ValueError("Please configure your OpenAI API key.")
+    url, data, headers = _openai_request(prompt, context, model, stream=True)
+    for event in llm_client.stream_sse("openai", url, data, headers):
+        record_llm_usage("openai", event)
+        for choice in event.get('choices', []):
+            text = choice.get('delta', {}).get('content')
+            if text:
+                yield text
+
+def stream_ai_response(prompt, context=""):
+    # To use OpenAI:
+    # return stream_openai_response(prompt, context)
+    return stream_gemini_response(prompt, context)
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_to_session(chunks, on_complete, on_error):
+    """Relays text chunks as SSE ``token`` events.
+
+    Once the stream completes, ``on_complete(full_text)`` commits the text to the
+    session and its return value is sent as the final ``done`` event. On failure
+    ``on_error(error_msg)`` is called and its return value is sent as an ``error`` event.
+    """
+    parts = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk)
+            yield sse_event("token", {"text": chunk})
+    except ValueError as e:
+        yield sse_event("error", on_error(str(e)))
+        return
+    except Exception as e:
+        yield sse_event("error", on_error(_request_error(e)["error"]))
+        return
+    if not parts:
+        yield sse_event("error", on_error("I couldn't generate a response. Please try again."))
+        return
+    yield sse_event("done", on_complete("".join(parts)))
+
+def sse_response(events):
+    return Response(stream_with_context(events), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+def build_generation_prompt(session_data):
     user_data = session_data["user_data"]
-    uploaded_data = session_data["uploaded_data"]
 
-    context = f"""
-    Business Information:
+    # Sections are cut to their share of CONFIG["CONTEXT_TOKEN_BUDGET"], in priority order
+    document_query = " ".join(str(user_data.get(key, "")) for key in ("business_type", "optimization_goal", "data_description"))
+    document_query += " " + " ".join(user_data.get('constraints', []))
+    business_information = f"""
     - Type: {user_data.get('business_type', 'Not specified')}
     - Location: {user_data.get('business_location', 'Not specified')}
     - Goal: {user_data.get('optimization_goal', 'Not specified')}
@@ -174,15 +532,14 @@ def identify_problem_and_generate_code(session_data):
     - Budget: {user_data.get('budget_range', 'Not specified')}
     - Time Horizon: {user_data.get('time_horizon', 'Not specified')}
     - Problem Description: {user_data.get('data_description', 'Not specified')}
-
-    Uploaded Data Preview:
-    {uploaded_data.head(10).to_string() if uploaded_data is not None else 'No data uploaded'}
-
-    Data Shape: {uploaded_data.shape if uploaded_data is not None else 'No data'}
-    Data Columns: {list(uploaded_data.columns) if uploaded_data is not None else 'No columns'}
     """
+    context = context_builder.build([
+        ("Business Information", business_information, 0.2),
+        ("Uploaded Data (summary)", context_builder.dataset_summary(session_data, share=0.5), 0.5),
+        ("Reference Document (relevant passages)", context_builder.document_excerpt(session_data, share=0.3, query=document_query), 0.3),
+    ])
 
-    prompt = f"""
+    prompt = """
     Based on the business information and data provided, please:
 
     1. **Identify the optimization problem type** (e.g., Knapsack, Transportation, Assignment, Traveling Salesman, Inventory Optimization, Production Planning, etc.)
@@ -208,7 +565,7 @@ def identify_problem_and_generate_code(session_data):
         # def solve_optimization(data):
         #     # Gurobi model setup and solve
         #     # ...
-        #     return {{"objective_value": model.ObjVal, "variables": {{...}}}}
+        #     return {"objective_value": model.ObjVal, "variables": {...}}
         ```
         ```
 
@@ -218,68 +575,115 @@ def identify_problem_and_generate_code(session_data):
     - Includes appropriate constraints based on the business context
     - Returns meaningful results as a dictionary
     - Has proper error handling
+    - Keeps the best solution when the solve stops at a time or gap limit (model.SolCount > 0): returns it with the status name and 'mip_gap' instead of treating it as a failure
     """
-    return get_ai_response(prompt, context)
+    return prompt, context
 
-def execute_generated_code(code_string, data):
-    if gp is None:
-        return None, "Gurobipy is not installed or configured correctly on the server."
-    try:
-        # Create a dictionary to serve as the execution environment for the generated code
-        namespace = {
-            'gurobipy': gp,
-            'Model': Model,
-            'GRB': GRB,
-            'quicksum': quicksum,
-            'pd': pd,
-            'np': np,
-            'data': data, # Pass the DataFrame directly
-        }
-
-        # Use a StringIO buffer to capture stdout/stderr from the executed code
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        redirected_output = io.StringIO()
-        redirected_error = io.StringIO()
+def identify_problem_and_generate_code(session_data):
+    prompt, context = build_generation_prompt(session_data)
+    return get_ai_response(prompt, context)
 
-        try:
-            sys.stdout = redirected_output
-            sys.stderr = redirected_error
-            
-            # Execute the function definition. Assume the code defines a single function.
-            exec(code_string, namespace)
-
-            # Find the function name (assume it's the first 'def ...' in the code)
-            match = re.search(r'def (\w+)\(', code_string)
-            if match:
-                func_name = match.group(1)
-                if func_name in namespace and callable(namespace[func_name]):
-                    # Call the function with the 'data' DataFrame
-                    result = namespace[func_name](data)
-                    return result, None
-                else:
-                    return None, f"Function '{func_name}' not found or not callable after execution."
-            else:
-                return None, "No function definition found in generated code."
-        finally:
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
-            # You can log redirected_output.getvalue() and redirected_error.getvalue()
-            # for debugging purposes if the Gurobi execution fails silently.
+# --- Solve Budgets ---
+# Every solve gets the time limit and relative MIP gap of a tier in
+# CONFIG["SOLVE_TIERS"]. Requests choose one with "tier"; otherwise the
+# endpoint's default applies (interactive for synchronous requests). A solve
+# that hits its limit returns its best solution and gap.
+
+def solve_budget(tier, default_tier):
+    return tier_budget(tier or default_tier, CONFIG["SOLVE_TIERS"])
+
+def execute_generated_code(code_string, data, budget=None):
+    # Generated code runs in the sandbox process pool so it can use all cores,
+    # can be killed on timeout and cannot corrupt the server's stdout/stderr.
+    # Setting SANDBOX_WORKERS=0 falls back to running it in-process.
+    if CONFIG["SANDBOX_WORKERS"] > 0:
+        result, error, output = sandbox_pool.run(code_string, data, budget=budget)
+    else:
+        if gp is None:
+            return None, "Gurobipy is not installed or configured correctly on the server.", {}
+        result, error, stdout, stderr = run_code(code_string, data, budget=budget)
+        output = {"stdout": stdout, "stderr": stderr}
+    # output["stdout"] / output["stderr"] hold the Gurobi log and the traceback of failed runs.
+    status = result.get("status") if isinstance(result, dict) else ("ERROR" if error else "UNKNOWN")
+    record_solve("generated", status, parse_gurobi_log(output.get("stdout")))
+    if error:
+        app.logger.warning("Generated code failed: %s\n%s", error, traceback_tail(output.get("stderr"), 10))
+    return result, error, output
+
+def repair_generated_code(code_string, error, stderr, session_data):
+    """Asks the AI to fix failed code. Returns the new code, or None if none could be extracted."""
+    prompt, context = build_repair_prompt(code_string, error, stderr, context_builder.dataset_summary(session_data))
+    response = get_ai_response(prompt, context)
+    if "error" in response:
+        return None
+    return extract_code_from_response(response["success"])
+
+def run_with_repairs(session, job=None, budget=None):
+    """
+    Runs the session's generated code, repairing it on failure.
 
-    except Exception as e:
-        return None, f"Error executing code: {str(e)}"
+    Each attempt is checked statically (precheck_generated) before it is executed. When
+    the check or the run fails, a cached repair for that code and error is
+    used if there is one, otherwise the AI is asked for a fix; at most
+    CONFIG["MAX_REPAIR_ATTEMPTS"] repairs are tried. On success the repairs
+    that led to the working code are cached and the session's code is updated.
+    ``budget`` is the time limit and MIP gap of each run (see solve_budget).
 
-def explain_results_with_ai(results, problem_type, session_data):
-    context = f"""
-    Problem Type: {problem_type}
-    Business Context: {session_data["user_data"]}
+    Returns (results, error).
     """
+    code = session["gemini_generated_code"]
+    repairs = []  # [(failed code, error signature, repaired code)]
+    for attempt in range(CONFIG["MAX_REPAIR_ATTEMPTS"] + 1):
+        if job:
+            job.check_cancelled()
+        with timed_stage("precheck"):
+            error, output = precheck_generated(code), {}
+        if error is None:
+            if job:
+                job.progress("waiting_for_solver", "Waiting for a free solver slot...")
+                with job.solve_slot(), timed_stage("execute"):
+                    job.progress("running_optimization", "Running optimization...")
+                    results, error, output = execute_generated_code(code, session["uploaded_data"], budget)
+            else:
+                with job_manager.solve_semaphore, timed_stage("execute"):
+                    results, error, output = execute_generated_code(code, session["uploaded_data"], budget)
+        if error is None:
+            for failed_code, signature, repaired_code in repairs:
+                code_cache.put_repair(failed_code, signature, repaired_code)
+            session["gemini_generated_code"] = code
+            return results, None
+        if attempt == CONFIG["MAX_REPAIR_ATTEMPTS"]:
+            break
+
+        signature = error_signature(error, output.get("stderr", ""))
+        session["chat_history"].append({"role": "bot", "content": f"🔧 **Code failed:** {error}\nRepairing it (attempt {attempt + 1} of {CONFIG['MAX_REPAIR_ATTEMPTS']})..."})
+        if job:
+            job.progress("repairing_code", f"Repairing generated code (attempt {attempt + 1} of {CONFIG['MAX_REPAIR_ATTEMPTS']})...")
+        repaired = code_cache.get_repair(code, signature)
+        if repaired is None:
+            with timed_stage("code_repair"):
+                repaired = repair_generated_code(code, error, output.get("stderr", ""), session)
+            if not repaired or repaired == code:
+                break
+            repairs.append((code, signature, repaired))
+        code = repaired
+    return None, error
+
+def build_explanation_prompt(results, problem_type, session_data):
+    context = context_builder.build([
+        ("Problem Type", str(problem_type), 0.05),
+        ("Business Context", format_user_data(session_data["user_data"]), 0.25),
+    ])
+    if results is session_data.get("optimization_results"):
+        results_summary = context_builder.results_summary(session_data, share=0.6)
+    else:
+        results_summary = summarize_results(results, max_tokens=int(context_builder.budget * 0.6))
 
     prompt = f"""
     I have solved an optimization problem and got the following technical results:
 
-    Results: {results}
+    Results (summary):
+    {results_summary}
 
     Please explain these results in a simple, business-friendly way for a {session_data["user_data"].get('business_type', 'business owner')}.
     
@@ -294,17 +698,33 @@ def explain_results_with_ai(results, problem_type, session_data):
 
     Format your response with clear sections and make it as comprehensive as possible.
     """
+    return prompt, context
+
+def explain_results_with_ai(results, problem_type, session_data):
+    prompt, context = build_explanation_prompt(results, problem_type, session_data)
     return get_ai_response(prompt, context)
 
+def build_followup_context(session_data, question=None):
+    # The dataset and result summaries are memoized on the session, so
+    # follow-up questions do not rebuild them; document passages are
+    # retrieved for each question.
+    with timed_stage("context_build"):
+        return context_builder.build([
+            ("Problem Type", str(session_data["problem_type"]), 0.05),
+            ("Optimization Results (summary)", context_builder.results_summary(session_data, share=0.4), 0.4),
+            ("User Data", format_user_data(session_data["user_data"]), 0.15),
+            ("Uploaded Data (summary)", context_builder.dataset_summary(session_data, share=0.2), 0.2),
+            ("Reference Document (relevant passages)", context_builder.document_excerpt(session_data, share=0.2, query=question), 0.2),
+        ])
+
 def extract_code_from_response(response_content):
     code_pattern = r'```python\s*(.*?)\s*```'
     matches = re.findall(code_pattern, response_content, re.DOTALL)
     if matches:
-        code = matches[0].strip()
-        # Remove any __main__ block and print statements
-        code = re.sub(r"if __name__ == .+?\n(.|\n)*", "", code)
-        code = re.sub(r"print\(.*?\)", "", code)
-        return code
+        # Prefer the first block that defines a function (responses may also contain examples)
+        code = next((m.strip() for m in matches if re.search(r"^\s*def \w+\(", m, re.MULTILINE)), matches[0].strip())
+        # Remove any __main__ block and print statements (on the syntax tree)
+        return sanitize_code(code)
     return None
 
 def extract_problem_type(response_content):
@@ -327,8 +747,8 @@ def index():
 def init_session():
     # Generate a simple session ID (in production, use a more robust method like UUIDs)
     session_id = str(np.random.randint(100000, 999999))
-    get_session_data(session_id) # Initialize session
-    return jsonify({"session_id": session_id, "chat_history": user_sessions[session_id]["chat_history"]})
+    session = get_session_data(session_id) # Initialize session
+    return jsonify({"session_id": session_id, **chat_update(session, request_chat_cursor())})
 
 @app.route('/api/submit_answer', methods=['POST'])
 def submit_answer():
@@ -340,6 +760,7 @@ def submit_answer():
     total_questions = data.get('total_questions')
     
     session = get_session_data(session_id)
+    mark_session_changed(session_id, ("user_data", "questions_completed"))
 
     # Update user data and chat history
     session["user_data"][question_key] = user_answer
@@ -365,7 +786,7 @@ def submit_answer():
         "message": "Answer submitted",
         # Send the boolean flag indicating if all initial questions are completed
         "questions_completed": is_all_questions_completed, 
-        "chat_history": session["chat_history"] # IMPORTANT: Include chat_history for frontend update
+        **chat_update(session, request_chat_cursor())
     }
     return jsonify(response_data)
 
@@ -379,18 +800,53 @@ def upload_pdf():
     file = request.files['file']
     if file.filename == '' or not file.filename.endswith('.pdf'):
         return jsonify({"status": "error", "message": "No selected PDF file"}), 400
+    # Text extraction and indexing run as a background job; prompts then only
+    # include the passages most relevant to each question (see documents.py).
     try:
-        reader = PdfReader(file)
-        text = ""
-        for page in reader.pages:
-            text += page.extract_text() or ""
-        # Store PDF text in session for context
-        session["pdf_context"] = text
-        session["chat_history"].append({"role": "user", "content": f"Uploaded PDF: {file.filename}"})
-        session["chat_history"].append({"role": "bot", "content": "✅ PDF uploaded and processed for context."})
-        return jsonify({"status": "success", "chat_history": session["chat_history"]})
+        pdf_path = save_upload(file, CONFIG["UPLOAD_DIR"], suffix=".pdf")
     except Exception as e:
         return jsonify({"status": "error", "message": f"Error reading PDF: {str(e)}"}), 400
+    filename = file.filename
+    cursor = request_chat_cursor()
+    session["chat_history"].append({"role": "user", "content": f"Uploaded PDF: {filename}"})
+
+    def index_pdf(job):
+        try:
+            job.progress("extracting_text", f"Extracting text from {filename}...")
+            document = pdf_indexer.build(pdf_path, filename,
+                                         progress=lambda fraction: job.progress("extracting_text", f"{fraction:.0%} of pages extracted"))
+        except Exception as e:
+            raise RuntimeError(f"Error reading PDF: {str(e)}") from e
+        finally:
+            os.remove(pdf_path)
+        # Reload the session: it may have changed while the document was indexed
+        current = get_session_data(session_id)
+        current["pdf_index"] = document
+        current.pop("pdf_context", None)
+        current["chat_history"].append({"role": "bot", "content": f"✅ PDF processed for context: {document.num_pages} pages, {len(document.passages)} passages indexed."})
+        save_session_data(session_id, current)
+        return {"status": "success", "pages": document.num_pages, "passages": len(document.passages), **chat_update(current, cursor)}
+
+    # Saved before the job starts; the job reloads the session when it finishes
+    save_session_data(session_id, session)
+    job_id = job_manager.submit(index_pdf, session_id=session_id)
+    return jsonify({"status": "success", "job_id": job_id, "job": job_manager.status(job_id), **chat_update(session, cursor)}), 202
+
+# --- Upload progress ---
+# Large CSVs are ingested chunk by chunk; the latest progress for each session
+# can be polled on /api/upload_progress while /api/upload_data is running.
+upload_progress = {}  # {session_id: {"stage": ..., "fraction": ..., "rows": ..., "updated_at": ...}}
+
+def set_upload_progress(session_id, stage, fraction, rows):
+    now = time.time()
+    upload_progress[session_id] = {"stage": stage, "fraction": round(fraction, 4), "rows": rows, "updated_at": now}
+    for stale_id in [sid for sid, p in list(upload_progress.items()) if now - p["updated_at"] > 3600]:
+        upload_progress.pop(stale_id, None)
+
+@app.route('/api/upload_progress', methods=['GET'])
+def get_upload_progress():
+    session_id = request.args.get('session_id')
+    return jsonify({"status": "success", "progress": upload_progress.get(session_id)})
 
 @app.route('/api/upload_data', methods=['POST'])
 def upload_data():
@@ -405,66 +861,324 @@ def upload_data():
         return jsonify({"status": "error", "message": "No selected file"}), 400
     
     if file and file.filename.endswith('.csv'):
+        csv_path = None
         try:
-            df = pd.read_csv(io.StringIO(file.read().decode('utf-8')))
-            session["uploaded_data"] = df
+            # Stream the upload to disk and convert it once to a memory-mappable
+            # Arrow file; the session only keeps a handle to it.
+            cleanup_uploads(CONFIG["UPLOAD_DIR"], CONFIG["UPLOAD_MAX_AGE"])
+            set_upload_progress(session_id, "receiving", 0.0, 0)
+            csv_path = save_upload(file, CONFIG["UPLOAD_DIR"])
+            dataset = ingest_csv(
+                csv_path,
+                CONFIG["UPLOAD_DIR"],
+                chunk_rows=CONFIG["UPLOAD_CHUNK_ROWS"],
+                progress=lambda stage, fraction, rows: set_upload_progress(session_id, stage, fraction, rows)
+            )
+            set_upload_progress(session_id, "done", 1.0, dataset.num_rows)
+            if session["uploaded_data"] is not None:
+                session["uploaded_data"].delete()
+            session["uploaded_data"] = dataset
+            mark_session_changed(session_id, ("uploaded_data",))
             session["chat_history"].append({"role": "user", "content": f"Uploaded data file: {file.filename}"})
-            session["chat_history"].append({"role": "bot", "content": f"✅ Data uploaded successfully! Shape: {df.shape}"})
+            session["chat_history"].append({"role": "bot", "content": f"✅ Data uploaded successfully! Shape: {dataset.shape}"})
             return jsonify({
                 "status": "success",
-                "message": f"Data uploaded successfully! Shape: {df.shape}",
-                "data_preview": df.head().to_dict(orient='records'),
-                "data_shape": df.shape,
-                "data_columns": list(df.columns),
-                "chat_history": session["chat_history"]
+                "message": f"Data uploaded successfully! Shape: {dataset.shape}",
+                "data_preview": dataset.preview,
+                "data_shape": dataset.shape,
+                "data_columns": dataset.columns,
+                "data_stats": dataset.stats,
+                "validation_warnings": dataset.warnings,
+                **chat_update(session, request_chat_cursor())
             })
         except Exception as e:
+            set_upload_progress(session_id, "failed", 1.0, 0)
             return jsonify({"status": "error", "message": f"Error reading file: {str(e)}"}), 400
+        finally:
+            if csv_path and os.path.exists(csv_path):
+                os.remove(csv_path)
     return jsonify({"status": "error", "message": "Invalid file type. Please upload a CSV."}), 400
-@app.route('/api/start_optimization', methods=['POST'])
-def start_optimization():
-    data = request.json
-    session_id = data.get('session_id')
-    session = get_session_data(session_id)
+# --- Optimization Results ---
+# Results are kept per session as a columnar ResultFrame. Responses and AI
+# prompts carry the full result only while it is small (RESULT_INLINE_ROWS);
+# larger results are replaced by a summary with statistics and the first rows,
+# and the UI pages through the rest with /api/results.
+
+RESULT_KEYS = ("gemini_generated_code", "problem_type", "optimization_results", "result_frame", "results_key")  # set by a solve
+EXPLANATION_KEYS = ("ai_explanation", "context_summaries")  # set by an explanation
+FOLLOWUP_KEYS = ("context_summaries",)  # set by a follow-up answer, besides its chat messages
+
+def store_optimization_results(session, results):
+    """Stores results on the session and returns the compact form used in responses."""
+    previous_key = followup_cache_key(session)
+    with timed_stage("result_storage"):
+        frame = ResultFrame.from_result(results)
+        session["result_frame"] = frame
+        session["results_key"] = frame.fingerprint()
+        if frame.num_rows > CONFIG["RESULT_INLINE_ROWS"]:
+            results = frame.summary(CONFIG["RESULT_PREVIEW_ROWS"])
+    session["optimization_results"] = results
+    if previous_key is not None and previous_key != followup_cache_key(session):
+        # Answers about the replaced results are stale
+        response_cache.invalidate(previous_key)
+    return results
+
+def followup_cache_key(session):
+    """Key of the follow-up answers about the session's current results, None without results.
+
+    Scoped to the session, so replacing its results only drops its own answers
+    and never those of another session that arrived at the same results.
+    """
+    if not session.get("results_key"):
+        return None
+    return fingerprint(session.get("response_scope"), session["problem_type"], session["results_key"])
+
+def json_response(body, status=200):
+    """jsonify, gzip-compressed when the client accepts it and the body is large enough."""
+    if "gzip" not in request.accept_encodings:
+        return jsonify(body), status
+    with timed_stage("serialization"):
+        compressed = gzip_json(body)
+    if len(compressed) < CONFIG["GZIP_MIN_BYTES"]:
+        return jsonify(body), status
+    response = make_response(compressed, status)
+    response.headers["Content-Type"] = "application/json"
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    return response
+
+def run_template(session, job=None, budget=None):
+    """
+    Solves the session's dataset with a built-in model when its schema matches one.
 
-    if session["uploaded_data"] is None:
-        return jsonify({"status": "error", "message": "No data uploaded. Please upload your data first."}), 400
+    The dataset profile is memoized on the session. Returns the response body,
+    or None when no template matches (or the matched one fails) and the LLM
+    pipeline has to run.
+    """
+    dataset = session["uploaded_data"]
+    with timed_stage("template_match"):
+        profile = memoized(session, "dataset_profile", fingerprint(dataset.path, dataset.shape), lambda: profile_dataset(dataset))
+        template, arguments = template_router.route(profile)
+    TEMPLATE_ROUTES.inc(template=template.name if template else "none")
+    if template is None:
+        return None
+
+    session["chat_history"].append({"role": "bot", "content": f"🧩 Recognized a **{template.problem_type}** dataset. Solving it with the built-in model..."})
+    controller = SolveController(**(budget or {}), should_stop=job.is_cancelled if job else None)
+    if job:
+        job.progress("waiting_for_solver", "Waiting for a free solver slot...")
+    with (job.solve_slot() if job else job_manager.solve_semaphore), timed_stage("execute"):
+        if job:
+            job.progress("running_optimization", f"Solving with the built-in {template.problem_type} model...")
+        started = time.perf_counter()
+        results = template.solve(dataset.to_pandas(), controller, **arguments)
+        results.setdefault("solve_time", time.perf_counter() - started)
+    # Decompositions solve many models and report no solver_stats of their own
+    record_solve("template", results.get("status"), results.get("solver_stats") or {"runtime": results["solve_time"], "mip_gap": results.get("mip_gap")})
+    if job:
+        job.check_cancelled()
+    if results.get("status") == "ERROR":
+        template_router.record_fallback()
+        app.logger.warning("Template %s failed: %s", template.name, results.get("error_message"))
+        return None
+
+    session["problem_type"] = template.problem_type
+    session["gemini_generated_code"] = None
+    results = store_optimization_results(session, results)
+    session["chat_history"].append({"role": "bot", "content": "✅ **Optimization Complete!** Check the Solution panel for detailed results."})
+    return {
+        "status": "success",
+        "message": "Optimization completed.",
+        "optimization_results": results,
+        "problem_type": session["problem_type"],
+        "template": template.name
+    }
 
-    session["chat_history"].append({"role": "bot", "content": "🔍 Analyzing your problem and generating optimization code..."})
-    
-    gemini_response_obj = identify_problem_and_generate_code(session)
-    if "error" in gemini_response_obj:
-        error_msg = gemini_response_obj["error"]
-        session["chat_history"].append({"role": "bot", "content": f"❌ **AI Analysis Error:**\n{error_msg}"})
-        return jsonify({"status": "error", "message": error_msg, "chat_history": session["chat_history"]})
+def run_optimization_pipeline(session, job=None, budget=None, use_templates=True, generated=None):
+    """Runs the generate -> execute -> store pipeline for a session.
+
+    Returns the JSON-serializable response body without the chat fields (see
+    chat_update). When ``job`` (a JobContext) is
+    given, progress is reported on it and cancellation is checked between stages.
+    ``budget`` limits the solve (see solve_budget). With ``use_templates``,
+    datasets matching a built-in model skip the LLM (see run_template).
+    ``generated`` is an already received code generation response (asgi.py
+    awaits it on the event loop); it is used when the code cache misses.
+    """
+    if use_templates and template_router is not None:
+        body = run_template(session, job, budget)
+        if body is not None:
+            return body
 
-    gemini_response_content = gemini_response_obj["success"]
-    session["gemini_generated_code"] = extract_code_from_response(gemini_response_content)
-    session["problem_type"] = extract_problem_type(gemini_response_content)
+    session["chat_history"].append({"role": "bot", "content": "🔍 Analyzing your problem and generating optimization code..."})
+    if job:
+        job.progress("generating_code", "Analyzing your problem and generating optimization code...")
+
+    cache_key = make_cache_key(session["user_data"], session["uploaded_data"])
+    cached = code_cache.get(cache_key)
+    if cached:
+        gemini_response_content = cached["response_content"] or f"PROBLEM_TYPE: {cached['problem_type']}"
+        session["gemini_generated_code"] = cached["code"]
+        session["problem_type"] = cached["problem_type"]
+    else:
+        with timed_stage("code_generation"):
+            gemini_response_obj = generated or identify_problem_and_generate_code(session)
+        if "error" in gemini_response_obj:
+            error_msg = gemini_response_obj["error"]
+            session["chat_history"].append({"role": "bot", "content": f"❌ **AI Analysis Error:**\n{error_msg}"})
+            return {"status": "error", "message": error_msg}
+
+        gemini_response_content = gemini_response_obj["success"]
+        with timed_stage("code_extraction"):
+            session["gemini_generated_code"] = extract_code_from_response(gemini_response_content)
+        session["problem_type"] = extract_problem_type(gemini_response_content)
 
     session["chat_history"].append({"role": "bot", "content": f"**Problem Analysis Complete!**\n\n{gemini_response_content}"})
 
     if session["gemini_generated_code"]:
         session["chat_history"].append({"role": "bot", "content": "⚙️ Running optimization..."})
-        results, error = execute_generated_code(session["gemini_generated_code"], session["uploaded_data"])
+        generated_code = session["gemini_generated_code"]
+        results, error = run_with_repairs(session, job, budget)
 
         if error:
-            # CORRECTED LINE HERE
-            session["chat_history"].append({"role": "bot", "content": f"❌ **Execution Error:**\n{error}"}) 
-            return jsonify({"status": "error", "message": error, "chat_history": session["chat_history"]})
+            if cached:
+                code_cache.invalidate(cache_key)
+            session["chat_history"].append({"role": "bot", "content": f"❌ **Execution Error:**\n{error}"})
+            return {"status": "error", "message": error}
         else:
-            session["optimization_results"] = results
+            if not cached or session["gemini_generated_code"] != generated_code:
+                # Only code that actually ran is worth reusing (including repaired code)
+                code_cache.put(cache_key, session["gemini_generated_code"], session["problem_type"], gemini_response_content)
+            results = store_optimization_results(session, results)
             session["chat_history"].append({"role": "bot", "content": "✅ **Optimization Complete!** Check the Solution panel for detailed results."})
-            return jsonify({
+            return {
                 "status": "success",
                 "message": "Optimization completed.",
                 "optimization_results": results,
-                "problem_type": session["problem_type"],
-                "chat_history": session["chat_history"]
-            })
+                "problem_type": session["problem_type"]
+            }
     else:
         session["chat_history"].append({"role": "bot", "content": "❌ **Could not extract code from AI response.** Please try again or refine your input."})
-        return jsonify({"status": "error", "message": "Could not extract code.", "chat_history": session["chat_history"]})
+        return {"status": "error", "message": "Could not extract code."}
+
+
+@app.route('/api/start_optimization', methods=['POST'])
+def start_optimization():
+    data = request.json
+    session_id = data.get('session_id')
+    session = get_session_data(session_id)
+
+    if session["uploaded_data"] is None:
+        return jsonify({"status": "error", "message": "No data uploaded. Please upload your data first."}), 400
+    try:
+        budget = solve_budget(data.get('tier'), "interactive")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    use_templates = data.get('use_templates', CONFIG["TEMPLATE_ROUTING"])
+
+    cursor = request_chat_cursor()
+    mark_session_changed(session_id, RESULT_KEYS + ("context_summaries",))
+    body = run_optimization_pipeline(session, budget=budget, use_templates=use_templates)
+    return json_response({**body, **chat_update(session, cursor)})
+
+
+# --- Optimization Jobs ---
+# Asynchronous variant of /api/start_optimization: submitting returns a job id
+# immediately and the pipeline runs on the bounded job worker pool.
+
+@app.route('/api/optimization_jobs', methods=['POST'])
+def submit_optimization_job():
+    data = request.json
+    session_id = data.get('session_id')
+    session = get_session_data(session_id)
+
+    if session["uploaded_data"] is None:
+        return jsonify({"status": "error", "message": "No data uploaded. Please upload your data first."}), 400
+    try:
+        budget = solve_budget(data.get('tier'), "standard")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    use_templates = data.get('use_templates', CONFIG["TEMPLATE_ROUTING"])
+    cursor = request_chat_cursor()
+    start = session["chat_history"].cursor
+
+    def run_job(job):
+        try:
+            body = run_optimization_pipeline(session, job, budget, use_templates)
+        finally:
+            current = merge_session_changes(session_id, session, RESULT_KEYS, start)
+        return {**body, **chat_update(current, cursor)}
+
+    job_id = job_manager.submit(run_job, session_id=session_id)
+    return jsonify({"status": "success", "job_id": job_id, "job": job_manager.status(job_id)}), 202
+
+
+@app.route('/api/optimization_jobs/<job_id>', methods=['GET'])
+def get_optimization_job(job_id):
+    job = job_manager.status(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found."}), 404
+    return jsonify({"status": "success", "job": job})
+
+
+@app.route('/api/optimization_jobs/<job_id>/cancel', methods=['POST'])
+def cancel_optimization_job(job_id):
+    if job_manager.status(job_id) is None:
+        return jsonify({"status": "error", "message": "Job not found."}), 404
+    cancelled = job_manager.cancel(job_id)
+    return jsonify({"status": "success", "cancel_requested": cancelled, "job": job_manager.status(job_id)})
+
+
+@app.route('/api/optimization_jobs/<job_id>/result', methods=['GET'])
+def get_optimization_job_result(job_id):
+    job = job_manager.result(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Job not found."}), 404
+    if job["status"] == JOB_COMPLETED:
+        return json_response(job["result"])
+    if job["status"] in (JOB_FAILED, JOB_CANCELLED):
+        return jsonify({"status": "error", "message": job["error"] or f"Job {job['status']}.", "job_status": job["status"]})
+    return jsonify({"status": "pending", "job_status": job["status"], "stage": job["stage"]}), 202
+
+@app.route('/api/results', methods=['GET'])
+def get_results():
+    """Pages through the session's optimization results.
+
+    Query parameters: session_id, offset, limit, columns (comma separated) and
+    format ("json" for columnar JSON, "arrow" for an Arrow IPC stream).
+    """
+    session = get_session_data(request.args.get('session_id'))
+    frame = session.get("result_frame")
+    if frame is None:
+        return jsonify({"status": "error", "message": "No optimization results yet."}), 404
+    columns = [c for c in request.args.get('columns', '').split(',') if c]
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        if request.args.get('format', 'json') == 'arrow':
+            response = make_response(frame.to_arrow_ipc(max(0, offset), max(0, limit), columns))
+            response.headers["Content-Type"] = ARROW_MIMETYPE
+            return response
+        page = frame.page(offset, limit, columns)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    return json_response({"status": "success", **page, "scalars": frame.scalars})
+
+@app.route('/api/chat_history', methods=['GET'])
+def get_chat_history():
+    """Chat messages after ?chat_cursor=, e.g. to catch up after a background job."""
+    session = get_session_data(request.args.get('session_id'))
+    return jsonify({"status": "success", **chat_update(session, request_chat_cursor())})
+
+def finish_explanation(session, ai_explanation_obj):
+    """Commits an explanation response to the session; returns the body without chat fields."""
+    if "error" in ai_explanation_obj:
+        error_msg = ai_explanation_obj["error"]
+        session["chat_history"].append({"role": "bot", "content": f"❌ **Explanation Error:**\n{error_msg}"})
+        return {"status": "error", "message": error_msg}
+
+    session["ai_explanation"] = ai_explanation_obj["success"]
+    return {"status": "success", "ai_explanation": session["ai_explanation"]}
 
 @app.route('/api/get_ai_explanation', methods=['POST'])
 def get_ai_explanation():
@@ -474,24 +1188,45 @@ def get_ai_explanation():
 
     if not session["optimization_results"]:
         return jsonify({"status": "error", "message": "No optimization results to explain."}), 400
-    
+    mark_session_changed(session_id, EXPLANATION_KEYS)
+
     ai_explanation_obj = explain_results_with_ai(
         session["optimization_results"], 
         session["problem_type"], 
         session
     )
-    
-    if "error" in ai_explanation_obj:
-        error_msg = ai_explanation_obj["error"]
-        session["chat_history"].append({"role": "bot", "content": f"❌ **Explanation Error:**\n{error_msg}"})
-        return jsonify({"status": "error", "message": error_msg, "chat_history": session["chat_history"]})
+    return jsonify({**finish_explanation(session, ai_explanation_obj), **chat_update(session, request_chat_cursor())})
 
-    session["ai_explanation"] = ai_explanation_obj["success"]
-    return jsonify({
-        "status": "success",
-        "ai_explanation": session["ai_explanation"],
-        "chat_history": session["chat_history"]
-    })
+def begin_followup(session, user_question):
+    """
+    Records the question and looks it up in the response cache.
+
+    Returns (cache_key, cached answer or None, prompt context); the context is
+    None when the answer is cached.
+    """
+    session["chat_history"].append({"role": "user", "content": user_question})
+    cache_key = followup_cache_key(session)
+    cached_answer = response_cache.get(cache_key, user_question) if cache_key else None
+    if cached_answer is not None:
+        return cache_key, cached_answer, None
+    return cache_key, None, build_followup_context(session, user_question)
+
+def finish_followup(session, user_question, cache_key, cached_answer, ai_response_obj=None):
+    """Commits the answer (cached or ``ai_response_obj``) to the session; returns the body without chat fields."""
+    if cached_answer is not None:
+        session["chat_history"].append({"role": "bot", "content": cached_answer})
+        return {"status": "success", "cached": True}
+
+    if "error" in ai_response_obj:
+        error_msg = ai_response_obj["error"]
+        session["chat_history"].append({"role": "bot", "content": f"❌ **AI Response Error:**\n{error_msg}"})
+        return {"status": "error", "message": error_msg}
+
+    ai_response_content = ai_response_obj["success"]
+    if cache_key:
+        response_cache.put(cache_key, user_question, ai_response_content)
+    session["chat_history"].append({"role": "bot", "content": ai_response_content})
+    return {"status": "success", "cached": False}
 
 @app.route('/api/followup_question', methods=['POST'])
 def followup_question():
@@ -499,32 +1234,278 @@ def followup_question():
     session_id = data.get('session_id')
     user_question = data.get('user_question')
     session = get_session_data(session_id)
+    mark_session_changed(session_id, FOLLOWUP_KEYS)
 
-    session["chat_history"].append({"role": "user", "content": user_question})
+    cache_key, cached_answer, context = begin_followup(session, user_question)
+    ai_response_obj = get_ai_response(user_question, context) if cached_answer is None else None
+    body = finish_followup(session, user_question, cache_key, cached_answer, ai_response_obj)
+    return jsonify({**body, **chat_update(session, request_chat_cursor())})
 
-    context = f"""
-    Problem Type: {session["problem_type"]}
-    Optimization Results: {session["optimization_results"]}
-    User Data: {session["user_data"]}
-    """
 
-    ai_response_obj = get_ai_response(user_question, context)
-    if "error" in ai_response_obj:
-        error_msg = ai_response_obj["error"]
+# --- Streaming variants ---
+# Same contracts as /api/get_ai_explanation and /api/followup_question, but the
+# answer is sent as server-sent events: "token" events while the model writes,
+# then a "done" event carrying the usual JSON body once it has been committed
+# to the session (or an "error" event).
+
+@app.route('/api/get_ai_explanation/stream', methods=['POST'])
+def get_ai_explanation_stream():
+    data = request.json
+    session_id = data.get('session_id')
+    session = get_session_data(session_id)
+
+    if not session["optimization_results"]:
+        return jsonify({"status": "error", "message": "No optimization results to explain."}), 400
+
+    prompt, context = build_explanation_prompt(session["optimization_results"], session["problem_type"], session)
+    cursor = request_chat_cursor()
+    start = session["chat_history"].cursor
+
+    def on_complete(text):
+        session["ai_explanation"] = text
+        current = merge_session_changes(session_id, session, ("ai_explanation",), start)
+        return {"status": "success", "ai_explanation": text, **chat_update(current, cursor)}
+
+    def on_error(error_msg):
+        session["chat_history"].append({"role": "bot", "content": f"❌ **Explanation Error:**\n{error_msg}"})
+        current = merge_session_changes(session_id, session, (), start)
+        return {"status": "error", "message": error_msg, **chat_update(current, cursor)}
+
+    return sse_response(stream_to_session(stream_ai_response(prompt, context), on_complete, on_error))
+
+@app.route('/api/followup_question/stream', methods=['POST'])
+def followup_question_stream():
+    data = request.json
+    session_id = data.get('session_id')
+    user_question = data.get('user_question')
+    session = get_session_data(session_id)
+
+    cursor = request_chat_cursor()
+    mark_session_changed(session_id, FOLLOWUP_KEYS)  # the question is saved when the request finishes
+    cache_key, cached_answer, context = begin_followup(session, user_question)
+    start = session["chat_history"].cursor
+
+    def on_complete(text):
+        if cache_key and cached_answer is None:
+            response_cache.put(cache_key, user_question, text)
+        session["chat_history"].append({"role": "bot", "content": text})
+        current = merge_session_changes(session_id, session, (), start)
+        return {"status": "success", "cached": cached_answer is not None, **chat_update(current, cursor)}
+
+    def on_error(error_msg):
         session["chat_history"].append({"role": "bot", "content": f"❌ **AI Response Error:**\n{error_msg}"})
-        return jsonify({"status": "error", "message": error_msg, "chat_history": session["chat_history"]})
+        current = merge_session_changes(session_id, session, (), start)
+        return {"status": "error", "message": error_msg, **chat_update(current, cursor)}
+
+    if cached_answer is not None:
+        chunks = iter([cached_answer])
+    else:
+        chunks = stream_ai_response(user_question, context)
+    return sse_response(stream_to_session(chunks, on_complete, on_error))
+
+
+# --- What-if re-solves ---
+# For datasets in the built-in production planning format, parameter changes
+# are applied to the session's already built model and re-optimized from the
+# previous solution. /api/what_if/stream sends each improving incumbent as an
+# SSE "incumbent" event while the solve runs, then the result as "done".
+WHAT_IF_PARAMETERS = ("max_storage", "initial_inventory", "max_raw_material", "initial_raw_material", "max_production_change")
+
+def parse_what_if_request(session, data):
+    """Validated (parameters, budget) of a what-if request; raises ValueError with the message to return."""
+    if production_models is None:
+        raise ValueError("Gurobipy is not installed or configured correctly on the server.")
+    dataset = session["uploaded_data"]
+    if dataset is None:
+        raise ValueError("No data uploaded. Please upload your data first.")
+    missing = [c for c in PRODUCTION_COLUMNS if c not in dataset.columns]
+    if missing:
+        raise ValueError(f"What-if analysis needs the production planning columns. Missing: {', '.join(missing)}")
+    parameters = data.get('parameters') or {}
+    unknown = [p for p in parameters if p not in WHAT_IF_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+    try:
+        parameters = {name: float(value) for name, value in parameters.items()}
+    except (TypeError, ValueError):
+        raise ValueError("Parameter values must be numbers.")
+    return parameters, solve_budget(data.get('tier'), "interactive")
+
+def solve_what_if(session_id, session, parameters, controller, cursor=None):
+    dataset = session["uploaded_data"]
+    with job_manager.solve_semaphore:
+        results = production_models.solve(session_id, dataset.path, dataset.to_pandas, controller=controller, **parameters)
+    record_solve("what_if", results["status"], results.get("solver_stats"))
+
+    changes = ", ".join(f"{name} = {value:g}" for name, value in parameters.items()) or "current parameters"
+    # Set before storing, so the follow-up cache key of the new results uses it
+    session["problem_type"] = session["problem_type"] or "Production Planning"
+    results = store_optimization_results(session, results)
+    gap = f", gap {results['mip_gap']:.2%}" if results.get("mip_gap") else ""
+    session["chat_history"].append({"role": "bot", "content": f"🔁 **What-if ({changes}):** status {results['status']}, objective {results['objective_value']}{gap} ({results['solve_time']:.2f}s)"})
+    return {
+        "status": "success",
+        "optimization_results": results,
+        "problem_type": session["problem_type"],
+        **chat_update(session, cursor)
+    }
+
+@app.route('/api/what_if', methods=['POST'])
+def what_if():
+    data = request.json
+    session_id = data.get('session_id')
+    session = get_session_data(session_id)
+    try:
+        parameters, budget = parse_what_if_request(session, data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    mark_session_changed(session_id, RESULT_KEYS)
+    return jsonify(solve_what_if(session_id, session, parameters, SolveController(**budget), request_chat_cursor()))
+
+@app.route('/api/what_if/stream', methods=['POST'])
+def what_if_stream():
+    data = request.json
+    session_id = data.get('session_id')
+    session = get_session_data(session_id)
+    try:
+        parameters, budget = parse_what_if_request(session, data)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    incumbents = queue.Queue()
+    controller = SolveController(**budget, on_incumbent=incumbents.put, min_interval=CONFIG["INCUMBENT_MIN_INTERVAL"])
+    cursor = request_chat_cursor()
+    start = session["chat_history"].cursor
+    outcome = {}
+
+    def solve():
+        try:
+            body = solve_what_if(session_id, session, parameters, controller, cursor)
+            current = merge_session_changes(session_id, session, RESULT_KEYS, start)
+            outcome["body"] = {**body, **chat_update(current, cursor)}
+        except Exception as e:
+            outcome["error"] = str(e)
+
+    def events():
+        solver = threading.Thread(target=solve, daemon=True)
+        solver.start()
+        while solver.is_alive() or not incumbents.empty():
+            try:
+                yield sse_event("incumbent", incumbents.get(timeout=0.25))
+            except queue.Empty:
+                continue
+        if "error" in outcome:
+            yield sse_event("error", {"status": "error", "message": outcome["error"]})
+        else:
+            yield sse_event("done", outcome["body"])
+
+    return sse_response(events())
+
+
+# --- Scenario sweeps ---
+# Solves a parameter grid in parallel, either with the built-in production
+# model or with the session's generated code, as a background job. Poll
+# /api/optimization_jobs/<job_id> and fetch the table from .../result.
+
+@app.route('/api/scenario_sweep', methods=['POST'])
+def scenario_sweep():
+    data = request.json
+    session_id = data.get('session_id')
+    session = get_session_data(session_id)
+    dataset = session["uploaded_data"]
+
+    if dataset is None:
+        return jsonify({"status": "error", "message": "No data uploaded. Please upload your data first."}), 400
+    try:
+        scenarios = expand_grid(data.get('grid'))
+        budget = solve_budget(data.get('tier'), "interactive")  # per scenario
+    except (TypeError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    is_production_data = PRODUCTION_COLUMNS is not None and all(c in dataset.columns for c in PRODUCTION_COLUMNS)
+    model = data.get('model') or ("builtin" if is_production_data else "generated")
+    if model == "builtin":
+        if not is_production_data:
+            return jsonify({"status": "error", "message": "The built-in model needs the production planning columns."}), 400
+        unknown = [p for p in scenarios[0] if p not in WHAT_IF_PARAMETERS]
+        if unknown:
+            return jsonify({"status": "error", "message": f"Unknown parameters: {', '.join(unknown)}"}), 400
+        solve = lambda chunk, job: scenario_runner.run_production(dataset, chunk, budget, job.solve_slot(), job.check_cancelled)
+    elif model == "generated":
+        if not session["gemini_generated_code"]:
+            return jsonify({"status": "error", "message": "No generated model yet. Run the optimization first."}), 400
+        if CONFIG["SANDBOX_WORKERS"] <= 0:
+            return jsonify({"status": "error", "message": "Sweeps of generated models need the sandbox pool (SANDBOX_WORKERS > 0)."}), 400
+        code = session["gemini_generated_code"]
+        try:
+            unknown = unaccepted_parameters(code, scenarios[0])
+        except SyntaxError:
+            unknown = []  # reported per scenario by the sandbox
+        if unknown:
+            return jsonify({"status": "error", "message": f"The generated model does not accept the parameter(s): {', '.join(unknown)}"}), 400
+        solve = lambda chunk, job: scenario_runner.run_generated(sandbox_pool, code, dataset, chunk, budget, job.solve_slot(), job.check_cancelled)
+    else:
+        return jsonify({"status": "error", "message": "model must be 'builtin' or 'generated'."}), 400
+
+    cursor = request_chat_cursor()
+    start = session["chat_history"].cursor
+
+    def run_sweep(job):
+        job.progress("running_scenarios", f"Solving {len(scenarios)} scenarios...")
+        with timed_stage("scenario_sweep"):
+            sweep = scenario_runner.run(scenarios, lambda chunk: solve(chunk, job))
+        for row in sweep["scenarios"]:
+            record_solve("sweep", row["status"])
+        session["scenario_sweep"] = sweep
+        best = sweep["best_scenario"]
+        summary = ", ".join(f"{name} = {best[name]:g}" for name in sweep["parameters"]) if best else "no feasible scenario"
+        session["chat_history"].append({"role": "bot", "content": f"📊 **Scenario sweep complete:** {len(scenarios)} scenarios, best: {summary}"})
+        current = merge_session_changes(session_id, session, ("scenario_sweep",), start)
+        return {"status": "success", "model": model, "scenario_sweep": sweep, **chat_update(current, cursor)}
+
+    job_id = job_manager.submit(run_sweep, session_id=session_id)
+    return jsonify({"status": "success", "job_id": job_id, "scenario_count": len(scenarios), "job": job_manager.status(job_id)}), 202
+
+
+@app.route('/api/code_cache/stats', methods=['GET'])
+def code_cache_stats():
+    return jsonify({"status": "success", "code_cache": code_cache.stats()})
+
+
+@app.route('/api/response_cache/stats', methods=['GET'])
+def response_cache_stats():
+    return jsonify({"status": "success", "response_cache": response_cache.stats()})
+
+
+@app.route('/api/templates/stats', methods=['GET'])
+def template_stats():
+    if template_router is None:
+        return jsonify({"status": "error", "message": "Gurobipy is not installed or configured correctly on the server."}), 400
+    return jsonify({"status": "success", "templates": template_router.stats()})
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus text exposition of request, pipeline stage, LLM, solver and cache metrics."""
+    return Response(metrics_registry.render(), mimetype="text/plain; version=0.0.4")
 
-    ai_response_content = ai_response_obj["success"]
-    session["chat_history"].append({"role": "bot", "content": ai_response_content})
 
-    return jsonify({"status": "success", "chat_history": session["chat_history"]})
+@app.route('/api/session_store/stats', methods=['GET'])
+def session_store_stats():
+    return jsonify({"status": "success", "session_store": session_store.stats()})
 
 
 @app.route('/api/reset_session', methods=['POST'])
 def reset_session():
     session_id = request.json.get('session_id')
-    if session_id in user_sessions:
-        del user_sessions[session_id]
+    session_data = session_store.get(session_id)
+    if session_data is not None and session_data["uploaded_data"] is not None:
+        session_data["uploaded_data"].delete()
+    session_store.delete(session_id)
+    g.pop("loaded_sessions", None)
+    if production_models is not None:
+        production_models.discard(session_id)
     return jsonify({"status": "success", "message": "Session reset."})
 
 
@@ -0,0 +1,296 @@
+import asyncio
+import functools
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+from urllib.parse import parse_qs
+
+import app as backend
+from app import CONFIG
+from llm_client import AsyncLLMClient
+from metrics import REQUEST_SECONDS
+from results import gzip_json
+
+# --- ASGI Serving Mode ---
+# Run from backend/ with:  uvicorn asgi:application --port 5000
+#
+# The routes that spend most of their time waiting for the LLM
+# (/api/followup_question, /api/get_ai_explanation and the code generation
+# phase of /api/start_optimization) run as coroutines: while a prompt is in
+# flight they hold no thread, so one process serves many more of them at once
+# than the threaded Flask server. Their CPU-bound parts (context building,
+# template and generated-code solves, session store access) run on an
+# executor of CONFIG["ASGI_EXECUTOR_THREADS"] threads.
+#
+# Every other route, including the uploads, is served by the Flask app through
+# a WSGI bridge with its own CONFIG["ASGI_WSGI_THREADS"] threads. Request
+# bodies are received on the event loop before a thread is taken, so a slow
+# upload does not hold one. Responses are the same as in the threaded mode.
+
+logger = logging.getLogger(__name__)
+
+SPOOL_MAX_BYTES = 1024 * 1024  # request bodies larger than this are spooled to disk
+
+
+class AsyncRequest:
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.body = body
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+        self.args = {name: values[-1] for name, values in parse_qs(scope["query_string"].decode("latin-1")).items()}
+
+    def json(self):
+        """The JSON object in the body, or None."""
+        try:
+            data = json.loads(self.body or b"null")
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+
+    def chat_cursor(self, data):
+        return backend.parse_chat_cursor(self.args.get("chat_cursor", data.get("chat_cursor")))
+
+
+def run_sync(func, *args):
+    """Runs blocking ``func`` on the executor."""
+    return asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args))
+
+
+def error(message, status):
+    return {"status": "error", "message": message}, status
+
+
+# --- Async routes ---
+# Same request and response contracts as the Flask routes of the same path.
+
+async def followup_question(request, data):
+    session_id = data.get('session_id')
+    user_question = data.get('user_question')
+    session = await run_sync(backend.get_session_data, session_id)
+    start = session["chat_history"].cursor
+
+    cache_key, cached_answer, context = await run_sync(backend.begin_followup, session, user_question)
+    ai_response_obj = await backend.get_ai_response_async(user_question, context) if cached_answer is None else None
+    body = backend.finish_followup(session, user_question, cache_key, cached_answer, ai_response_obj)
+    current = await run_sync(backend.merge_session_changes, session_id, session, backend.FOLLOWUP_KEYS, start)
+    return {**body, **backend.chat_update(current, request.chat_cursor(data))}, 200
+
+
+async def get_ai_explanation(request, data):
+    session_id = data.get('session_id')
+    session = await run_sync(backend.get_session_data, session_id)
+
+    if not session["optimization_results"]:
+        return error("No optimization results to explain.", 400)
+
+    start = session["chat_history"].cursor
+    prompt, context = await run_sync(backend.build_explanation_prompt, session["optimization_results"], session["problem_type"], session)
+    ai_explanation_obj = await backend.get_ai_response_async(prompt, context)
+    body = backend.finish_explanation(session, ai_explanation_obj)
+    current = await run_sync(backend.merge_session_changes, session_id, session, backend.EXPLANATION_KEYS, start)
+    return {**body, **backend.chat_update(current, request.chat_cursor(data))}, 200
+
+
+async def start_optimization(request, data):
+    session_id = data.get('session_id')
+    session = await run_sync(backend.get_session_data, session_id)
+
+    if session["uploaded_data"] is None:
+        return error("No data uploaded. Please upload your data first.", 400)
+    try:
+        budget = backend.solve_budget(data.get('tier'), "interactive")
+    except ValueError as e:
+        return error(str(e), 400)
+    use_templates = data.get('use_templates', CONFIG["TEMPLATE_ROUTING"])
+    start = session["chat_history"].cursor
+
+    try:
+        body = None
+        if use_templates and backend.template_router is not None:
+            body = await run_sync(backend.run_template, session, None, budget)
+        if body is None:
+            # Only the code generation prompt is awaited here; execution (and
+            # code repair, which is rare) runs on the executor
+            generated = None
+            cache_key = backend.make_cache_key(session["user_data"], session["uploaded_data"])
+            if not await run_sync(backend.code_cache.contains, cache_key):
+                prompt, context = await run_sync(backend.build_generation_prompt, session)
+                generated = await backend.get_ai_response_async(prompt, context)
+            body = await run_sync(backend.run_optimization_pipeline, session, None, budget, False, generated)
+    finally:
+        current = await run_sync(backend.merge_session_changes, session_id, session, backend.RESULT_KEYS + ("context_summaries",), start)
+    return {**body, **backend.chat_update(current, request.chat_cursor(data))}, 200
+
+
+ROUTES = {
+    ("POST", "/api/followup_question"): followup_question,
+    ("POST", "/api/get_ai_explanation"): get_ai_explanation,
+    ("POST", "/api/start_optimization"): start_optimization,
+}
+GZIP_ROUTES = {"/api/start_optimization"}  # gzip-compressed like json_response() in app.py
+
+
+# --- WSGI bridge ---
+
+def wsgi_environ(scope, body):
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    server = scope.get("server") or ("localhost", 80)
+    environ["SERVER_NAME"], environ["SERVER_PORT"] = server[0], str(server[1] or 80)
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope["headers"]:
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        key = {"content-length": "CONTENT_LENGTH", "content-type": "CONTENT_TYPE"}.get(name, "HTTP_" + name.upper().replace("-", "_"))
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(wsgi_app, environ, send_sync):
+    """Runs the WSGI app in the calling (executor) thread and forwards its response."""
+    start = {}
+
+    def start_response(status, headers, exc_info=None):
+        start["message"] = {
+            "type": "http.response.start",
+            "status": int(status.split(" ", 1)[0]),
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        }
+
+    result = wsgi_app(environ, start_response)
+    try:
+        for chunk in result:
+            if "message" in start:
+                send_sync(start.pop("message"))
+            if chunk:
+                send_sync({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    if "message" in start:
+        send_sync(start.pop("message"))
+    send_sync({"type": "http.response.body", "body": b""})
+
+
+class AsyncApp:
+    """ASGI application: the routes in ROUTES as coroutines, everything else through the WSGI bridge."""
+
+    def __init__(self, wsgi_app, routes=ROUTES):
+        self.wsgi_app = wsgi_app
+        self.routes = routes
+        self.wsgi_executor = None
+        self.started = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            return
+        await self.startup()
+        with SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as body:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            handler = self.routes.get((scope["method"], scope["path"]))
+            if handler is None:
+                return await self.serve_wsgi(scope, body, send)
+            await self.serve_async(handler, AsyncRequest(scope, body.read()), send)
+
+    async def startup(self):
+        # Idempotent, so servers without lifespan events work too
+        if self.started is None:
+            self.started = asyncio.get_running_loop().create_future()
+            loop = asyncio.get_running_loop()
+            loop.set_default_executor(ThreadPoolExecutor(max_workers=CONFIG["ASGI_EXECUTOR_THREADS"], thread_name_prefix="asgi-executor"))
+            self.wsgi_executor = ThreadPoolExecutor(max_workers=CONFIG["ASGI_WSGI_THREADS"], thread_name_prefix="asgi-wsgi")
+            backend.async_llm_client = AsyncLLMClient(
+                max_retries=CONFIG["MAX_RETRIES"],
+                timeout=CONFIG["TIMEOUT"],
+                pool_size=CONFIG["LLM_POOL_SIZE"],
+                providers=CONFIG["LLM_LIMITS"]
+            )
+            self.started.set_result(True)
+        await self.started
+
+    async def shutdown(self):
+        if backend.async_llm_client is not None:
+            await backend.async_llm_client.aclose()
+            backend.async_llm_client = None
+        if self.wsgi_executor is not None:
+            self.wsgi_executor.shutdown(wait=False)
+        self.started = None
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await self.startup()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def serve_wsgi(self, scope, body, send):
+        loop = asyncio.get_running_loop()
+
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        await loop.run_in_executor(self.wsgi_executor, run_wsgi, self.wsgi_app, wsgi_environ(scope, body), send_sync)
+
+    async def serve_async(self, handler, request, send):
+        started_at = time.perf_counter()
+        data = request.json()
+        try:
+            body, status = await handler(request, data) if data is not None else error("Request body must be a JSON object.", 400)
+        except Exception as e:
+            logger.exception("Error in %s", request.scope["path"])
+            body, status = error(f"An unexpected error occurred: {str(e)}", 500)
+
+        headers = [(b"content-type", b"application/json")]
+        payload = None
+        if request.scope["path"] in GZIP_ROUTES and "gzip" in request.headers.get("accept-encoding", ""):
+            compressed = gzip_json(body)
+            if len(compressed) >= CONFIG["GZIP_MIN_BYTES"]:
+                payload = compressed
+                headers += [(b"content-encoding", b"gzip"), (b"vary", b"Accept-Encoding")]
+        if payload is None:
+            payload = (backend.app.json.dumps(body) + "\n").encode("utf-8")
+        origin = request.headers.get("origin")
+        if origin in backend.CORS_ORIGINS:
+            headers += [(b"access-control-allow-origin", origin.encode("latin-1")),
+                        (b"access-control-allow-credentials", b"true"), (b"vary", b"Origin")]
+        headers.append((b"content-length", str(len(payload)).encode("latin-1")))
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": payload})
+        REQUEST_SECONDS.observe(time.perf_counter() - started_at, method=request.scope["method"], route=request.scope["path"], status=status)
+
+
+application = AsyncApp(backend.app)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run(application, port=5000)
@@ -0,0 +1,184 @@
+"""Concurrent follow-up questions: threaded WSGI server against the ASGI mode.
+
+Both servers run in their own process with the same number of threads (like
+a gunicorn gthread worker and uvicorn with asgi.py) against a local stub of the
+Gemini API that answers after a fixed latency. Each of ``concurrency`` clients
+asks questions in a loop on its own session; throughput and latency show how
+many LLM-bound requests one process serves at once.
+
+Usage (from backend/, needs uvicorn and httpx for the ASGI mode):
+    python -m benchmarks.bench_concurrency [--concurrency 8 32 128] [--threads 8] [--llm-latency 0.5]
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from benchmarks.bench_pipeline import DEFAULT_OUTPUT, StubGeminiHandler, environment, git_commit
+
+MODES = ("threaded", "asgi")
+
+
+class SlowStubGeminiHandler(StubGeminiHandler):
+    latency = 0.5
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        super().do_POST()
+
+
+# --- Servers (run in a child process) ---
+
+def serve(mode, port, threads):
+    if mode == "threaded":
+        import logging
+        from werkzeug.serving import BaseWSGIServer
+        import app as flask_app
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no line per request
+
+        class PooledWSGIServer(BaseWSGIServer):
+            """One request per pool thread, like gunicorn's gthread worker."""
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.pool = ThreadPoolExecutor(max_workers=threads)
+
+            def process_request(self, request, client_address):
+                self.pool.submit(self._process, request, client_address)
+
+            def _process(self, request, client_address):
+                try:
+                    self.finish_request(request, client_address)
+                except Exception:
+                    self.handle_error(request, client_address)
+                finally:
+                    self.shutdown_request(request)
+
+        PooledWSGIServer("127.0.0.1", port, flask_app.app).serve_forever()
+    else:
+        import uvicorn
+        os.environ["ASGI_EXECUTOR_THREADS"] = os.environ["ASGI_WSGI_THREADS"] = str(threads)
+        from asgi import application
+        uvicorn.run(application, host="127.0.0.1", port=port, log_level="warning", backlog=4096)
+
+
+def start_server(mode, port, threads, env):
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_concurrency", "--serve", mode, "--port", str(port), "--threads", str(threads)],
+                               env=env, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url, timeout=1)
+            return process, url
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+
+# --- Load ---
+
+def run_load(url, concurrency, requests_per_client):
+    """Each client creates a session and asks distinct questions (so the response cache never answers)."""
+    def client(_):
+        http = requests.Session()
+        session_id = http.get(f"{url}/api/init_session").json()["session_id"]
+        latencies, errors = [], 0
+        for _ in range(requests_per_client):
+            question = f"What does scenario {uuid.uuid4().hex} mean for inventory {uuid.uuid4().hex}?"
+            start = time.perf_counter()
+            response = http.post(f"{url}/api/followup_question", json={"session_id": session_id, "user_question": question})
+            latencies.append(time.perf_counter() - start)
+            errors += response.status_code != 200 or response.json().get("status") != "success"
+        return latencies, errors
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        outcomes = list(clients.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latency for client_latencies, _ in outcomes for latency in client_latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": sum(errors for _, errors in outcomes),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_seconds": latencies[len(latencies) // 2],
+        "p95_seconds": latencies[int(len(latencies) * 0.95)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--threads", type=int, default=8, help="server threads in both modes")
+    parser.add_argument("--requests", type=int, default=4, help="requests per client")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds the stub LLM takes to answer")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON lines file the run is appended to")
+    parser.add_argument("--serve", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.serve, args.port, args.threads)
+
+    SlowStubGeminiHandler.latency = args.llm_latency
+    stub = ThreadingHTTPServer(("127.0.0.1", 0), SlowStubGeminiHandler)
+    stub.daemon_threads = True
+    stub.request_queue_size = 1024
+    threading.Thread(target=stub.serve_forever, daemon=True).start()
+
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   GEMINI_BASE_URL=f"http://127.0.0.1:{stub.server_address[1]}",
+                   GEMINI_API_KEY="benchmark",
+                   GEMINI_RPS="0",  # no client-side rate limit or concurrency cap: the server is measured
+                   GEMINI_MAX_CONCURRENCY="100000",
+                   LLM_POOL_SIZE=str(max(args.concurrency)),
+                   CODE_CACHE_PATH=os.path.join(tmp, "code_cache.sqlite3"),
+                   UPLOAD_DIR=os.path.join(tmp, "uploads"),
+                   SESSION_BACKEND="memory",
+                   SANDBOX_WORKERS="0")
+        try:
+            for mode in args.modes:
+                process, url = start_server(mode, args.port, args.threads, env)
+                try:
+                    for concurrency in args.concurrency:
+                        record = {"mode": mode, **run_load(url, concurrency, args.requests)}
+                        records.append(record)
+                        print(f"{mode:>9} {concurrency:>5} clients: {record['requests_per_second']:7.1f} req/s, "
+                              f"p50 {record['p50_seconds']:.2f}s, p95 {record['p95_seconds']:.2f}s, {record['errors']} errors")
+                finally:
+                    process.terminate()
+                    process.wait()
+        finally:
+            stub.shutdown()
+
+    record = {
+        "benchmark": "concurrency",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "environment": environment(),
+        "threads": args.threads,
+        "llm_latency": args.llm_latency,
+        "results": records,
+    }
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Model build time of the loop and matrix production-planning builders.
+
+Usage (from backend/):
+    python -m benchmarks.bench_model_build [--periods 12 120 1200 12000 100000] [--repeat 3]
+"""
+import argparse
+import time
+
+import gurobipy as gp
+
+from samplegurobi import build_production_model_loops, build_production_model_matrix
+from benchmarks.synthetic import make_production_data
+
+BUILDERS = {
+    "loops": build_production_model_loops,
+    "matrix": build_production_model_matrix,
+}
+
+
+def time_build(builder, data, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model, _ = builder(data)
+        model.update()  # include Gurobi's own processing of the pending changes
+        best = min(best, time.perf_counter() - start)
+        model.dispose()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, nargs="+", default=[12, 120, 1200, 12000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    gp.setParam("OutputFlag", 0)
+    print(f"{'periods':>10} {'loops (s)':>12} {'matrix (s)':>12} {'speedup':>9}")
+    for periods in args.periods:
+        data = make_production_data(periods)
+        timings = {name: time_build(builder, data, args.repeat) for name, builder in BUILDERS.items()}
+        print(f"{periods:>10} {timings['loops']:>12.4f} {timings['matrix']:>12.4f} {timings['loops'] / timings['matrix']:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Stage-by-stage and end-to-end timings of the optimization pipeline.
+
+Library stages (per dataset size): CSV ingestion, model build, solve, result
+extraction and serialization (JSON, gzip and Arrow IPC). End to end, the Flask
+endpoints are driven with the test client against a local stub of the Gemini
+API that answers with canned code, so the LLM adds no latency or cost but the
+HTTP client, code extraction, sandbox and session handling all run.
+
+Every run appends one JSON record (git commit, environment and timings) to
+the output file, so results of different commits can be compared. It defaults
+to a file in the temp directory (or $BENCHMARK_OUTPUT), outside the repository.
+
+Usage (from backend/):
+    python -m benchmarks.bench_pipeline [--periods 12 60 240] [--repeat 3] [--output results.jsonl]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import gurobipy as gp
+
+from datasets import ingest_csv
+from results import ResultFrame, gzip_json
+from samplegurobi import build_production_model_matrix, extract_production_results
+from benchmarks.synthetic import write_production_csv
+
+DEFAULT_OUTPUT = os.getenv("BENCHMARK_OUTPUT", os.path.join(tempfile.gettempdir(), "inventory_benchmarks.jsonl"))
+
+STUB_CODE = """
+import gurobipy as gp
+from samplegurobi import solve_production_optimization
+
+def optimize_production(data):
+    return solve_production_optimization(data)
+"""
+STUB_GENERATION = f"""PROBLEM_TYPE: Production Planning
+
+EXPLANATION: Monthly production, inventory and raw material decisions with storage limits.
+
+PYTHON_CODE:
+```python{STUB_CODE}```
+"""
+STUB_ANSWER = "Production follows demand; inventory stays below the storage limit in every period."
+USER_ANSWERS = {
+    "business_type": "Manufacturing",
+    "optimization_goal": "Maximize profit",
+    "constraints": ["Storage capacity", "Raw material availability"],
+    "data_description": "Monthly production planning data",
+}
+
+
+def best_of(repeat, run):
+    """Smallest wall time of ``repeat`` calls of ``run()`` and the last return value."""
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = run()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+# --- Library stages ---
+
+def bench_stages(periods, repeat, tmp):
+    csv_path = write_production_csv(os.path.join(tmp, f"production_{periods}.csv"), periods)
+    timings = {}
+
+    def ingest():
+        dataset = ingest_csv(csv_path, tmp)
+        data = dataset.to_pandas()
+        dataset.delete()
+        return data
+    timings["csv_ingestion"], data = best_of(repeat, ingest)
+
+    def build():
+        model, variables = build_production_model_matrix(data)
+        model.update()
+        return model, variables
+    models = []
+    timings["model_build"], _ = best_of(repeat, lambda: models.append(build()))
+
+    def solve():
+        model, variables = models.pop()
+        model.optimize()
+        return model, variables
+    timings["solve"], (model, variables) = best_of(repeat, solve)
+
+    timings["result_extraction"], result = best_of(repeat, lambda: extract_production_results(model, variables, data))
+    model.dispose()
+    for leftover, _ in models:
+        leftover.dispose()
+
+    timings["result_frame"], frame = best_of(repeat, lambda: ResultFrame.from_result(result))
+    timings["serialize_json"], body = best_of(repeat, lambda: json.dumps(result, default=str).encode("utf-8"))
+    timings["serialize_gzip"], compressed = best_of(repeat, lambda: gzip_json(result))
+    timings["serialize_arrow"], arrow = best_of(repeat, frame.to_arrow_ipc)
+    return {
+        "periods": periods,
+        "status": result["status"],
+        "seconds": timings,
+        "bytes": {"json": len(body), "gzip": len(compressed), "arrow": len(arrow)},
+    }
+
+
+# --- End to end ---
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    """Answers generateContent requests: canned code for code generation prompts, a fixed answer otherwise."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["contents"][0]["parts"][0]["text"]
+        text = STUB_GENERATION if "PYTHON_CODE" in prompt else STUB_ANSWER
+        payload = json.dumps({
+            "candidates": [{"content": {"parts": [{"text": text}]}}],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_llm():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGeminiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def bench_endpoints(periods_list, tmp):
+    """Times each request of a session: upload, optimization (LLM and template), result paging, follow-ups and a what-if."""
+    server = start_stub_llm()
+    # app reads its configuration at import time
+    os.environ.update({
+        "GEMINI_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}",
+        "GEMINI_API_KEY": "benchmark",
+        "CODE_CACHE_PATH": os.path.join(tmp, "code_cache.sqlite3"),
+        "UPLOAD_DIR": os.path.join(tmp, "uploads"),
+        "SESSION_BACKEND": "memory",
+    })
+    import app as flask_app
+
+    client = flask_app.app.test_client()
+    records = []
+    try:
+        for periods in periods_list:
+            csv_path = write_production_csv(os.path.join(tmp, f"upload_{periods}.csv"), periods)
+            session_id = client.get("/api/init_session").get_json()["session_id"]
+            for i, (key, answer) in enumerate(USER_ANSWERS.items()):
+                client.post("/api/submit_answer", json={"session_id": session_id, "question_key": key, "user_answer": answer,
+                                                        "current_question_index": i, "total_questions": len(USER_ANSWERS)})
+
+            timings, statuses = {}, {}
+
+            def timed(name, send):
+                start = time.perf_counter()
+                response = send()
+                timings[name] = time.perf_counter() - start
+                statuses[name] = response.status_code
+                return response
+
+            with open(csv_path, "rb") as f:
+                timed("upload_data", lambda: client.post("/api/upload_data", data={"session_id": session_id, "file": (f, "data.csv")},
+                                                         content_type="multipart/form-data"))
+            llm_request = {"session_id": session_id, "use_templates": False}
+            body = timed("start_optimization", lambda: client.post("/api/start_optimization", json=llm_request)).get_json()
+            timed("start_optimization_cached_code", lambda: client.post("/api/start_optimization", json=llm_request))
+            timed("start_optimization_template", lambda: client.post("/api/start_optimization", json={"session_id": session_id}))
+            timed("results_page", lambda: client.get(f"/api/results?session_id={session_id}&limit=500"))
+            timed("results_arrow", lambda: client.get(f"/api/results?session_id={session_id}&format=arrow"))
+            question = {"session_id": session_id, "user_question": "Which month has the highest inventory?"}
+            timed("followup_question", lambda: client.post("/api/followup_question", json=question))
+            timed("followup_question_cached", lambda: client.post("/api/followup_question", json=question))
+            timed("what_if", lambda: client.post("/api/what_if", json={"session_id": session_id, "parameters": {"max_storage": 400}}))
+            records.append({"periods": periods, "status": body.get("status"), "seconds": timings, "http_status": statuses})
+    finally:
+        server.shutdown()
+        flask_app.sandbox_pool.shutdown()
+    return records
+
+
+# --- Output ---
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "gurobi": ".".join(str(v) for v in gp.gurobi.version()),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def print_table(title, records):
+    print(title)
+    names = list(records[0]["seconds"])
+    print(f"{'periods':>8} " + " ".join(f"{name[:14]:>14}" for name in names))
+    for record in records:
+        print(f"{record['periods']:>8} " + " ".join(f"{record['seconds'][name] * 1000:>12.1f}ms" for name in names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, nargs="+", default=[12, 60, 240])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="JSON lines file the run is appended to")
+    parser.add_argument("--skip-endpoints", action="store_true", help="only run the library stages")
+    args = parser.parse_args()
+
+    gp.setParam("OutputFlag", 0)
+    with tempfile.TemporaryDirectory() as tmp:
+        stages = [bench_stages(periods, args.repeat, tmp) for periods in args.periods]
+        endpoints = [] if args.skip_endpoints else bench_endpoints(args.periods, tmp)
+
+    print_table("Library stages", stages)
+    if endpoints:
+        print_table("Endpoints (stub LLM)", endpoints)
+
+    record = {
+        "benchmark": "pipeline",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "environment": environment(),
+        "repeat": args.repeat,
+        "stages": stages,
+        "endpoints": endpoints,
+    }
+    with open(args.output, "a") as f:
+        f.write(json.dumps(record) + "\n")
+    print(f"Appended results to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Rolling-horizon decomposition against the monolithic production model.
+
+For each horizon length, solves the full model once (where it fits the
+license) and the rolling-horizon modes at the given window sizes, and reports
+solve time, whether the combined plan satisfies every constraint of the full
+model, and the objective gap to the monolithic solve.
+
+Usage (from backend/):
+    python -m benchmarks.bench_rolling_horizon [--periods 120 300 2400] [--windows 12 24 48] [--workers 4]
+"""
+import argparse
+import time
+
+import gurobipy as gp
+import numpy as np
+
+from rolling_horizon import solve_production_rolling_horizon
+from samplegurobi import production_demand, solve_production_optimization
+from benchmarks.synthetic import make_production_data
+
+PARAMETERS = {"max_storage": 500, "initial_inventory": 100, "max_raw_material": 200, "initial_raw_material": 50, "max_production_change": 50}
+MONOLITHIC_MAX_PERIODS = 300  # larger models exceed the size-limited Gurobi license
+TOLERANCE = 1e-6
+
+
+def violations(data, result):
+    """Number of periods in which the combined plan breaks a constraint of the full model."""
+    if result["production_volumes"] is None:
+        return None
+    production = np.array(list(result["production_volumes"].values()))
+    inventory = np.array(list(result["inventory_levels"].values()))
+    raw_material = np.array(list(result["raw_material_inventory"].values()))
+    previous_inventory = np.concatenate([[PARAMETERS["initial_inventory"]], inventory[:-1]])
+    broken = np.abs(previous_inventory + production - production_demand(data) - inventory) > TOLERANCE
+    broken |= (inventory < -TOLERANCE) | (inventory > PARAMETERS["max_storage"] + TOLERANCE)
+    broken |= (raw_material < -TOLERANCE) | (raw_material > PARAMETERS["max_raw_material"] + TOLERANCE)
+    broken |= np.abs(production - np.round(production)) > TOLERANCE
+    broken[1:] |= np.abs(np.diff(production)) > PARAMETERS["max_production_change"] + TOLERANCE
+    return int(broken.sum())
+
+
+def timed(solve):
+    start = time.perf_counter()
+    result = solve()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, nargs="+", default=[120, 300, 2400])
+    parser.add_argument("--windows", type=int, nargs="+", default=[12, 24, 48])
+    parser.add_argument("--overlap", type=float, default=0.25, help="overlap as a fraction of the window")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    gp.setParam("OutputFlag", 0)
+    print(f"{'periods':>8} {'method':>24} {'seconds':>9} {'status':>12} {'violations':>10} {'objective gap':>14}")
+    for periods in args.periods:
+        data = make_production_data(periods)
+        monolithic = None
+        if periods <= MONOLITHIC_MAX_PERIODS:
+            seconds, monolithic = timed(lambda: solve_production_optimization(data, **PARAMETERS))
+            print(f"{periods:>8} {'monolithic':>24} {seconds:>9.3f} {monolithic['status']:>12} {violations(data, monolithic)!s:>10} {'':>14}")
+
+        for window in args.windows:
+            for mode in ("sequential", "parallel"):
+                seconds, result = timed(lambda: solve_production_rolling_horizon(
+                    data, window=window, overlap=int(window * args.overlap), mode=mode, workers=args.workers, **PARAMETERS))
+                gap = ""
+                if monolithic and monolithic["objective_value"] and result["objective_value"] is not None:
+                    gap = f"{abs(monolithic['objective_value'] - result['objective_value']) / abs(monolithic['objective_value']):.2%}"
+                method = f"{mode}, window {window}"
+                if result["decomposition"]["fell_back_to_sequential"]:
+                    method += "*"
+                print(f"{periods:>8} {method:>24} {seconds:>9.3f} {result['status']:>12} {violations(data, result)!s:>10} {gap:>14}")
+    print("* parallel mode could not fix all shard boundaries and solved the remaining periods sequentially")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Scenario sweep throughput (scenarios per second) of the built-in production model.
+
+Compares cold solves (solve_production_optimization per scenario) with
+ScenarioRunner at increasing worker counts.
+
+Usage (from backend/):
+    python -m benchmarks.bench_scenario_sweep [--periods 240] [--workers 1 2 4]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import gurobipy as gp
+
+from datasets import ingest_csv
+from samplegurobi import solve_production_optimization
+from scenarios import ScenarioRunner, expand_grid
+from benchmarks.synthetic import make_production_data
+
+GRID = {
+    "max_storage": [200, 300, 400, 500, 600, 700],
+    "max_raw_material": [180, 200, 250],
+    "max_production_change": [20, 35, 50],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, default=240)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    gp.setParam("OutputFlag", 0)
+    scenarios = expand_grid(GRID)
+    data = make_production_data(args.periods)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "data.csv")
+        data.to_csv(csv_path, index=False)
+        dataset = ingest_csv(csv_path, tmp)
+        data = dataset.to_pandas()
+
+        start = time.perf_counter()
+        for scenario in scenarios:
+            solve_production_optimization(data, **scenario)
+        cold = len(scenarios) / (time.perf_counter() - start)
+        print(f"{len(scenarios)} scenarios, {args.periods} periods")
+        print(f"{'cold, 1 process':>22}: {cold:8.1f} scenarios/s")
+
+        for workers in args.workers:
+            runner = ScenarioRunner(workers=workers)
+            runner.run(scenarios[:workers], lambda chunk: runner.run_production(dataset, chunk))  # start the worker processes
+            sweep = runner.run(scenarios, lambda chunk: runner.run_production(dataset, chunk))
+            runner.shutdown()
+            print(f"{f'warm, {workers} worker(s)':>22}: {sweep['scenarios_per_second']:8.1f} scenarios/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# --- Synthetic Datasets ---
+# Generators for benchmark data with the columns samplegurobi.py expects.
+# Values are drawn so that the production model stays feasible with its
+# default parameters (storage 500, raw material 200, production change 50).
+
+
+def make_production_data(periods, seed=0):
+    """Returns a DataFrame with one row per period for solve_production_optimization."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(periods)
+
+    # Smooth demand that production can follow within the change limit
+    demand = np.round(100 + 20 * np.sin(2 * np.pi * t / 12) + rng.uniform(-5, 5, periods))
+
+    # Raw material inventory follows a bounded random path; usage is its decrease
+    raw_material_path = rng.uniform(20, 180, periods)
+    scrap_metal_used = np.concatenate(([50.0], raw_material_path[:-1])) - raw_material_path
+
+    unit_price = rng.uniform(90, 110, periods)
+    revenue = demand * unit_price
+    return pd.DataFrame({
+        "Month": [f"P{i + 1}" for i in t],
+        "Raw_Material_Cost": revenue * rng.uniform(0.20, 0.30, periods),
+        "Labour_Cost": revenue * rng.uniform(0.10, 0.15, periods),
+        "Electricity_Cost": revenue * rng.uniform(0.03, 0.06, periods),
+        "Transportation_Cost": revenue * rng.uniform(0.02, 0.05, periods),
+        "Commission_Cost": revenue * rng.uniform(0.01, 0.03, periods),
+        "Warehousing_Cost": revenue * rng.uniform(0.01, 0.02, periods),
+        "Revenue": revenue,
+        "Scrap_Metal_Used": scrap_metal_used,
+        "Production_Volume": demand,
+    })
+
+
+def write_production_csv(path, periods, seed=0):
+    """Writes make_production_data(periods) to ``path`` as an upload would arrive. Returns the path."""
+    make_production_data(periods, seed).to_csv(path, index=False)
+    return path
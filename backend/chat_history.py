@@ -0,0 +1,106 @@
+import sys
+
+# --- Chat History ---
+# The conversation is an append-only log: every message gets a sequence number
+# and responses carry only the messages after the client's cursor, so payloads
+# stay small however long the session runs. Once the log exceeds its size
+# budget, all but the most recent messages are compacted into one summary
+# message; clients whose cursor points into the compacted part receive the
+# whole (compacted) log again and replace what they have.
+
+SUMMARY_LINE_CHARS = 160  # each compacted message becomes one line of at most this length
+SUMMARY_MAX_LINES = 50
+
+ROLE_LABELS = {"user": "You", "bot": "Assistant"}
+
+
+def _summary_line(message):
+    text = " ".join(message["content"].split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 1] + "…"
+    return f"- {ROLE_LABELS.get(message['role'], message['role'])}: {text}"
+
+
+class ChatHistory:
+    """
+    Sequence-numbered chat messages with compaction.
+
+    Args:
+        max_chars: Size budget of the message contents; None disables compaction.
+        keep_recent: Messages never compacted, counted from the end.
+        messages: Initial {"role", "content"} dicts (e.g. a plain list from
+            an older session).
+    """
+
+    def __init__(self, max_chars=20000, keep_recent=20, messages=()):
+        self.max_chars = max_chars
+        self.keep_recent = keep_recent
+        self.messages = []
+        self.next_seq = 1
+        self.compacted_through = 0  # highest sequence number folded into the summary
+        self.summary_lines = []
+        self.summary_dropped = 0  # compacted messages no longer listed in the summary
+        self.chars = 0
+        for message in messages:
+            self.append(message)
+
+    @property
+    def cursor(self):
+        """Sequence number of the latest message; clients send it back to get only newer ones."""
+        return self.next_seq - 1
+
+    def append(self, message):
+        message = {**message, "seq": self.next_seq}
+        self.next_seq += 1
+        self.messages.append(message)
+        self.chars += len(message["content"])
+        if self.max_chars is not None and self.chars > self.max_chars:
+            self.compact()
+        return message
+
+    def since(self, cursor=None):
+        """
+        (messages, reset): the messages after ``cursor``, or with reset=True
+        the whole log when the client has no cursor or its cursor predates
+        the last compaction.
+        """
+        if cursor is None or cursor < self.compacted_through or cursor > self.cursor:
+            return list(self.messages), True
+        return [m for m in self.messages if m["seq"] > cursor], False
+
+    def added_since(self, cursor):
+        """Messages appended after ``cursor`` and not compacted since, without sequence numbers."""
+        return [{k: v for k, v in m.items() if k != "seq"} for m in self.messages
+                if m["seq"] > cursor and not m.get("summary")]
+
+    def compact(self):
+        """Folds all but the ``keep_recent`` latest messages into the summary message."""
+        start = 1 if self.messages and self.messages[0].get("summary") else 0
+        end = len(self.messages) - self.keep_recent
+        if end <= start:
+            return
+        folded = self.messages[start:end]
+        self.summary_lines.extend(_summary_line(m) for m in folded)
+        if len(self.summary_lines) > SUMMARY_MAX_LINES:
+            self.summary_dropped += len(self.summary_lines) - SUMMARY_MAX_LINES
+            del self.summary_lines[:-SUMMARY_MAX_LINES]
+        self.compacted_through = folded[-1]["seq"]
+
+        header = f"🗂️ **Earlier conversation ({self.compacted_through} messages, summarized):**"
+        if self.summary_dropped:
+            header += f"\n- … {self.summary_dropped} earlier messages"
+        summary = {"role": "bot", "content": "\n".join([header] + self.summary_lines),
+                   "seq": self.compacted_through, "summary": True}
+        self.messages[:end] = [summary]
+        self.chars = sum(len(m["content"]) for m in self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __sizeof__(self):
+        # Counted by session_store.estimate_session_size through sys.getsizeof
+        return object.__sizeof__(self) + sys.getsizeof(self.messages) + sum(
+            sys.getsizeof(m["content"]) + sys.getsizeof(m) for m in self.messages)
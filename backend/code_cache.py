@@ -0,0 +1,174 @@
+import contextlib
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# --- Generated Code Cache ---
+# Persistent SQLite cache of LLM-generated optimization code. Entries are keyed
+# on a normalized hash of the business profile (the answers in user_data) and
+# the uploaded data's schema (column names and kinds), so sessions describing
+# the same business with the same data layout reuse the earlier generation.
+# A second table keeps repairs of failed code: the fixed code for a given piece
+# of code and error signature, so the same failure is not sent to the LLM twice.
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return sorted((_normalize(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    return value
+
+
+def _dtype_kind(dtype):
+    """int, float, bool, datetime or text: storage widths (int8 vs int64) depend on the values, not the layout."""
+    name = str(dtype).lower()
+    if name.startswith(("int", "uint")):
+        return "int"
+    if name.startswith("float"):
+        return "float"
+    if name.startswith("bool"):
+        return "bool"
+    if name.startswith("datetime"):
+        return "datetime"
+    return "text"
+
+
+def make_cache_key(user_data, df):
+    """Returns a stable hash of the business profile and the DataFrame schema."""
+    schema = [[str(column), _dtype_kind(dtype)] for column, dtype in df.dtypes.items()] if df is not None else []
+    payload = {"profile": _normalize(user_data or {}), "schema": schema}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class CodeCache:
+    def __init__(self, path="code_cache.sqlite3", max_entries=1000, ttl=7 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.repair_hits = 0
+        self.lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS generated_code (
+                    key TEXT PRIMARY KEY,
+                    code TEXT NOT NULL,
+                    problem_type TEXT,
+                    response_content TEXT,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_generated_code_last_used ON generated_code (last_used_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS code_repairs (
+                    key TEXT PRIMARY KEY,
+                    code TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )
+            """)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back) its transaction and is closed when the block ends."""
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Returns {"code", "problem_type", "response_content"} or None on a miss."""
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT code, problem_type, response_content, created_at FROM generated_code WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[3] > self.ttl):
+                if row is not None:
+                    conn.execute("DELETE FROM generated_code WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute("UPDATE generated_code SET last_used_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return {"code": row[0], "problem_type": row[1], "response_content": row[2]}
+
+    def contains(self, key):
+        """Whether a fresh entry exists, without counting a hit or miss or touching it."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT created_at FROM generated_code WHERE key = ?", (key,)).fetchone()
+        return row is not None and not (self.ttl and time.time() - row[0] > self.ttl)
+
+    def put(self, key, code, problem_type, response_content=None):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO generated_code (key, code, problem_type, response_content, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, code, problem_type, response_content, now, now)
+            )
+            self._evict(conn, now)
+
+    def invalidate(self, key):
+        with self.lock, self._connect() as conn:
+            conn.execute("DELETE FROM generated_code WHERE key = ?", (key,))
+
+    def _evict(self, conn, now):
+        for table in ("generated_code", "code_repairs"):
+            if self.ttl:
+                conn.execute(f"DELETE FROM {table} WHERE created_at < ?", (now - self.ttl,))
+            # Least recently used entries beyond max_entries are dropped
+            conn.execute(f"""
+                DELETE FROM {table} WHERE key IN (
+                    SELECT key FROM {table} ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    # --- Repairs ---
+
+    @staticmethod
+    def _repair_key(code, error_signature):
+        return hashlib.sha256(f"{code}\x00{error_signature}".encode("utf-8")).hexdigest()
+
+    def get_repair(self, code, error_signature):
+        """Returns the repaired code for ``code`` failing with ``error_signature``, or None."""
+        key = self._repair_key(code, error_signature)
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            row = conn.execute("SELECT code, created_at FROM code_repairs WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl and now - row[1] > self.ttl):
+                return None
+            conn.execute("UPDATE code_repairs SET last_used_at = ? WHERE key = ?", (now, key))
+            self.repair_hits += 1
+            return row[0]
+
+    def put_repair(self, code, error_signature, repaired_code):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO code_repairs (key, code, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (self._repair_key(code, error_signature), repaired_code, now, now)
+            )
+            self._evict(conn, now)
+
+    def stats(self):
+        with self.lock, self._connect() as conn:
+            size = conn.execute("SELECT COUNT(*) FROM generated_code").fetchone()[0]
+            repairs = conn.execute("SELECT COUNT(*) FROM code_repairs").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": size,
+            "repairs": repairs,
+            "repair_hits": self.repair_hits,
+        }
@@ -0,0 +1,203 @@
+import ast
+import re
+
+# --- Generated Code Checks and Repair ---
+# Code extracted from an AI response is sanitized on its syntax tree (the
+# __main__ block and print() statements are removed) and checked statically
+# before it is sent to a solver: it has to parse, define an entry function that
+# takes the data (see find_entry_point) and stay away from modules and
+# builtins that reach outside the sandbox. When a check or a run fails, the
+# error is reduced to a signature (the exception without line numbers,
+# addresses or paths) and the code, error and traceback are sent back to the
+# LLM for a fix.
+
+BANNED_MODULES = frozenset({
+    "os", "sys", "subprocess", "shutil", "socket", "requests", "urllib", "http", "ftplib",
+    "multiprocessing", "threading", "ctypes", "importlib", "builtins", "pathlib", "pickle",
+})
+BANNED_CALLS = frozenset({"eval", "exec", "compile", "__import__", "open", "input", "breakpoint"})
+MAX_TRACEBACK_LINES = 30
+ENTRY_POINT_HINTS = ("solve", "optimiz")
+
+
+def find_entry_point(tree):
+    """
+    Name of the function run_code calls with the data, or None.
+
+    Candidates are top-level functions taking at least one positional argument.
+    Helpers called by other top-level functions are skipped; among the rest a
+    name containing "solve" or "optimiz" wins, otherwise the last one defined.
+    """
+    functions = [node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    candidates = [f for f in functions if f.args.posonlyargs or f.args.args or f.args.vararg]
+    if not candidates:
+        return None
+    called = set()
+    for function in functions:
+        for node in ast.walk(function):
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id != function.name:
+                called.add(node.func.id)
+    roots = [f for f in candidates if f.name not in called] or candidates
+    for function in roots:
+        if any(hint in function.name.lower() for hint in ENTRY_POINT_HINTS):
+            return function.name
+    return roots[-1].name
+
+
+def unaccepted_parameters(code_string, parameters):
+    """Names in ``parameters`` the entry function of ``code_string`` cannot take as keyword arguments."""
+    tree = ast.parse(code_string)
+    name = find_entry_point(tree)
+    function = next((node for node in tree.body if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == name), None)
+    if function is None:
+        return list(parameters)
+    if function.args.kwarg is not None:
+        return []
+    # The first positional argument receives the data; positional-only ones cannot be passed by name
+    positional = function.args.posonlyargs + function.args.args
+    accepted = {arg.arg for arg in function.args.args + function.args.kwonlyargs if arg is not positional[0]}
+    return [p for p in parameters if p not in accepted]
+
+
+def _is_main_guard(node):
+    test = node.test if isinstance(node, ast.If) else None
+    return (isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+            and len(test.comparators) == 1 and isinstance(test.comparators[0], ast.Constant)
+            and test.comparators[0].value == "__main__")
+
+
+def _is_print(node):
+    return (isinstance(node, ast.Expr) and isinstance(node.value, ast.Call)
+            and isinstance(node.value.func, ast.Name) and node.value.func.id == "print")
+
+
+def sanitize_code(code_string):
+    """
+    Removes the top-level ``if __name__ == "__main__"`` block and print() statements.
+
+    Statements are found on the syntax tree, so nested parentheses and
+    multi-line calls are handled; their source lines are deleted, keeping the
+    comments and formatting of the rest. Code that does not parse is returned
+    unchanged for precheck() to report.
+    """
+    try:
+        tree = ast.parse(code_string)
+    except SyntaxError:
+        return code_string
+
+    removals = [node for node in tree.body if _is_main_guard(node)]
+    kept_body = [node for node in tree.body if not _is_main_guard(node)]
+    for parent in [node for top in kept_body for node in ast.walk(top)] + [tree]:
+        for field in ("body", "orelse", "finalbody"):
+            block = getattr(parent, field, None)
+            if not isinstance(block, list):
+                continue
+            prints = [node for node in block if _is_print(node)]
+            if not prints:
+                continue
+            removals.extend(prints)
+            if len(prints) == len(block):
+                # Keep the block valid: the first print becomes "pass"
+                prints[0].replace_with_pass = True
+    if not removals:
+        return code_string
+
+    # Offsets in the syntax tree count UTF-8 bytes
+    lines = code_string.encode("utf-8").splitlines(keepends=True)
+    for node in sorted(removals, key=lambda n: n.lineno, reverse=True):
+        start, end = node.lineno - 1, node.end_lineno
+        before = lines[start][:node.col_offset]
+        after = lines[end - 1][node.end_col_offset:].strip()
+        if before.strip() or (after and not after.startswith(b"#")):
+            # Shares a line with another statement; fall back to regenerating the source
+            return _sanitize_by_unparse(tree)
+        lines[start:end] = [before + b"pass\n"] if getattr(node, "replace_with_pass", False) else []
+    return b"".join(lines).decode("utf-8").strip()
+
+
+def _sanitize_by_unparse(tree):
+    tree.body = [node for node in tree.body if not _is_main_guard(node)]
+    for parent in ast.walk(tree):
+        for field in ("body", "orelse", "finalbody"):
+            block = getattr(parent, field, None)
+            if isinstance(block, list) and any(_is_print(node) for node in block):
+                kept = [node for node in block if not _is_print(node)]
+                setattr(parent, field, kept or [ast.Pass()])
+    return ast.unparse(ast.fix_missing_locations(tree))
+
+
+def precheck(code_string, tree=None):
+    """Cheap static checks of generated code. Returns an error message, or None if the code looks runnable.
+
+    ``tree`` is the already parsed ``code_string``, if available.
+    """
+    if tree is None:
+        try:
+            tree = ast.parse(code_string)
+        except SyntaxError as e:
+            return f"Syntax error in generated code: {e.msg} (line {e.lineno})"
+
+    if not any(isinstance(node, ast.FunctionDef) for node in tree.body):
+        return "No function definition found in generated code."
+    if find_entry_point(tree) is None:
+        return "No function in the generated code accepts the data as its first argument."
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or ""]
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in BANNED_CALLS:
+            return f"Generated code may not call {node.func.id}() (line {node.lineno})."
+        else:
+            continue
+        for module in modules:
+            if module.split(".")[0] in BANNED_MODULES:
+                return f"Generated code may not import {module} (line {node.lineno})."
+    return None
+
+
+def error_signature(error, stderr=""):
+    """Normalized form of an error, so the same failure of the same code maps to the same key."""
+    lines = [line.strip() for line in (stderr or "").strip().splitlines() if line.strip()]
+    exception_line = lines[-1] if lines else ""
+    text = f"{error}\n{exception_line}"
+    text = re.sub(r"0x[0-9a-fA-F]+", "0x?", text)
+    text = re.sub(r"(\"|')?(/|[A-Za-z]:\\)[^\s\"',]+", "<path>", text)
+    text = re.sub(r"\bline \d+", "line ?", text)
+    return " ".join(text.split())
+
+
+def traceback_tail(stderr, max_lines=MAX_TRACEBACK_LINES):
+    lines = (stderr or "").strip().splitlines()
+    return "\n".join(lines[-max_lines:])
+
+
+def build_repair_prompt(code_string, error, stderr, data_summary):
+    context = f"""
+    Uploaded Data (summary):
+    {data_summary}
+    """
+
+    prompt = f"""
+    The following Gurobi optimization code failed.
+
+    Code:
+    ```python
+    {code_string}
+    ```
+
+    Error: {error}
+
+    Traceback (last lines):
+    {traceback_tail(stderr) or 'Not available'}
+
+    Please fix the code so it runs on the data described in the context:
+    - Keep the same function name; it is called with the pandas DataFrame 'data' as its only argument
+    - Use only the column names that exist in the data
+    - Do not import os, sys, subprocess or other modules that access files, processes or the network
+    - Return the results as a dictionary, as before
+
+    Respond with the complete corrected code in a single ```python block.
+    """
+    return prompt, context
@@ -0,0 +1,231 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from results import ResultFrame
+
+# --- Prompt Context Builder ---
+# Prompts get compact summaries instead of raw data: per-column statistics and
+# a few preview rows of the dataset, aggregates and the largest decisions of a
+# result, and excerpts of long documents. Every section is cut to a token
+# budget, and summaries are memoized on the session so follow-up questions
+# reuse them until the underlying data changes.
+
+CHARS_PER_TOKEN = 4  # rough average for English text and numbers
+DEFAULT_BUDGET = 6000
+TRUNCATION_MARK = "\n... [truncated, about {} more tokens]"
+
+
+def estimate_tokens(text):
+    """Approximate number of tokens in ``text``."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_to_budget(text, max_tokens):
+    """Cuts ``text`` to about ``max_tokens`` tokens, at a line or word boundary when possible."""
+    text = text or ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max(0, max_tokens * CHARS_PER_TOKEN)
+    cut = text.rfind("\n", 0, limit)
+    if cut < limit // 2:
+        cut = text.rfind(" ", 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut].rstrip() + TRUNCATION_MARK.format(estimate_tokens(text[cut:]))
+
+
+def chunk_text(text, max_tokens, overlap_tokens=0):
+    """Splits ``text`` into chunks of about ``max_tokens`` tokens, preferring paragraph and line breaks."""
+    text = text or ""
+    size = max(1, max_tokens * CHARS_PER_TOKEN)
+    overlap = min(overlap_tokens * CHARS_PER_TOKEN, size // 2)
+    chunks, start = [], 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            for separator in ("\n\n", "\n", ". ", " "):
+                cut = text.rfind(separator, start + size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _format_value(value):
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.6g}"
+    return str(value)
+
+
+def format_user_data(user_data, max_tokens=800):
+    """Business profile answers as "- Key: value" lines."""
+    lines = []
+    for key, value in (user_data or {}).items():
+        if isinstance(value, (list, tuple)):
+            value = ", ".join(str(v) for v in value)
+        lines.append(f"- {str(key).replace('_', ' ').title()}: {value}")
+    return truncate_to_budget("\n".join(lines) or "Not specified", max_tokens)
+
+
+def summarize_dataset(dataset, preview_rows=5, max_tokens=1500):
+    """
+    Shape, per-column statistics and the first rows of a dataset.
+
+    Works on a StoredDataset (using the statistics gathered at upload, so no
+    data has to be read beyond the preview) or on a pandas DataFrame.
+    """
+    if dataset is None:
+        return "No data uploaded"
+    if isinstance(dataset, pd.DataFrame):
+        head = dataset.head(preview_rows)
+        stats = {}
+        for column in dataset.columns:
+            series = dataset[column]
+            numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+            stats[column] = {
+                "dtype": str(series.dtype),
+                "null_count": int(series.isna().sum()),
+                "min": series.min() if numeric and series.notna().any() else None,
+                "max": series.max() if numeric and series.notna().any() else None,
+            }
+    else:
+        head = dataset.head(preview_rows)
+        stats = dataset.stats
+    num_rows, num_columns = dataset.shape
+
+    lines = [f"Rows: {num_rows}, Columns: {num_columns}", "Columns (dtype, nulls, min..max):"]
+    for column in dataset.columns:
+        info = stats.get(column, {})
+        line = f"- {column} ({info.get('dtype', '?')}, nulls {info.get('null_count', 0)}"
+        if info.get("min") is not None:
+            line += f", {_format_value(info['min'])}..{_format_value(info['max'])}"
+        lines.append(line + ")")
+    lines.append(f"First {len(head)} rows:")
+    lines.append(head.to_string(index=False, max_colwidth=30))
+    return truncate_to_budget("\n".join(lines), max_tokens)
+
+
+def summarize_results(results, top_k=5, max_tokens=1500):
+    """Scalar fields, per-series aggregates and the ``top_k`` largest decisions of a result."""
+    if results is None:
+        return "No optimization results"
+    frame = results if isinstance(results, ResultFrame) else ResultFrame.from_result(results)
+    lines = [f"{name}: {_format_value(value)}" for name, value in frame.scalars.items()]
+    if frame.num_rows:
+        lines.append(f"Series over {frame.num_rows} rows (total, mean, min..max, nonzero rows; top {top_k}):")
+    for name, values in frame.columns.items():
+        present = ~np.isnan(values)
+        if not present.any():
+            lines.append(f"- {name}: no values")
+            continue
+        valid = values[present]
+        line = (f"- {name}: total {_format_value(valid.sum())}, mean {_format_value(valid.mean())}, "
+                f"{_format_value(valid.min())}..{_format_value(valid.max())}, nonzero {int(np.count_nonzero(valid))}")
+        top = np.argsort(np.where(present, -np.abs(values), np.inf), kind="stable")[:min(top_k, int(present.sum()))]
+        line += "; top: " + ", ".join(f"{frame.index[i]}={_format_value(values[i])}" for i in top)
+        lines.append(line)
+    return truncate_to_budget("\n".join(lines), max_tokens)
+
+
+def excerpt_document(text, max_tokens=1500, chunk_tokens=300):
+    """The leading chunks of a long document that fit in ``max_tokens``."""
+    if not text:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    chunks = chunk_text(text, chunk_tokens)
+    selected, used = [], 0
+    for chunk in chunks:
+        tokens = estimate_tokens(chunk)
+        if used + tokens > max_tokens:
+            break
+        selected.append(chunk)
+        used += tokens
+    omitted = len(chunks) - len(selected)
+    return "\n\n".join(selected) + f"\n... [{omitted} more of {len(chunks)} sections omitted]"
+
+
+def fingerprint(*parts):
+    """Short stable hash used as memoization key."""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(part.tobytes())
+        else:
+            digest.update(repr(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def memoized(session_data, name, key, build):
+    """Returns the summary ``name`` cached on the session for ``key``, building it on a miss."""
+    summaries = session_data.setdefault("context_summaries", {})
+    entry = summaries.get(name)
+    if entry is not None and entry[0] == key:
+        return entry[1]
+    text = build()
+    summaries[name] = (key, text)
+    return text
+
+
+class ContextBuilder:
+    """Assembles prompt sections within a total token budget.
+
+    Sections are (title, text, share) tuples in priority order: each gets at
+    most ``share`` of the budget, and sections that no longer fit are cut.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET):
+        self.budget = budget
+
+    def build(self, sections):
+        parts, remaining = [], self.budget
+        for title, text, share in sections:
+            if not text or remaining <= 0:
+                continue
+            header = f"{title}:\n" if title else ""
+            allowed = min(int(self.budget * share), remaining) - estimate_tokens(header)
+            if allowed <= 0:
+                continue
+            body = truncate_to_budget(text, allowed)
+            parts.append(header + body)
+            remaining -= estimate_tokens(header + body)
+        return "\n\n".join(parts)
+
+    # --- Memoized per-session summaries ---
+
+    def dataset_summary(self, session_data, share=0.3):
+        dataset = session_data.get("uploaded_data")
+        if dataset is None:
+            return "No data uploaded"
+        key = fingerprint(getattr(dataset, "path", None) or id(dataset), dataset.shape, int(self.budget * share))
+        return memoized(session_data, "dataset", key,
+                        lambda: summarize_dataset(dataset, max_tokens=int(self.budget * share)))
+
+    def results_summary(self, session_data, share=0.3):
+        frame = session_data.get("result_frame")
+        if frame is None:
+            return summarize_results(session_data.get("optimization_results"), max_tokens=int(self.budget * share))
+        key = fingerprint(session_data.get("results_key") or frame.fingerprint(), int(self.budget * share))
+        return memoized(session_data, "results", key,
+                        lambda: summarize_results(frame, max_tokens=int(self.budget * share)))
+
+    def document_excerpt(self, session_data, share=0.2, query=None):
+        """Passages of the uploaded PDF most relevant to ``query`` (a DocumentIndex search)."""
+        document = session_data.get("pdf_index")
+        if document is not None:
+            return document.context(query, int(self.budget * share))
+        text = session_data.get("pdf_context")
+        if not text:
+            return ""
+        key = fingerprint(text, int(self.budget * share))
+        return memoized(session_data, "document", key,
+                        lambda: excerpt_document(text, max_tokens=int(self.budget * share)))
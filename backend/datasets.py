@@ -0,0 +1,292 @@
+import os
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# --- Uploaded Dataset Storage ---
+# Uploaded CSVs are streamed to disk and converted once, chunk by chunk, into an
+# uncompressed Arrow IPC file with downcast dtypes. Sessions only keep a small
+# StoredDataset handle; the data is memory-mapped back in when a solve or a
+# preview needs it, so peak memory during an upload is proportional to a chunk.
+# The downcast is for storage only: integer columns are widened back to int64
+# when read into pandas, so arithmetic in generated code cannot overflow, and
+# dictionary-encoded text columns are decoded back to plain strings, so
+# generated code sees the same text columns as with pd.read_csv.
+
+CSV_CHUNK_ROWS = 50_000
+MAX_CATEGORIES = 1000  # string columns with at most this many distinct values are stored as dictionaries
+MAX_WARNINGS = 20
+
+_INT_TYPES = [
+    (np.int8, pa.int8()),
+    (np.int16, pa.int16()),
+    (np.int32, pa.int32()),
+    (np.int64, pa.int64()),
+]
+
+
+def _decoded_type(field):
+    if pa.types.is_integer(field.type):
+        return pa.int64()
+    if pa.types.is_dictionary(field.type):
+        return field.type.value_type
+    return field.type
+
+
+def _decode_storage_types(table):
+    """Casts integer columns narrowed for storage back to int64 and decodes dictionary columns."""
+    schema = pa.schema([field.with_type(_decoded_type(field)) for field in table.schema])
+    return table if schema.equals(table.schema) else table.cast(schema)
+
+
+class StoredDataset:
+    """Picklable handle to a dataset stored as an Arrow IPC file."""
+
+    def __init__(self, path, num_rows, columns, dtypes, stats=None, preview=None, warnings=None):
+        self.path = path
+        self.num_rows = num_rows
+        self.columns = columns
+        self.dtypes = dtypes  # {column: pandas dtype name} as returned by to_pandas()
+        self.stats = stats or {}  # {column: {"dtype", "null_count", "min", "max", "distinct_count"}} gathered during ingestion
+        self.preview = preview or []  # first rows as records
+        self.warnings = warnings or []
+
+    @property
+    def shape(self):
+        return (self.num_rows, len(self.columns))
+
+    def touch(self):
+        """Marks the file as in use, so cleanup_uploads keeps it."""
+        try:
+            os.utime(self.path)
+        except OSError:
+            pass
+
+    def _open(self):
+        self.touch()
+        return pa.ipc.open_file(pa.memory_map(self.path, 'r'))
+
+    def head(self, n=5):
+        """Reads only as many record batches as needed for the first ``n`` rows."""
+        reader = self._open()
+        batches, rows = [], 0
+        for i in range(reader.num_record_batches):
+            if rows >= n:
+                break
+            batch = reader.get_batch(i)
+            batches.append(batch)
+            rows += batch.num_rows
+        if not batches:
+            return _decode_storage_types(reader.schema.empty_table()).to_pandas()
+        return _decode_storage_types(pa.Table.from_batches(batches).slice(0, n)).to_pandas()
+
+    def to_arrow(self):
+        return self._open().read_all()
+
+    def distinct_count(self, column):
+        """Number of distinct non-null values in ``column``, read from the memory-mapped file."""
+        return pc.count_distinct(self.to_arrow().column(column)).as_py()
+
+    def to_pandas(self):
+        return _decode_storage_types(self.to_arrow()).to_pandas()
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def _column_kind(series):
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_float_dtype(series):
+        return "float"
+    return "string"
+
+
+def _merge_kind(a, b):
+    if a is None or a == b:
+        return b
+    if {a, b} <= {"int", "float"}:
+        return "float"
+    return "string"
+
+
+def _arrow_type(stats):
+    kind = stats["kind"]
+    if kind == "int":
+        for np_type, pa_type in _INT_TYPES:
+            info = np.iinfo(np_type)
+            if info.min <= stats["min"] and stats["max"] <= info.max:
+                return pa_type
+        return pa.int64()
+    if kind == "float":
+        return pa.float64()
+    if kind == "bool":
+        return pa.bool_()
+    if stats["categories"] is not None:
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.string()
+
+
+def _to_json_scalar(value):
+    return value.item() if hasattr(value, "item") else value
+
+
+def _profile_chunk(chunk, profile, first_row, warnings):
+    """Validates one chunk and folds it into the running per-column statistics."""
+    for column in chunk.columns:
+        series = chunk[column]
+        stats = profile.setdefault(column, {"kind": None, "min": None, "max": None, "null_count": 0, "categories": set()})
+        nulls = int(series.isna().sum())
+        stats["null_count"] += nulls
+        if nulls == len(series):
+            continue  # empty chunk for this column tells us nothing about its type
+        kind = _column_kind(series)
+        merged = _merge_kind(stats["kind"], kind)
+        if stats["kind"] in ("int", "float") and merged == "string" and len(warnings) < MAX_WARNINGS:
+            warnings.append(f"Column '{column}' has non-numeric values from row {first_row + 1} onwards; it is stored as text.")
+        stats["kind"] = merged
+        if kind in ("int", "float") and merged in ("int", "float"):
+            lo, hi = _to_json_scalar(series.min()), _to_json_scalar(series.max())
+            stats["min"] = lo if stats["min"] is None else min(stats["min"], lo)
+            stats["max"] = hi if stats["max"] is None else max(stats["max"], hi)
+        if merged == "string" and (kind != "string" or stats["min"] is not None):
+            # Numbers parsed in this or earlier chunks may not round-trip to the
+            # text the second pass reads, so don't dictionary-encode the column
+            stats["min"] = stats["max"] = None
+            stats["categories"] = None
+        if stats["categories"] is not None and merged == "string":
+            stats["categories"].update(series.dropna().astype(str).unique())
+            if len(stats["categories"]) > MAX_CATEGORIES:
+                stats["categories"] = None
+
+
+def _read_chunks(csv_path, chunk_rows, progress, stage, dtype=None):
+    """Yields ``(chunk, first_row)`` and reports the fraction of the file consumed so far."""
+    total_bytes = os.path.getsize(csv_path) or 1
+    first_row = 0
+    with open(csv_path, 'rb') as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_rows, dtype=dtype):
+            yield chunk, first_row
+            first_row += len(chunk)
+            if progress:
+                progress(stage, min(f.tell() / total_bytes, 1.0), first_row)
+
+
+def _chunk_to_batch(chunk, schema, dictionaries):
+    arrays = []
+    for field in schema:
+        series = chunk[field.name]
+        if pa.types.is_dictionary(field.type):
+            # IPC files allow one dictionary per field, so every chunk is encoded
+            # against the categories collected in the first pass
+            dictionary = dictionaries[field.name]
+            codes = pd.Categorical(series, categories=dictionary.to_pandas()).codes
+            indices = pa.array(codes, type=pa.int32(), mask=codes < 0)
+            array = pa.DictionaryArray.from_arrays(indices, dictionary)
+        elif pa.types.is_string(field.type):
+            values = series.astype(object).where(series.notna(), None)
+            array = pa.array(values, type=pa.string(), from_pandas=True)
+        else:
+            array = pa.array(series, from_pandas=True).cast(field.type)
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def save_upload(file, upload_dir, suffix=".csv"):
+    """Streams an uploaded file (werkzeug FileStorage) to disk and returns its path."""
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, f"{uuid.uuid4().hex}{suffix}")
+    file.save(path)
+    return path
+
+
+def ingest_csv(csv_path, upload_dir, chunk_rows=CSV_CHUNK_ROWS, progress=None):
+    """Converts a CSV on disk to an Arrow IPC file in two chunked passes and returns a StoredDataset.
+
+    The first pass validates each chunk and keeps running statistics (row count,
+    null counts, min/max, settled column types, so e.g. an integer column that
+    contains a float later is stored as float); the second pass casts every
+    chunk to that schema and appends it to the file. ``progress(stage, fraction,
+    rows)`` is called after every chunk with stage "validating" or "converting".
+    """
+    profile = {}
+    columns = None
+    preview = []
+    warnings = []
+    num_rows = 0
+    for chunk, first_row in _read_chunks(csv_path, chunk_rows, progress, "validating"):
+        if columns is None:
+            columns = [str(c) for c in chunk.columns]
+            if len(set(columns)) != len(columns) or any(c.startswith("Unnamed:") for c in columns):
+                warnings.append("Some columns have missing or duplicate names.")
+            head = chunk.head()
+            preview = head.astype(object).where(head.notna(), None).to_dict(orient='records')
+        chunk.columns = columns
+        _profile_chunk(chunk, profile, first_row, warnings)
+        num_rows += len(chunk)
+    if columns is None:
+        raise ValueError("The uploaded file is empty.")
+
+    for column, stats in profile.items():
+        if stats["kind"] is None:
+            stats["kind"] = "string"
+            stats["categories"] = None
+            if num_rows and len(warnings) < MAX_WARNINGS:
+                warnings.append(f"Column '{column}' is empty.")
+    schema = pa.schema([pa.field(column, _arrow_type(profile[column])) for column in columns])
+    dictionaries = {
+        field.name: pa.array(sorted(profile[field.name]["categories"]), type=pa.string())
+        for field in schema if pa.types.is_dictionary(field.type)
+    }
+
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, f"{uuid.uuid4().hex}.arrow")
+    # Read text columns as text so values like "007" or "1" are not re-parsed as numbers
+    text_columns = {column: str for column in columns if profile[column]["kind"] == "string"}
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk, _ in _read_chunks(csv_path, chunk_rows, progress, "converting", dtype=text_columns):
+            chunk.columns = columns
+            writer.write_batch(_chunk_to_batch(chunk, schema, dictionaries))
+
+    dtypes = {field.name: str(dtype) for field, dtype in zip(schema, _decode_storage_types(schema.empty_table()).to_pandas().dtypes)}
+    stats = {
+        column: {
+            "dtype": dtypes[column],
+            "null_count": profile[column]["null_count"],
+            "min": profile[column]["min"],
+            "max": profile[column]["max"],
+            # Known for text columns stored as dictionaries, None otherwise
+            "distinct_count": (len(profile[column]["categories"])
+                               if profile[column]["kind"] == "string" and profile[column]["categories"] is not None else None),
+        }
+        for column in columns
+    }
+    return StoredDataset(path, num_rows, columns, dtypes, stats=stats, preview=preview, warnings=warnings)
+
+
+def cleanup_uploads(upload_dir, max_age):
+    """
+    Deletes stored datasets that have not been touched for ``max_age`` seconds.
+
+    Files are touched whenever a dataset is opened and whenever its session
+    is loaded (see StoredDataset.touch), so only abandoned uploads expire.
+    """
+    if not os.path.isdir(upload_dir):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(upload_dir):
+        path = os.path.join(upload_dir, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,166 @@
+import multiprocessing
+import re
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+
+from context_builder import chunk_text, estimate_tokens
+
+# --- PDF Retrieval Index ---
+# Uploaded PDFs are extracted page by page (page ranges in parallel worker
+# processes for long documents), split into passages and indexed with BM25
+# over a sparse term matrix. Prompts then include only the passages most
+# relevant to the question, so their size stays flat as documents grow.
+
+PAGES_PER_TASK = 16
+CHUNK_TOKENS = 200
+CHUNK_OVERLAP_TOKENS = 20
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def _extract_page_range(path, start, end):
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def count_pages(path):
+    from PyPDF2 import PdfReader
+    return len(PdfReader(path).pages)
+
+
+class BM25Index:
+    """Okapi BM25 over a list of passages, with precomputed sparse term weights."""
+
+    def __init__(self, passages, k1=BM25_K1, b=BM25_B):
+        vocabulary = {}
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(passages), dtype=np.float64)
+        for row, passage in enumerate(passages):
+            terms = Counter(tokenize(passage))
+            lengths[row] = sum(terms.values())
+            for term, count in terms.items():
+                rows.append(row)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+                counts.append(count)
+        term_counts = sp.csr_matrix((np.asarray(counts, dtype=np.float64), (rows, cols)),
+                                    shape=(len(passages), len(vocabulary)))
+
+        num_passages = max(len(passages), 1)
+        document_frequency = np.bincount(term_counts.indices, minlength=len(vocabulary))
+        idf = np.log((num_passages - document_frequency + 0.5) / (document_frequency + 0.5) + 1.0)
+        average_length = lengths.mean() if len(passages) and lengths.mean() > 0 else 1.0
+
+        # weight[d, t] = idf[t] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len[d] / avg_len))
+        tf = term_counts.data
+        row_of_entry = np.repeat(np.arange(len(passages)), np.diff(term_counts.indptr))
+        norm = k1 * (1 - b + b * lengths[row_of_entry] / average_length)
+        weights = term_counts.copy()
+        weights.data = idf[term_counts.indices] * tf * (k1 + 1) / (tf + norm)
+        self.weights = weights.tocsc()  # column slices per query term
+        self.vocabulary = vocabulary
+
+    def scores(self, query):
+        term_ids = sorted({self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary})
+        if not term_ids:
+            return np.zeros(self.weights.shape[0])
+        return np.asarray(self.weights[:, term_ids].sum(axis=1)).ravel()
+
+    def top_k(self, query, k):
+        """Indices of the ``k`` best-scoring passages with a positive score, best first."""
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(i), float(scores[i])) for i in ranked if scores[i] > 0]
+
+
+class DocumentIndex:
+    """Passages of a document with their page numbers and a BM25 index over them."""
+
+    def __init__(self, name, pages, chunk_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+        self.name = name
+        self.num_pages = len(pages)
+        self.passages, self.passage_pages = [], []
+        for number, text in enumerate(pages, start=1):
+            for passage in chunk_text(text, chunk_tokens, overlap_tokens):
+                self.passages.append(passage)
+                self.passage_pages.append(number)
+        self.num_tokens = sum(estimate_tokens(p) for p in self.passages)
+        self.index = BM25Index(self.passages)
+
+    def search(self, query, k=5):
+        return [
+            {"page": self.passage_pages[i], "score": score, "text": self.passages[i]}
+            for i, score in self.index.top_k(query, k)
+        ]
+
+    def context(self, query, max_tokens, k=8):
+        """The most relevant passages for ``query`` that fit in ``max_tokens``, in document order.
+
+        Without a query (or without matches) the leading passages are used.
+        """
+        ranked = [i for i, _ in self.index.top_k(query, k)] if query else []
+        if not ranked:
+            ranked = range(min(k, len(self.passages)))
+        selected, used = [], 0
+        for i in ranked:
+            tokens = estimate_tokens(self.passages[i])
+            if used + tokens > max_tokens:
+                continue
+            selected.append(i)
+            used += tokens
+        return "\n\n".join(f"[page {self.passage_pages[i]}] {self.passages[i]}" for i in sorted(selected))
+
+    def __sizeof__(self):
+        weights = self.index.weights
+        return (object.__sizeof__(self) + sum(sys.getsizeof(p) for p in self.passages)
+                + weights.data.nbytes + weights.indices.nbytes + weights.indptr.nbytes
+                + sys.getsizeof(self.index.vocabulary))
+
+
+class PdfIndexer:
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.executor = None
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def extract_pages(self, path, progress=None):
+        """Text of every page; documents longer than PAGES_PER_TASK are split across worker processes."""
+        num_pages = count_pages(path)
+        if num_pages <= PAGES_PER_TASK or self.workers <= 1:
+            return _extract_page_range(path, 0, num_pages)
+        executor = self._executor()
+        futures = [executor.submit(_extract_page_range, path, start, min(start + PAGES_PER_TASK, num_pages))
+                   for start in range(0, num_pages, PAGES_PER_TASK)]
+        pages = []
+        for done, future in enumerate(futures, start=1):
+            pages.extend(future.result())
+            if progress:
+                progress(done / len(futures))
+        return pages
+
+    def build(self, path, name, progress=None):
+        """Extracts, chunks and indexes a PDF on disk. Returns a DocumentIndex."""
+        return DocumentIndex(name, self.extract_pages(path, progress))
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
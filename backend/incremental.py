@@ -0,0 +1,96 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from samplegurobi import build_production_model_matrix, extract_production_results, update_production_model, model_statistics
+from solve_control import SolveController
+
+# --- Incremental What-If Solves ---
+# Built production models are kept per session together with their last
+# solution. A what-if ("what if storage is 600?") edits the right-hand sides of
+# the existing model and re-optimizes from the previous solution instead of
+# rebuilding and solving from scratch.
+#
+# Every solve applies a complete parameter set: the defaults of
+# build_production_model_matrix plus the values passed in. A cached model and a
+# freshly built one (after eviction, a restart or on another worker) therefore
+# always solve the same model.
+
+_BUILD_PARAMETERS = inspect.signature(build_production_model_matrix).parameters
+DEFAULT_PARAMETERS = {name: float(_BUILD_PARAMETERS[name].default) for name in
+                      ("max_storage", "initial_inventory", "max_raw_material", "initial_raw_material", "max_production_change")}
+
+
+class ProductionModelCache:
+    def __init__(self, max_models=16, ttl=1800):
+        self.max_models = max_models
+        self.ttl = ttl
+        self.entries = OrderedDict()  # {session_id: {"model", "variables", "data_key", "lock", "last_used"}}
+        self.lock = threading.Lock()
+
+    def _entry(self, session_id, data_key):
+        with self.lock:
+            entry = self.entries.get(session_id)
+            if entry is not None and (entry["data_key"] != data_key or time.time() - entry["last_used"] > self.ttl):
+                self._dispose(session_id)
+                entry = None
+            if entry is None:
+                entry = {"model": None, "variables": None, "data_key": data_key, "lock": threading.Lock(), "last_used": time.time()}
+                self.entries[session_id] = entry
+                while len(self.entries) > self.max_models:
+                    self._dispose(next(iter(self.entries)))
+            entry["last_used"] = time.time()
+            self.entries.move_to_end(session_id)
+            return entry
+
+    def solve(self, session_id, data_key, load_data, controller=None, **parameters):
+        """
+        Solves the production model for a session, reusing its built model when possible.
+
+        Args:
+            data_key: Identifies the dataset; a different key rebuilds the model.
+            load_data: Callable returning the DataFrame, only called when a model has to be built.
+            controller: SolveController with the time/gap budget and incumbent callback;
+                        defaults to the standard tier.
+            parameters: Any of the DEFAULT_PARAMETERS; the others take their
+                        defaults, not the values of an earlier solve.
+
+        Returns:
+            dict: The solve_production_optimization result plus 'warm_start' (whether
+                  an existing model was reused), 'solve_time' in seconds,
+                  'incumbents' and 'solver_stats' (see model_statistics).
+        """
+        unknown = set(parameters) - set(DEFAULT_PARAMETERS)
+        if unknown:
+            raise ValueError(f"Unknown model parameters: {', '.join(sorted(unknown))}")
+        parameters = {**DEFAULT_PARAMETERS, **{name: float(value) for name, value in parameters.items()}}
+        entry = self._entry(session_id, data_key)
+        with entry["lock"]:
+            start = time.perf_counter()
+            warm_start = entry["model"] is not None
+            if warm_start:
+                update_production_model(entry["model"], entry["variables"], **parameters)
+            else:
+                entry["data"] = load_data()
+                entry["model"], entry["variables"] = build_production_model_matrix(entry["data"], **parameters)
+            controller = controller or SolveController.for_tier()
+            controller.optimize(entry["model"])
+            result = extract_production_results(entry["model"], entry["variables"], entry["data"])
+            result["incumbents"] = controller.incumbents
+            result["parameters"] = dict(entry["variables"]["parameters"])
+            result["warm_start"] = warm_start
+            result["solve_time"] = time.perf_counter() - start
+            result["solver_stats"] = model_statistics(entry["model"])
+            return result
+
+    def discard(self, session_id):
+        with self.lock:
+            self._dispose(session_id)
+
+    def _dispose(self, session_id):
+        # Caller must hold self.lock
+        entry = self.entries.pop(session_id, None)
+        if entry is not None and entry["model"] is not None:
+            with entry["lock"]:
+                entry["model"].dispose()
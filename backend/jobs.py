@@ -0,0 +1,224 @@
+import logging
+import pickle
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from signing import PayloadSigner, SignatureError
+
+# --- Background Job Queue ---
+# Long-running optimization pipelines (LLM call + Gurobi solve) are run on a
+# bounded pool of worker threads so the Flask request thread can return a job
+# id immediately. Clients poll the job status and fetch the result when done.
+#
+# Job records live in a job store: in process memory by default, or in Redis
+# (SESSION_BACKEND=redis) so that with several server processes any of them
+# can report a job's status, return its result or cancel it. A job only runs
+# in the process it was submitted to.
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job function when the job has been cancelled."""
+
+
+class JobContext:
+    """Handle passed to a running job so it can report progress and check for cancellation."""
+
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.job_id = job_id
+        self.cancelled = False
+        self.checked_at = None
+
+    def progress(self, stage, message=None):
+        self.check_cancelled()
+        self.manager._update(self.job_id, stage=stage, message=message)
+
+    def is_cancelled(self):
+        # Also polled from solver callbacks, so a shared store is read at most every poll_interval seconds
+        now = time.monotonic()
+        if not self.cancelled and (self.checked_at is None or now - self.checked_at >= self.manager.store.poll_interval):
+            job = self.manager.store.get(self.job_id)
+            self.cancelled = job is None or job["cancel_requested"]
+            self.checked_at = now
+        return self.cancelled
+
+    def check_cancelled(self):
+        if self.is_cancelled():
+            raise JobCancelled()
+
+    def solve_slot(self):
+        """Context manager limiting how many Gurobi solves run at the same time."""
+        return self.manager.solve_semaphore
+
+
+class MemoryJobStore:
+    """Job records of this process, keeping at most ``max_finished_jobs`` finished ones."""
+
+    poll_interval = 0.0
+
+    def __init__(self, max_finished_jobs=500):
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = {}  # {job_id: {"status": ..., "stage": ..., "result": ..., ...}}
+        self.lock = threading.Lock()
+
+    def create(self, job):
+        with self.lock:
+            self.jobs[job["job_id"]] = job
+            self._prune_finished()
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id, **fields):
+        with self.lock:
+            if job_id in self.jobs:
+                self.jobs[job_id].update(fields)
+
+    def _prune_finished(self):
+        # Caller must hold self.lock
+        finished = [j for j in self.jobs.values() if j["status"] in FINISHED_STATES]
+        if len(finished) <= self.max_finished_jobs:
+            return
+        finished.sort(key=lambda j: j["finished_at"] or 0)
+        for job in finished[:len(finished) - self.max_finished_jobs]:
+            del self.jobs[job["job_id"]]
+
+
+class RedisJobStore:
+    """Stores each job as a hash of pickled fields under ``prefix + job_id``, expiring ``ttl`` seconds after its last update.
+
+    Fields are written one by one, so a cancellation requested by one process
+    is not overwritten by the progress updates of the process running the job.
+    Each field is signed with ``signing_key`` (see signing.py); a job with a
+    field whose signature does not match is treated as missing.
+    ``client`` can be any Redis-compatible client (redis-py, fakeredis, ...).
+    """
+
+    poll_interval = 0.5
+
+    def __init__(self, client, signing_key, ttl=24 * 3600, prefix="inventory:job:"):
+        self.client = client
+        self.signer = PayloadSigner(signing_key)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, job_id):
+        return f"{self.prefix}{job_id}"
+
+    def create(self, job):
+        self._write(job["job_id"], job)
+
+    def get(self, job_id):
+        fields = self.client.hgetall(self._key(job_id))
+        if not fields:
+            return None
+        try:
+            payloads = {name.decode("utf-8") if isinstance(name, bytes) else name: self.signer.verify(value) for name, value in fields.items()}
+        except SignatureError:
+            logger.warning("Ignoring job %s with an invalid signature", job_id)
+            return None
+        return {name: pickle.loads(payload) for name, payload in payloads.items()}
+
+    def update(self, job_id, **fields):
+        if self.client.exists(self._key(job_id)):
+            self._write(job_id, fields)
+
+    def _write(self, job_id, fields):
+        key = self._key(job_id)
+        self.client.hset(key, mapping={name: self.signer.sign(pickle.dumps(value, protocol=5)) for name, value in fields.items()})
+        if self.ttl:
+            self.client.expire(key, self.ttl)
+
+
+def create_job_store(backend="memory", redis_url=None, ttl=24 * 3600, max_finished_jobs=500, signing_key=None):
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package.")
+        if not signing_key:
+            raise RuntimeError("SESSION_BACKEND=redis requires REDIS_SIGNING_KEY to be set.")
+        return RedisJobStore(redis.Redis.from_url(redis_url or "redis://localhost:6379/0"), signing_key, ttl=ttl)
+    return MemoryJobStore(max_finished_jobs=max_finished_jobs)
+
+
+class JobManager:
+    def __init__(self, max_workers=4, max_concurrent_solves=2, store=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="optimization-job")
+        self.solve_semaphore = threading.BoundedSemaphore(max_concurrent_solves)
+        self.store = store or MemoryJobStore()
+        self.futures = {}  # jobs submitted in this process that have not finished
+
+    def submit(self, func, *args, session_id=None, **kwargs):
+        """Queue ``func(context, *args, **kwargs)`` and return the new job id."""
+        job_id = uuid.uuid4().hex
+        self.store.create({
+            "job_id": job_id,
+            "session_id": session_id,
+            "status": JOB_QUEUED,
+            "stage": JOB_QUEUED,
+            "message": None,
+            "result": None,
+            "error": None,
+            "cancel_requested": False,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+        })
+        future = self.executor.submit(self._run, job_id, func, args, kwargs)
+        self.futures[job_id] = future
+        # Added after the assignment: runs at once if the job already finished
+        future.add_done_callback(lambda _: self.futures.pop(job_id, None))
+        return job_id
+
+    def _run(self, job_id, func, args, kwargs):
+        context = JobContext(self, job_id)
+        if context.is_cancelled():
+            self._update(job_id, status=JOB_CANCELLED, stage=JOB_CANCELLED, finished_at=time.time())
+            return
+        self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+        try:
+            result = func(context, *args, **kwargs)
+            self._update(job_id, status=JOB_COMPLETED, stage=JOB_COMPLETED, result=result, finished_at=time.time())
+        except JobCancelled:
+            self._update(job_id, status=JOB_CANCELLED, stage=JOB_CANCELLED, finished_at=time.time())
+        except Exception as e:
+            self._update(job_id, status=JOB_FAILED, stage=JOB_FAILED, error=str(e), finished_at=time.time())
+
+    def cancel(self, job_id):
+        """Request cancellation. Queued jobs are dropped; running jobs stop at the next stage boundary."""
+        job = self.store.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return False
+        self.store.update(job_id, cancel_requested=True)
+        future = self.futures.get(job_id)
+        if future is not None and future.cancel():
+            self._update(job_id, status=JOB_CANCELLED, stage=JOB_CANCELLED, finished_at=time.time())
+        return True
+
+    def status(self, job_id):
+        """Return a JSON-serializable snapshot of the job without its result payload."""
+        job = self.store.get(job_id)
+        if job is None:
+            return None
+        return {k: v for k, v in job.items() if k != "result"}
+
+    def result(self, job_id):
+        return self.store.get(job_id)
+
+    def _update(self, job_id, **fields):
+        self.store.update(job_id, **fields)
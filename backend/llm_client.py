@@ -0,0 +1,275 @@
+import asyncio
+import json
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx  # only needed by AsyncLLMClient (ASGI serving mode)
+except ImportError:
+    httpx = None
+
+from metrics import LLM_REQUEST_SECONDS, LLM_REQUESTS, LLM_RETRIES
+
+# --- Shared LLM HTTP Client ---
+# One keep-alive connection pool shared by all LLM calls, with retries and
+# exponential backoff, per-provider rate limiting and concurrency caps, and an
+# asyncio interface so several prompts can be in flight at once.
+# AsyncLLMClient is the asyncio-native counterpart used by the ASGI serving
+# mode (asgi.py): requests wait on the event loop instead of holding a thread.
+
+RETRYABLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` requests per second with bursts up to ``burst``."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _take(self):
+        """Takes a token and returns 0, or returns the seconds until one is available."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while (wait := self._take()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        if not self.rate:
+            return
+        while (wait := self._take()) > 0:
+            await asyncio.sleep(wait)
+
+
+def backoff_delay(attempt, base, maximum, response=None):
+    """Delay before retry ``attempt``: the response's Retry-After, else jittered exponential backoff."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), maximum)
+        except ValueError:
+            pass
+    delay = min(base * (2 ** attempt), maximum)
+    return delay * (0.5 + random.random() / 2)
+
+
+class LLMClient:
+    def __init__(self, max_retries=3, timeout=60, pool_size=20, backoff_base=0.5, backoff_max=30, providers=None):
+        """
+        Args:
+            max_retries (int): Retries after the first attempt for timeouts, connection errors and 429/5xx responses.
+            timeout (float): Per-attempt request timeout in seconds.
+            pool_size (int): Maximum keep-alive connections per host.
+            providers (dict): {name: {"rate": requests_per_second, "burst": int, "max_concurrency": int}}.
+        """
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+
+        self.rate_limiters = {}
+        self.semaphores = {}
+        for name, limits in (providers or {}).items():
+            self.rate_limiters[name] = RateLimiter(limits.get("rate", 0), limits.get("burst"))
+            self.semaphores[name] = threading.BoundedSemaphore(limits.get("max_concurrency", pool_size))
+
+    def _backoff(self, attempt, response=None):
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max, response)
+
+    def post_json(self, provider, url, payload, headers=None):
+        """POSTs ``payload`` and returns the decoded JSON body.
+
+        Raises the last ``requests`` exception once retries are exhausted; HTTP
+        errors carry the failing response on ``e.response``.
+        """
+        outcome = "error"
+        try:
+            with LLM_REQUEST_SECONDS.time(provider=provider, mode="request"):
+                result = self._post_json(provider, url, payload, headers)
+            outcome = "success"
+            return result
+        finally:
+            LLM_REQUESTS.inc(provider=provider, mode="request", outcome=outcome)
+
+    def _post_json(self, provider, url, payload, headers):
+        rate_limiter = self.rate_limiters.get(provider)
+        semaphore = self.semaphores.get(provider)
+        attempt = 0
+        while True:
+            if rate_limiter:
+                rate_limiter.acquire()
+            response = None
+            try:
+                if semaphore:
+                    with semaphore:
+                        response = self.http.post(url, headers=headers, json=payload, timeout=self.timeout)
+                else:
+                    response = self.http.post(url, headers=headers, json=payload, timeout=self.timeout)
+                if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    time.sleep(self._backoff(attempt, response))
+                    attempt += 1
+                    LLM_RETRIES.inc(provider=provider)
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                LLM_RETRIES.inc(provider=provider)
+
+    def stream_sse(self, provider, url, payload, headers=None):
+        """POSTs ``payload`` to a server-sent-events endpoint and yields each decoded ``data:`` JSON event.
+
+        Connection setup is retried like post_json; once the first event has
+        been yielded a failure is raised to the caller instead of retried.
+        """
+        outcome = "error"
+        start = time.perf_counter()
+        try:
+            yield from self._stream_sse(provider, url, payload, headers)
+            outcome = "success"
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider, mode="stream")
+            LLM_REQUESTS.inc(provider=provider, mode="stream", outcome=outcome)
+
+    def _stream_sse(self, provider, url, payload, headers):
+        rate_limiter = self.rate_limiters.get(provider)
+        semaphore = self.semaphores.get(provider)
+        attempt = 0
+        while True:
+            if rate_limiter:
+                rate_limiter.acquire()
+            if semaphore:
+                semaphore.acquire()
+            response = None
+            try:
+                try:
+                    response = self.http.post(url, headers=headers, json=payload, timeout=self.timeout, stream=True)
+                except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                    if attempt >= self.max_retries:
+                        raise
+                    time.sleep(self._backoff(attempt))
+                    attempt += 1
+                    LLM_RETRIES.inc(provider=provider)
+                    continue
+                if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    response.close()
+                    time.sleep(self._backoff(attempt, response))
+                    attempt += 1
+                    LLM_RETRIES.inc(provider=provider)
+                    continue
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    yield json.loads(data)
+                return
+            finally:
+                if response is not None:
+                    response.close()
+                if semaphore:
+                    semaphore.release()
+
+    async def apost_json(self, provider, url, payload, headers=None):
+        """Async variant of post_json; the blocking call runs on the default executor."""
+        return await asyncio.to_thread(self.post_json, provider, url, payload, headers)
+
+    def close(self):
+        self.http.close()
+
+
+class AsyncLLMClient:
+    """
+    asyncio-native variant of LLMClient.post_json on an httpx connection pool.
+
+    Retries, backoff, rate limits and metrics match LLMClient. Concurrency
+    caps are asyncio semaphores of the same sizes, so they apply to this
+    client's requests separately from the threaded client's. Failures are
+    raised as the corresponding ``requests`` exceptions, so callers handle
+    both clients alike. Create and close it on the event loop that uses it.
+    """
+
+    def __init__(self, max_retries=3, timeout=60, pool_size=20, backoff_base=0.5, backoff_max=30, providers=None):
+        if httpx is None:
+            raise RuntimeError("AsyncLLMClient needs the httpx package.")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.http = httpx.AsyncClient(timeout=timeout, limits=httpx.Limits(max_connections=None, max_keepalive_connections=pool_size))
+
+        self.rate_limiters = {}
+        self.semaphores = {}
+        for name, limits in (providers or {}).items():
+            self.rate_limiters[name] = RateLimiter(limits.get("rate", 0), limits.get("burst"))
+            self.semaphores[name] = asyncio.Semaphore(limits.get("max_concurrency", pool_size))
+
+    async def apost_json(self, provider, url, payload, headers=None):
+        outcome = "error"
+        start = time.perf_counter()
+        try:
+            result = await self._post_json(provider, url, payload, headers)
+            outcome = "success"
+            return result
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, provider=provider, mode="request")
+            LLM_REQUESTS.inc(provider=provider, mode="request", outcome=outcome)
+
+    async def _post_json(self, provider, url, payload, headers):
+        rate_limiter = self.rate_limiters.get(provider)
+        semaphore = self.semaphores.get(provider)
+        attempt = 0
+        while True:
+            if rate_limiter:
+                await rate_limiter.acquire_async()
+            try:
+                if semaphore:
+                    async with semaphore:
+                        response = await self.http.post(url, headers=headers, json=payload)
+                else:
+                    response = await self.http.post(url, headers=headers, json=payload)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt >= self.max_retries:
+                    error = requests.exceptions.Timeout if isinstance(e, httpx.TimeoutException) else requests.exceptions.ConnectionError
+                    raise error(str(e)) from e
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                attempt += 1
+                LLM_RETRIES.inc(provider=provider)
+                continue
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max, response))
+                attempt += 1
+                LLM_RETRIES.inc(provider=provider)
+                continue
+            if response.is_error:
+                raise requests.exceptions.HTTPError(f"{response.status_code} Error: {response.reason_phrase} for url: {url}", response=response)
+            return response.json()
+
+    async def aclose(self):
+        await self.http.aclose()
@@ -0,0 +1,189 @@
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Metrics ---
+# Minimal in-process counters, gauges and histograms rendered in the Prometheus
+# text exposition format on /metrics. Pipeline stages, routes and LLM calls are
+# timed into histograms; solver runs record status counters and Gurobi
+# statistics (runtime, MIP gap, nodes, model size), taken from the model for
+# the built-in models and parsed from the captured log for generated code.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    def __init__(self, name, kind, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.kind = kind  # "counter", "gauge" or "histogram"
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.values = {}  # {label values: number, or [bucket counts, sum, count] for histograms}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = sorted(self.values.items())
+            items = [(key, [list(v[0]), v[1], v[2]] if self.kind == "histogram" else v) for key, v in items]
+        for key, value in items:
+            if self.kind == "histogram":
+                counts, total, count = value
+                for bound, bucket_count in zip(self.buckets, counts):
+                    labels = _format_labels(self.label_names, key, [("le", _format_number(bound))])
+                    lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+                labels = _format_labels(self.label_names, key)
+                lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+            else:
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+
+    def _register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labels=()):
+        return self._register(Metric(name, "counter", documentation, labels))
+
+    def gauge(self, name, documentation, labels=()):
+        return self._register(Metric(name, "gauge", documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Metric(name, "histogram", documentation, labels, buckets))
+
+    def add_collector(self, collect):
+        """Registers ``collect()``, called before rendering to refresh gauges from other components."""
+        self.collectors.append(collect)
+
+    def render(self):
+        for collect in self.collectors:
+            collect()
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUEST_SECONDS = registry.histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+STAGE_SECONDS = registry.histogram("pipeline_stage_duration_seconds", "Latency of optimization pipeline stages.", ("stage",))
+LLM_REQUEST_SECONDS = registry.histogram("llm_request_duration_seconds", "LLM request latency including retries.", ("provider", "mode"))
+LLM_REQUESTS = registry.counter("llm_requests_total", "LLM requests by outcome.", ("provider", "mode", "outcome"))
+LLM_RETRIES = registry.counter("llm_retries_total", "Retried LLM request attempts.", ("provider",))
+LLM_TOKENS = registry.counter("llm_tokens_total", "LLM tokens reported by the provider.", ("provider", "kind"))
+SOLVES = registry.counter("solves_total", "Solver runs by source and result status.", ("source", "status"))
+GUROBI_RUNTIME = registry.histogram("gurobi_runtime_seconds", "Gurobi optimize() runtime.", ("source",))
+GUROBI_MIP_GAP = registry.histogram("gurobi_mip_gap", "Relative MIP gap at the end of a solve.", ("source",),
+                                    buckets=(0, 0.0001, 0.001, 0.01, 0.05, 0.1, 0.5, 1))
+GUROBI_NODES = registry.histogram("gurobi_node_count", "Branch-and-bound nodes explored.", ("source",),
+                                  buckets=(0, 1, 10, 100, 1000, 10_000, 100_000, 1_000_000))
+MODEL_VARIABLES = registry.histogram("gurobi_model_variables", "Variables in solved models.", ("source",),
+                                     buckets=(10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000))
+MODEL_CONSTRAINTS = registry.histogram("gurobi_model_constraints", "Constraints in solved models.", ("source",),
+                                       buckets=(10, 100, 1000, 10_000, 100_000, 1_000_000, 10_000_000))
+TEMPLATE_ROUTES = registry.counter("template_routes_total", "Optimization requests by built-in template (\"none\" went to the LLM).", ("template",))
+CACHE_EVENTS = registry.counter("cache_events_total", "Cache hits and misses by cache (copied from the caches' own stats).", ("cache", "event"))
+
+
+def record_llm_usage(provider, result):
+    """Adds the token counts reported in a Gemini or OpenAI response body."""
+    if not isinstance(result, dict):
+        return
+    usage = result.get("usageMetadata")
+    if usage:
+        LLM_TOKENS.inc(usage.get("promptTokenCount", 0), provider=provider, kind="prompt")
+        LLM_TOKENS.inc(usage.get("candidatesTokenCount", 0), provider=provider, kind="completion")
+        return
+    usage = result.get("usage")
+    if usage:
+        LLM_TOKENS.inc(usage.get("prompt_tokens", 0), provider=provider, kind="prompt")
+        LLM_TOKENS.inc(usage.get("completion_tokens", 0), provider=provider, kind="completion")
+
+
+_LOG_PATTERNS = {
+    "num_constraints": re.compile(r"Optimize a model with (\d+) rows"),
+    "num_variables": re.compile(r"Optimize a model with \d+ rows, (\d+) columns"),
+    "num_nonzeros": re.compile(r"columns and (\d+) nonzeros"),
+    "node_count": re.compile(r"Explored (\d+) nodes"),
+    "runtime": re.compile(r"(?:Explored \d+ nodes \(\d+ simplex iterations\) in|Solved in \d+ iterations and) ([\d.]+) seconds"),
+    "mip_gap": re.compile(r"best bound [-+\d.e]+, gap ([\d.]+|-)%"),
+}
+
+
+def parse_gurobi_log(log):
+    """Solver statistics found in a captured Gurobi log (the last solve wins)."""
+    stats = {}
+    for name, pattern in _LOG_PATTERNS.items():
+        matches = pattern.findall(log or "")
+        if matches and matches[-1] != "-":
+            value = float(matches[-1])
+            stats[name] = value / 100 if name == "mip_gap" else value
+    return stats
+
+
+def record_solve(source, status, stats=None):
+    """Counts a solver run and records its statistics (see parse_gurobi_log / model_statistics)."""
+    SOLVES.inc(source=source, status=status or "UNKNOWN")
+    stats = stats or {}
+    for metric, key in ((GUROBI_RUNTIME, "runtime"), (GUROBI_MIP_GAP, "mip_gap"), (GUROBI_NODES, "node_count"),
+                        (MODEL_VARIABLES, "num_variables"), (MODEL_CONSTRAINTS, "num_constraints")):
+        value = stats.get(key)
+        if value is not None and not (isinstance(value, float) and math.isinf(value)):
+            metric.observe(value, source=source)
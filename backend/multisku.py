@@ -0,0 +1,245 @@
+import heapq
+import logging
+
+import pandas as pd
+import numpy as np
+import scipy.sparse as sp
+import gurobipy as gp
+from gurobipy import GRB
+
+from samplegurobi import model_statistics
+from solve_control import SolveController, status_name
+
+COST_COLUMNS = ['Raw_Material_Cost', 'Labour_Cost', 'Electricity_Cost', 'Transportation_Cost',
+                'Commission_Cost', 'Warehousing_Cost']
+VALUE_COLUMNS = COST_COLUMNS + ['Revenue', 'Scrap_Metal_Used', 'Production_Volume']
+KEY_SEPARATOR = "|"
+
+logger = logging.getLogger(__name__)
+
+
+def _chain_matrix(chain_ids, period_positions):
+    """
+    Sparse difference matrix for state carried from period to period.
+
+    Row i of the result is x[i] - x[prev(i)], where prev(i) is the row of the
+    same chain (e.g. the same SKU at the same site) in the latest earlier period
+    present in the data; rows without a predecessor are just x[i]. Also returns
+    a boolean mask of those first rows.
+    """
+    n = len(chain_ids)
+    order = np.lexsort((period_positions, chain_ids))
+    sorted_chains = chain_ids[order]
+    is_first_sorted = np.ones(n, dtype=bool)
+    is_first_sorted[1:] = sorted_chains[1:] != sorted_chains[:-1]
+
+    rows = order[~is_first_sorted]
+    prev_rows = order[np.flatnonzero(~is_first_sorted) - 1]
+    difference = sp.identity(n, format="csr") - sp.csr_matrix((np.ones(len(rows)), (rows, prev_rows)), shape=(n, n))
+
+    is_first = np.empty(n, dtype=bool)
+    is_first[order] = is_first_sorted
+    return difference.tocsr(), is_first, rows, prev_rows
+
+
+def _period_positions(periods, chain_ids):
+    """
+    Position of each row's period in time order.
+
+    Numbers, dates and text that parses as either (e.g. "2024-03", "March")
+    are sorted by value. Other labels are ordered so that every chain (e.g.
+    SKU at a site) keeps its periods in the order of its rows, so panels where
+    some SKUs start later are still chained correctly; ties keep the order of
+    first appearance. Raises ValueError when chains order the labels differently.
+    """
+    codes, uniques = pd.factorize(periods)
+    labels = pd.Series(np.asarray(uniques, dtype=object))
+    for parse in (pd.to_numeric, lambda values: pd.to_datetime(values, format="mixed")):
+        try:
+            keys = parse(labels)
+        except (TypeError, ValueError):
+            continue
+        if not keys.isna().any():
+            rank = np.empty(len(labels), dtype=np.int64)
+            rank[np.argsort(keys.to_numpy(), kind="stable")] = np.arange(len(labels))
+            return rank[codes]
+
+    # Consecutive rows of the same chain give "earlier -> later" edges; sort them topologically
+    order = np.argsort(chain_ids, kind="stable")
+    same_chain = chain_ids[order][1:] == chain_ids[order][:-1]
+    edges = set(zip(codes[order][:-1][same_chain].tolist(), codes[order][1:][same_chain].tolist()))
+    successors = [[] for _ in range(len(labels))]
+    predecessors = np.zeros(len(labels), dtype=np.int64)
+    for earlier, later in edges:
+        successors[earlier].append(later)
+        predecessors[later] += 1
+    ready = [code for code in range(len(labels)) if predecessors[code] == 0]
+    heapq.heapify(ready)
+    rank = np.empty(len(labels), dtype=np.int64)
+    for position in range(len(labels)):
+        if not ready:
+            raise ValueError("Periods appear in a different order for different SKUs; use numbers or dates for the period column.")
+        code = heapq.heappop(ready)
+        rank[code] = position
+        for later in successors[code]:
+            predecessors[later] -= 1
+            if predecessors[later] == 0:
+                heapq.heappush(ready, later)
+    return rank[codes]
+
+
+def build_multi_sku_model(data: pd.DataFrame, sku_column: str = 'SKU', site_column: str = 'Site', period_column: str = 'Month', max_storage: float = 500, initial_inventory: float = 100, max_raw_material: float = 200, initial_raw_material: float = 50, max_production_change: float = 50):
+    """
+    Builds a multi-commodity production/inventory model over SKU x site x period.
+
+    Variables exist only for the (SKU, site, period) rows present in ``data``
+    (duplicates are summed), so the model size follows the data instead of the
+    full cross-product. Each (SKU, site) has its own inventory chain, while
+    storage and raw material capacity are shared by all SKUs at a site.
+
+    Returns:
+        tuple: (model, variables, index) where ``index`` is the aggregated
+               DataFrame whose row order matches the variables.
+    """
+    if site_column not in data.columns:
+        data = data.assign(**{site_column: "default"})
+    keys = [sku_column, site_column, period_column]
+
+    # One row per (SKU, site, period) combination that actually occurs
+    # (observed=True keeps categorical key columns from expanding to every combination)
+    index = data.groupby(keys, sort=False, as_index=False, observed=True)[VALUE_COLUMNS].sum()
+    num_rows = len(index)
+
+    chain_ids = index.groupby([sku_column, site_column], sort=False, observed=True).ngroup().to_numpy()
+    period_positions = _period_positions(index[period_column], chain_ids)
+    site_period = index.groupby([site_column, period_column], sort=False, observed=True).ngroup().to_numpy()
+    num_site_periods = int(site_period.max()) + 1 if num_rows else 0
+
+    revenues = index['Revenue'].to_numpy(dtype=float)
+    costs = index[COST_COLUMNS].to_numpy(dtype=float).sum(axis=1)
+    scrap_metal_usage = index['Scrap_Metal_Used'].to_numpy(dtype=float)
+    demand = revenues / revenues * index['Production_Volume'].to_numpy(dtype=float)  # Assuming demand = Revenue/unit_price
+
+    model = gp.Model("MultiSkuProductionOptimization")
+
+    # --- Decision Variables ---
+    production_volume = model.addMVar(num_rows, vtype=GRB.INTEGER, lb=0, name="ProductionVolume")
+    inventory_level = model.addMVar(num_rows, vtype=GRB.CONTINUOUS, lb=0, name="InventoryLevel")
+    raw_material_inventory = model.addMVar(num_site_periods, vtype=GRB.CONTINUOUS, lb=0, name="RawMaterialInventory")
+
+    # --- Objective Function ---
+    # Maximize total profit (Revenue - Costs), as in solve_production_optimization
+    model.setObjective(gp.LinExpr(float((revenues - costs).sum())), GRB.MAXIMIZE)
+
+    # --- Constraints ---
+    # Inventory Balance per (SKU, site): inventory[i] - inventory[prev] - production[i] = -demand[i]
+    difference, is_first, rows, prev_rows = _chain_matrix(chain_ids, period_positions)
+    inventory_rhs = -demand + np.where(is_first, float(initial_inventory), 0.0)
+    inventory_balance = model.addConstr(difference @ inventory_level - production_volume == inventory_rhs, name="InventoryBalance")
+
+    # Site capacity: all SKUs stored at a site in a period share max_storage
+    site_period_sum = sp.csr_matrix((np.ones(num_rows), (site_period, np.arange(num_rows))), shape=(num_site_periods, num_rows))
+    storage_capacity = model.addConstr(site_period_sum @ inventory_level <= np.full(num_site_periods, float(max_storage)), name="StorageCapacity")
+
+    # Raw Material Inventory Balance per site: raw[s, t] - raw[s, prev] = -scrap used by all SKUs at s in t
+    _, first_rows = np.unique(site_period, return_index=True)  # group ids follow first appearance
+    site_periods = index[[site_column, period_column]].iloc[first_rows].reset_index(drop=True)
+    site_ids = pd.factorize(site_periods[site_column])[0]
+    raw_difference, raw_is_first, _, _ = _chain_matrix(site_ids, period_positions[first_rows])
+    raw_material_rhs = -(site_period_sum @ scrap_metal_usage) + np.where(raw_is_first, float(initial_raw_material), 0.0)
+    raw_material_balance = model.addConstr(raw_difference @ raw_material_inventory == raw_material_rhs, name="RawMaterialBalance")
+    raw_material_capacity = model.addConstr(raw_material_inventory <= np.full(num_site_periods, float(max_raw_material)), name="RawMaterialCapacity")
+
+    constraints = {
+        "inventory_balance": inventory_balance,
+        "storage_capacity": storage_capacity,
+        "raw_material_balance": raw_material_balance,
+        "raw_material_capacity": raw_material_capacity,
+    }
+
+    # Production Change Constraints between consecutive periods of the same (SKU, site)
+    if len(rows):
+        change = difference[rows]
+        change_limit = np.full(len(rows), float(max_production_change))
+        constraints["production_increase"] = model.addConstr(change @ production_volume <= change_limit, name="ProductionIncrease")
+        constraints["production_decrease"] = model.addConstr(-change @ production_volume <= change_limit, name="ProductionDecrease")
+
+    variables = {
+        "production_volume": production_volume,
+        "inventory_level": inventory_level,
+        "raw_material_inventory": raw_material_inventory,
+        "constraints": constraints,
+        "site_periods": site_periods,
+    }
+    return model, variables, index
+
+
+def _labels(frame, columns):
+    labels = frame[columns[0]].astype(str)
+    for column in columns[1:]:
+        labels = labels + KEY_SEPARATOR + frame[column].astype(str)
+    return labels.tolist()
+
+
+def solve_multi_sku_optimization(data: pd.DataFrame, sku_column: str = 'SKU', site_column: str = 'Site', period_column: str = 'Month', max_storage: float = 500, initial_inventory: float = 100, max_raw_material: float = 200, initial_raw_material: float = 50, max_production_change: float = 50, controller: SolveController = None):
+    """
+    Solves the production planning problem for many SKUs across several sites.
+
+    Args:
+        data (pd.DataFrame): One row per SKU, site and period with the same value
+                           columns as solve_production_optimization plus the
+                           ``sku_column``, ``site_column`` (optional) and
+                           ``period_column`` key columns.
+        max_storage (float): Storage capacity for finished goods per site.
+        initial_inventory (float): Initial inventory of each SKU at each site.
+        max_raw_material (float): Raw material storage capacity per site.
+        initial_raw_material (float): Initial raw material inventory per site.
+        max_production_change (float): Maximum change in an SKU's production volume at a site between periods.
+        controller (SolveController): Time/gap budget of the solve; defaults to the standard tier.
+
+    Returns:
+        dict: Same keys as solve_production_optimization. Result dictionaries are
+              keyed by "SKU|Site|Period" labels; 'raw_material_inventory' is keyed
+              by "Site|Period".
+    """
+    try:
+        model, variables, index = build_multi_sku_model(data, sku_column, site_column, period_column, max_storage,
+                                                        initial_inventory, max_raw_material, initial_raw_material,
+                                                        max_production_change)
+        controller = controller or SolveController.for_tier()
+        controller.optimize(model)
+
+        if model.SolCount > 0:
+            labels = _labels(index, [sku_column, site_column, period_column])
+            site_period_labels = _labels(variables["site_periods"], [site_column, period_column])
+            return {
+                "objective_value": model.objVal,
+                "production_volumes": dict(zip(labels, variables["production_volume"].X.tolist())),
+                "inventory_levels": dict(zip(labels, variables["inventory_level"].X.tolist())),
+                "raw_material_used": dict(zip(labels, index['Scrap_Metal_Used'].tolist())),
+                "raw_material_inventory": dict(zip(site_period_labels, variables["raw_material_inventory"].X.tolist())),
+                "status": status_name(model),
+                "mip_gap": model.MIPGap if model.IsMIP else 0.0,
+                "incumbents": controller.incumbents,
+                "solver_stats": model_statistics(model)
+            }
+        return {
+            "objective_value": None,
+            "production_volumes": None,
+            "inventory_levels": None,
+            "raw_material_used": None,
+            "raw_material_inventory": None,
+            "status": status_name(model),
+            "solver_stats": model_statistics(model)
+        }
+    except Exception as e:
+        logger.exception("Multi-SKU optimization failed")
+        return {
+            "objective_value": None,
+            "production_volumes": None,
+            "inventory_levels": None,
+            "raw_material_used": None,
+            "raw_material_inventory": None,
+            "status": "ERROR",
+            "error_message": str(e)
+        }
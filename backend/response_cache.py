@@ -0,0 +1,138 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# --- Follow-up Response Cache ---
+# In-memory LRU cache of AI answers to follow-up questions. Entries are keyed on
+# the normalized question and a key for the session, problem type and results,
+# so asking the same question about the same results again (e.g. after a
+# reload, or from a second tab) gets the earlier answer without another LLM
+# call. Optionally, a question whose words closely match a cached one for the
+# same results counts as a hit too. Entries for a results key are dropped when
+# the session replaces those results.
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+_NUMBER_PATTERN = re.compile(r"^[0-9]+(?:\.[0-9]+)?$")
+STOP_WORDS = frozenset("a an and are be can could do does for how i in is it me my of on or our please should "
+                       "so tell that the this to us was we what when which why will with would you your".split())
+
+
+def normalize_question(question):
+    """Lowercase words of the question, without punctuation or extra whitespace."""
+    return " ".join(_WORD_PATTERN.findall((question or "").lower()))
+
+
+def _terms(normalized):
+    return frozenset(word for word in normalized.split() if word not in STOP_WORDS)
+
+
+class ResponseCache:
+    def __init__(self, max_entries=2000, ttl=3600, similarity_threshold=0.85):
+        """
+        Args:
+            similarity_threshold: Minimum Jaccard similarity of the question's
+                content words for a near-duplicate to count as a hit; 0 or None
+                only matches identical normalized questions.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.entries = OrderedDict()  # {(results_key, question): (answer, terms, created_at)}
+        self.by_results = {}  # {results_key: set of entry keys}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, results_key, question):
+        """Cached answer for the question about these results, or None."""
+        normalized = normalize_question(question)
+        key = (results_key, normalized)
+        with self.lock:
+            entry = self._live(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if self.similarity_threshold:
+                match = self._similar(results_key, _terms(normalized))
+                if match is not None:
+                    self.entries.move_to_end(match)
+                    self.similar_hits += 1
+                    return self.entries[match][0]
+            self.misses += 1
+            return None
+
+    def put(self, results_key, question, answer):
+        normalized = normalize_question(question)
+        key = (results_key, normalized)
+        with self.lock:
+            self.entries[key] = (answer, _terms(normalized), time.time())
+            self.entries.move_to_end(key)
+            self.by_results.setdefault(results_key, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, results_key):
+        """Drops every answer about the given results."""
+        with self.lock:
+            keys = self.by_results.pop(results_key, set())
+            for key in keys:
+                self.entries.pop(key, None)
+            self.invalidations += len(keys)
+
+    def _live(self, key):
+        # Caller must hold self.lock
+        entry = self.entries.get(key)
+        if entry is not None and self.ttl and time.time() - entry[2] > self.ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _similar(self, results_key, terms):
+        # Caller must hold self.lock
+        if not terms:
+            return None
+        numbers = {t for t in terms if _NUMBER_PATTERN.match(t)}
+        best, best_score = None, self.similarity_threshold
+        for key in list(self.by_results.get(results_key, ())):
+            entry = self._live(key)
+            if entry is None:
+                continue
+            cached_terms = entry[1]
+            # Questions about different quantities ("... storage 600" vs "... 700") never match
+            if numbers != {t for t in cached_terms if _NUMBER_PATTERN.match(t)}:
+                continue
+            score = len(terms & cached_terms) / len(terms | cached_terms)
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def _remove(self, key):
+        # Caller must hold self.lock
+        self.entries.pop(key, None)
+        keys = self.by_results.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_results[key[0]]
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.similar_hits + self.misses
+            return {
+                "hits": self.hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.similar_hits) / total if total else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self.entries),
+            }
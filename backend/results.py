@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import io
+import json
+import numbers
+import sys
+
+import numpy as np
+import pyarrow as pa
+
+# --- Columnar Optimization Results ---
+# Solver results arrive as dicts of per-period (or per-SKU, ...) dictionaries.
+# They are converted once into a ResultFrame: a shared row index plus one
+# float64 NumPy array per series, and the remaining scalar fields. Sessions keep
+# the frame; responses and prompts get a compact summary and the UI pages
+# through the rows it actually shows, as JSON columns or Arrow IPC.
+
+KEY_SEPARATOR = "|"
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 10_000
+ARROW_MIMETYPE = "application/vnd.apache.arrow.stream"
+# Fields describing how a solve went rather than its solution; left out of ResultFrame.fingerprint().
+# The status and MIP gap stay in it: explanations and follow-up answers cached
+# under the fingerprint talk about them (an optimal plan vs. one cut off at a gap).
+SOLVE_FIELDS = frozenset({"incumbents", "solve_time", "solver_stats", "decomposition",
+                          "runtime", "elapsed_seconds", "node_count"})
+
+
+def _is_number(value):
+    return value is None or (isinstance(value, numbers.Number) and not isinstance(value, complex))
+
+
+def _label(key):
+    if isinstance(key, tuple):
+        return KEY_SEPARATOR.join(str(k) for k in key)
+    return str(key)
+
+
+def _flatten_series(value):
+    """{label: number} for a dict (optionally one level nested) or list of numbers, else None."""
+    if isinstance(value, (list, tuple)):
+        if value and all(_is_number(v) for v in value):
+            return {str(i): v for i, v in enumerate(value)}
+        return None
+    if not isinstance(value, dict) or not value:
+        return None
+    series = {}
+    for key, item in value.items():
+        if _is_number(item):
+            series[_label(key)] = item
+        elif isinstance(item, dict) and item and all(_is_number(v) for v in item.values()):
+            # e.g. {"Product A": {"Jan": 10, ...}} -> "Product A|Jan"
+            prefix = _label(key) + KEY_SEPARATOR
+            for inner_key, inner in item.items():
+                series[prefix + _label(inner_key)] = inner
+        else:
+            return None
+    return series
+
+
+def _to_float_array(values):
+    return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=len(values))
+
+
+def _json_values(array):
+    """List of floats with NaN as None; whole numbers stay floats (as in the solver output)."""
+    values = array.tolist()
+    if np.isnan(array).any():
+        return [None if v != v else v for v in values]
+    return values
+
+
+class ResultFrame:
+    """Column-oriented optimization result: row labels, float64 series and scalar fields."""
+
+    def __init__(self, index, columns, scalars=None):
+        self.index = list(index)
+        self.columns = columns  # {name: np.ndarray aligned with index}
+        self.scalars = scalars or {}
+
+    @classmethod
+    def from_result(cls, result):
+        """Splits a result dict into aligned numeric series and everything else."""
+        if not isinstance(result, dict):
+            return cls([], {}, {"result": result})
+        series, scalars = {}, {}
+        for name, value in result.items():
+            flat = _flatten_series(value)
+            if flat is None:
+                scalars[name] = value
+            else:
+                series[name] = flat
+
+        if series:
+            # Small dicts keyed by something else than the rows (e.g. solve parameters or
+            # solver statistics next to per-month series) are fields, not series
+            longest = max(series.values(), key=len)
+            for name in [n for n, s in series.items() if s is not longest and s.keys().isdisjoint(longest.keys())]:
+                scalars[name] = result[name]
+                del series[name]
+
+        index = []
+        if series:
+            # Series usually share their keys (e.g. months); fall back to the union in first-seen order
+            first = next(iter(series.values()))
+            index = list(first)
+            if any(len(s) != len(first) or s.keys() != first.keys() for s in series.values()):
+                index = list(dict.fromkeys(label for s in series.values() for label in s))
+        columns = {}
+        for name, values in series.items():
+            if len(values) == len(index) and list(values) == index:
+                columns[name] = _to_float_array(list(values.values()))
+            else:
+                columns[name] = _to_float_array([values.get(label) for label in index])
+        return cls(index, columns, scalars)
+
+    @property
+    def num_rows(self):
+        return len(self.index)
+
+    def _select(self, columns):
+        if not columns:
+            return list(self.columns)
+        unknown = [c for c in columns if c not in self.columns]
+        if unknown:
+            raise ValueError(f"Unknown result columns: {', '.join(unknown)}")
+        return list(columns)
+
+    def page(self, offset=0, limit=DEFAULT_PAGE_SIZE, columns=None):
+        """Rows ``offset`` to ``offset + limit`` as a JSON-serializable columnar dict."""
+        names = self._select(columns)
+        offset = max(0, int(offset))
+        limit = max(0, min(int(limit), MAX_PAGE_SIZE))
+        end = min(offset + limit, self.num_rows)
+        return {
+            "num_rows": self.num_rows,
+            "offset": offset,
+            "limit": limit,
+            "index": self.index[offset:end],
+            "columns": {name: _json_values(self.columns[name][offset:end]) for name in names},
+        }
+
+    def to_arrow(self, offset=0, limit=None, columns=None):
+        """Arrow table of the selected rows with the row labels in an "index" column."""
+        names = self._select(columns)
+        end = self.num_rows if limit is None else min(offset + int(limit), self.num_rows)
+        arrays = {"index": pa.array(self.index[offset:end], type=pa.string())}
+        for name in names:
+            arrays[name] = pa.array(self.columns[name][offset:end], from_pandas=True)
+        return pa.table(arrays)
+
+    def to_arrow_ipc(self, offset=0, limit=None, columns=None):
+        sink = io.BytesIO()
+        table = self.to_arrow(offset, limit, columns)
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue()
+
+    def summary(self, preview_rows=20):
+        """Scalar fields, per-column statistics and the first rows."""
+        statistics = {}
+        for name, values in self.columns.items():
+            present = values[~np.isnan(values)]
+            if len(present):
+                statistics[name] = {
+                    "min": float(present.min()),
+                    "max": float(present.max()),
+                    "sum": float(present.sum()),
+                    "mean": float(present.mean()),
+                }
+            else:
+                statistics[name] = {"min": None, "max": None, "sum": None, "mean": None}
+        return {
+            **self.scalars,
+            "num_rows": self.num_rows,
+            "column_statistics": statistics,
+            "preview": self.page(0, preview_rows),
+            "truncated": True,
+        }
+
+    def fingerprint(self):
+        """Hash of the row labels, series values and scalar fields except SOLVE_FIELDS, identifying the solution and its status."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update("\x00".join(self.index).encode("utf-8"))
+        for name, values in self.columns.items():
+            digest.update(name.encode("utf-8"))
+            digest.update(values.tobytes())
+        solution = sorted((name, value) for name, value in self.scalars.items() if name not in SOLVE_FIELDS)
+        digest.update(repr(solution).encode("utf-8"))
+        return digest.hexdigest()
+
+    def __sizeof__(self):
+        return (object.__sizeof__(self) + sys.getsizeof(self.index) + sum(sys.getsizeof(label) for label in self.index)
+                + sum(values.nbytes for values in self.columns.values()))
+
+
+def gzip_json(body, level=5):
+    """Compact JSON encoded and gzip-compressed."""
+    return gzip.compress(json.dumps(body, separators=(",", ":")).encode("utf-8"), compresslevel=level)
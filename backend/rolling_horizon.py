@@ -0,0 +1,325 @@
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import gurobipy as gp
+
+from samplegurobi import build_production_model_matrix, period_profits, production_demand
+from solve_control import SolveController, status_name, MAX_INCUMBENTS
+
+# --- Rolling-Horizon Decomposition ---
+# Long horizons of the production planning model are solved as a sequence of
+# small time windows instead of one monolithic model. Periods are only coupled
+# to their neighbours (inventory balance and the production change limit), so
+# a window needs just the state at its start: inventory, raw material
+# inventory and the previous period's production.
+#
+# "sequential" solves overlapping windows from the start of the horizon,
+# commits each window's first ``window - overlap`` periods and passes the
+# state at the last committed period forward; the overlap lets a window see
+# demand beyond what it commits. "parallel" first solves the LP relaxation of
+# the full horizon to fix the state at shard boundaries (rounded so the
+# integer production can meet it), then solves the shards independently on
+# several threads. If the LP cannot be solved, or a shard cannot meet its
+# boundary state, the remaining periods are solved in sequential mode.
+#
+# The time limit of the caller's SolveController is one deadline for the whole
+# decomposition: each window gets an equal share of the time left for the
+# windows still to solve. The controller can also stop the decomposition
+# between and during windows; window incumbents are published tagged with the
+# window's first period.
+#
+# Committing a window without seeing far enough ahead can leave a state the
+# following periods cannot recover from (e.g. too little inventory before a
+# demand spike that production cannot ramp up to). When a sequential window is
+# infeasible, the windows are solved again with twice the lookahead, up to the
+# whole remaining horizon. A plan that is still infeasible is only reported as
+# INFEASIBLE when the infeasible window starts from the initial state (its
+# periods are a relaxation of the full horizon); otherwise the decomposition
+# failed and the status is ERROR.
+
+DEFAULT_WINDOW = 24
+DEFAULT_OVERLAP = 6
+
+
+class _Window:
+    """Solution arrays of one solved window, or the status it failed with."""
+
+    def __init__(self, start, status, gap=None, production=None, inventory=None, raw_material=None, incumbent=None):
+        self.start = start
+        self.status = status
+        self.gap = gap
+        self.production = production
+        self.inventory = inventory
+        self.raw_material = raw_material
+        self.incumbent = incumbent
+
+
+def _stopped(controller):
+    return controller.should_stop is not None and controller.should_stop()
+
+
+def _window_controller(controller, start, time_limit):
+    """A controller with the gap, stop condition and incumbent callback of ``controller`` for the window at ``start``."""
+    on_incumbent = None
+    if controller.on_incumbent is not None:
+        on_incumbent = lambda incumbent: controller.on_incumbent({**incumbent, "window_start": start + 1})
+    return SolveController(time_limit=time_limit, mip_gap=controller.mip_gap, on_incumbent=on_incumbent,
+                           should_stop=controller.should_stop, min_interval=controller.min_interval)
+
+
+def _time_share(deadline, rounds):
+    """Seconds for each of ``rounds`` more rounds of window solves until ``deadline`` (None: no limit)."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic()) / max(1, rounds)
+
+
+def _solve_window(data, start, end, parameters, controller, state, terminal=None, time_limit=None):
+    """Solves periods [start, end) from ``state`` = (inventory, raw material, previous production).
+
+    ``terminal`` = (inventory, production) fixes the window's last period.
+    Each window gets its own environment, so windows can be solved on
+    separate threads.
+    """
+    if time_limit is not None and time_limit <= 0:
+        return _Window(start, "TIME_LIMIT")
+    inventory, raw_material, previous_production = state
+    with gp.Env(empty=True) as env:
+        env.setParam("OutputFlag", 0)
+        env.setParam("Threads", 1)
+        env.start()
+        model, variables = build_production_model_matrix(
+            data.iloc[start:end], env=env, previous_production=previous_production,
+            **dict(parameters, initial_inventory=inventory, initial_raw_material=raw_material))
+        try:
+            if terminal is not None:
+                model.addConstr(variables["inventory_level"][-1] == terminal[0])
+                model.addConstr(variables["production_volume"][-1] == terminal[1])
+            window_controller = _window_controller(controller, start, time_limit)
+            window_controller.optimize(model)
+            if model.SolCount == 0 or model.Status == gp.GRB.INTERRUPTED:
+                return _Window(start, status_name(model))
+            incumbent = {**window_controller.incumbents[-1], "window_start": start + 1} if window_controller.incumbents else None
+            return _Window(start, status_name(model), model.MIPGap if model.IsMIP else 0.0,
+                           variables["production_volume"].X, variables["inventory_level"].X,
+                           variables["raw_material_inventory"].X, incumbent)
+        finally:
+            model.dispose()
+
+
+def _solve_sequential(data, parameters, controller, window, overlap, start=0, state=None, deadline=None):
+    """
+    Rolling windows from ``start``; returns the committed windows (the last one
+    may have failed) and the window size of the last attempt.
+
+    An infeasible window is retried from ``start`` with twice the lookahead and
+    the same number of committed periods per window.
+    """
+    commit = max(1, window - overlap)
+    while True:
+        windows = _roll(data, parameters, controller, window, commit, start, state, deadline)
+        failed = windows[-1]
+        if (failed.production is not None or failed.status not in ("INFEASIBLE", "INF_OR_UNBD")
+                or failed.start == start or window >= len(data) - start):
+            return windows, window
+        window = min(2 * window, len(data) - start)
+
+
+def _roll(data, parameters, controller, window, commit, start, state, deadline):
+    num_periods = len(data)
+    state = state or (parameters["initial_inventory"], parameters["initial_raw_material"], None)
+    windows = []
+    while start < num_periods:
+        end = min(start + window, num_periods)
+        if _stopped(controller):
+            windows.append(_Window(start, "INTERRUPTED"))
+            break
+        rounds = math.ceil(max(0, num_periods - end) / commit) + 1
+        solved = _solve_window(data, start, end, parameters, controller, state, time_limit=_time_share(deadline, rounds))
+        if solved.production is None:
+            windows.append(solved)
+            break
+        keep = end - start if end == num_periods else commit
+        solved.production, solved.inventory, solved.raw_material = (
+            solved.production[:keep], solved.inventory[:keep], solved.raw_material[:keep])
+        windows.append(solved)
+        state = (solved.inventory[-1], solved.raw_material[-1], solved.production[-1])
+        start += keep
+    return windows
+
+
+def _boundary_states(data, parameters, boundaries):
+    """
+    States at the end of each shard from the LP relaxation of the full horizon.
+
+    Cumulative production is rounded to whole units at each boundary, so the
+    integer production of a shard can reach the boundary inventory exactly.
+    Returns {boundary period: (inventory, production)}, or None if the LP
+    cannot be solved.
+    """
+    with gp.Env(empty=True) as env:
+        env.setParam("OutputFlag", 0)
+        env.start()
+        model, variables = build_production_model_matrix(data, env=env, **parameters)
+        try:
+            variables["production_volume"].VType = gp.GRB.CONTINUOUS
+            try:
+                model.optimize()
+            except gp.GurobiError:
+                return None  # e.g. the full horizon exceeds a size-limited license
+            if model.SolCount == 0:
+                return None
+            production = variables["production_volume"].X
+        finally:
+            model.dispose()
+    cumulative_production = np.cumsum(production)
+    cumulative_demand = np.cumsum(production_demand(data))
+    states = {}
+    for boundary in boundaries:
+        last = boundary - 1
+        # Round the cumulative production towards the value that keeps the inventory within storage
+        candidates = sorted({np.floor(cumulative_production[last]), np.ceil(cumulative_production[last])},
+                            key=lambda c: abs(c - cumulative_production[last]))
+        for total in candidates:
+            inventory = parameters["initial_inventory"] + total - cumulative_demand[last]
+            if 0 <= inventory <= parameters["max_storage"]:
+                break
+        states[boundary] = (inventory, float(np.round(production[last])))
+    return states
+
+
+def _solve_parallel(data, parameters, controller, window, workers, deadline=None):
+    num_periods = len(data)
+    boundaries = list(range(window, num_periods, window))
+    states = _boundary_states(data, parameters, boundaries)
+    if states is None:
+        return None
+    starts = [0] + boundaries
+    share = _time_share(deadline, math.ceil(len(starts) / workers))
+    raw_material = parameters["initial_raw_material"] - np.cumsum(data['Scrap_Metal_Used'].to_numpy(dtype=float))
+
+    def solve(start):
+        end = min(start + window, num_periods)
+        if start == 0:
+            state = (parameters["initial_inventory"], parameters["initial_raw_material"], None)
+        else:
+            inventory, production = states[start]
+            state = (inventory, raw_material[start - 1], production)
+        if _stopped(controller):
+            return _Window(start, "INTERRUPTED")
+        time_limit = None if deadline is None else min(share, _time_share(deadline, 1))
+        return _solve_window(data, start, end, parameters, controller, state, states.get(end), time_limit)
+
+    with ThreadPoolExecutor(max_workers=workers) as threads:
+        windows = list(threads.map(solve, starts))
+    failed = next((i for i, w in enumerate(windows) if w.production is None), None)
+    if failed is not None and not _stopped(controller):
+        # Continue sequentially from the end of the last shard that met its boundary
+        previous = windows[failed - 1] if failed else None
+        state = (previous.inventory[-1], previous.raw_material[-1], previous.production[-1]) if previous else None
+        rest, _ = _solve_sequential(data, parameters, controller, window, DEFAULT_OVERLAP, starts[failed], state, deadline)
+        return windows[:failed] + rest, True
+    return windows, False
+
+
+def solve_production_rolling_horizon(data: pd.DataFrame, max_storage: float = 500, initial_inventory: float = 100, max_raw_material: float = 200, initial_raw_material: float = 50, max_production_change: float = 50,
+                                     window: int = DEFAULT_WINDOW, overlap: int = DEFAULT_OVERLAP, mode: str = "sequential", workers: int = 1, controller: SolveController = None):
+    """
+    Solves the production planning model window by window.
+
+    Args:
+        window (int): Periods per window (sequential) or shard (parallel).
+        overlap (int): Periods a sequential window looks beyond what it commits.
+        mode (str): "sequential" or "parallel" (see the module comment).
+        workers (int): Threads solving shards in parallel mode.
+        controller (SolveController): Time limit of the whole decomposition,
+                           MIP gap of each window, stop condition and
+                           incumbent callback; defaults to the standard tier.
+
+    Returns:
+        dict: Same keys as solve_production_optimization plus 'decomposition'
+              (mode, window, overlap, number of windows, whether parallel
+              mode fell back to sequential windows, elapsed seconds). 'mip_gap'
+              is the largest gap of any window; the windows' combined solution
+              is not proven optimal for the whole horizon. 'incumbents' holds
+              the final incumbent of each window. A stopped solve returns
+              status 'INTERRUPTED' without a plan, one that ran out of time
+              'TIME_LIMIT' and one whose windows found no plan although the
+              horizon may have one 'ERROR'.
+    """
+    if mode not in ("sequential", "parallel"):
+        raise ValueError("mode must be 'sequential' or 'parallel'.")
+    if window < 1 or not 0 <= overlap < window:
+        raise ValueError("window must be positive and overlap between 0 and window - 1.")
+    parameters = {
+        "max_storage": float(max_storage),
+        "initial_inventory": float(initial_inventory),
+        "max_raw_material": float(max_raw_material),
+        "initial_raw_material": float(initial_raw_material),
+        "max_production_change": float(max_production_change),
+    }
+
+    controller = controller or SolveController.for_tier()
+    start = time.perf_counter()
+    deadline = time.monotonic() + controller.time_limit if controller.time_limit is not None else None
+    windows, fell_back, lookahead = None, False, window
+    if mode == "parallel":
+        solved = _solve_parallel(data, parameters, controller, window, max(1, workers), deadline)
+        if solved is not None:
+            windows, fell_back = solved
+        else:
+            fell_back = True
+    if windows is None:
+        windows, lookahead = _solve_sequential(data, parameters, controller, window, overlap, deadline=deadline)
+        overlap += lookahead - window
+    decomposition = {
+        "mode": mode,
+        "window": lookahead,
+        "overlap": overlap if mode == "sequential" or fell_back else 0,
+        "windows": len(windows),
+        "fell_back_to_sequential": fell_back,
+        "elapsed_seconds": time.perf_counter() - start,
+    }
+
+    controller.incumbents = [w.incumbent for w in windows if w.incumbent is not None]
+    if len(controller.incumbents) > MAX_INCUMBENTS:
+        del controller.incumbents[1:1 - MAX_INCUMBENTS]  # keep the first and the latest ones
+
+    failed = next((w for w in windows if w.production is None), None)
+    if failed is not None:
+        status, message = failed.status, f"The window starting at period {failed.start + 1} has no feasible solution."
+        if status == "INTERRUPTED":
+            message = f"The solve was stopped at the window starting at period {failed.start + 1}."
+        elif status == "TIME_LIMIT":
+            message = f"The time limit ran out at the window starting at period {failed.start + 1}."
+        elif failed.start > 0:
+            # Only a window starting from the initial state proves that the horizon is infeasible
+            status = "ERROR"
+            message = f"The rolling-horizon windows found no feasible plan (from period {failed.start + 1}); the horizon may still have one."
+        return {
+            "objective_value": None,
+            "production_volumes": None,
+            "inventory_levels": None,
+            "raw_material_used": None,
+            "raw_material_inventory": None,
+            "status": status,
+            "error_message": message,
+            "decomposition": decomposition,
+        }
+
+    months = data['Month'].tolist()
+    statuses = {w.status for w in windows}
+    return {
+        "objective_value": float(period_profits(data).sum()),
+        "production_volumes": dict(zip(months, np.concatenate([w.production for w in windows]).tolist())),
+        "inventory_levels": dict(zip(months, np.concatenate([w.inventory for w in windows]).tolist())),
+        "raw_material_used": dict(zip(months, data['Scrap_Metal_Used'].tolist())),
+        "raw_material_inventory": dict(zip(months, np.concatenate([w.raw_material for w in windows]).tolist())),
+        "status": "OPTIMAL" if statuses == {"OPTIMAL"} else next(s for s in statuses if s != "OPTIMAL"),
+        "mip_gap": max(w.gap for w in windows),
+        "incumbents": controller.incumbents,
+        "decomposition": decomposition,
+    }
@@ -1,9 +1,298 @@
 import pandas as pd
 import numpy as np
+import scipy.sparse as sp
 import gurobipy as gp
 from gurobipy import GRB
 
-def solve_production_optimization(data: pd.DataFrame, max_storage: float = 500, initial_inventory: float = 100, max_raw_material: float = 200, initial_raw_material: float = 50, max_production_change: float = 50):
+from solve_control import SolveController, status_name
+
+# Columns solve_production_optimization reads from its 'data' DataFrame
+REQUIRED_COLUMNS = ['Month', 'Raw_Material_Cost', 'Labour_Cost', 'Electricity_Cost', 'Transportation_Cost',
+                    'Commission_Cost', 'Warehousing_Cost', 'Revenue', 'Scrap_Metal_Used', 'Production_Volume']
+
+def build_production_model_loops(data: pd.DataFrame, max_storage: float = 500, initial_inventory: float = 100, max_raw_material: float = 200, initial_raw_material: float = 50, max_production_change: float = 50):
+    """
+    Builds the production planning model one constraint at a time.
+
+    This is the original formulation, kept as the reference for
+    build_production_model_matrix and for the model-build benchmark.
+
+    Returns:
+        tuple: (model, variables) where variables maps 'production_volume',
+               'inventory_level' and 'raw_material_inventory' to tupledicts.
+    """
+    # Create a Gurobi model
+    model = gp.Model("ProductionOptimization")
+
+    # --- Data Preparation ---
+    months = data['Month'].tolist()
+    num_months = len(months)
+
+    # Extract cost and revenue data from the DataFrame
+    raw_material_costs = data['Raw_Material_Cost'].tolist()
+    labor_costs = data['Labour_Cost'].tolist()
+    electricity_costs = data['Electricity_Cost'].tolist()
+    transportation_costs = data['Transportation_Cost'].tolist()
+    commission_costs = data['Commission_Cost'].tolist()
+    warehousing_costs = data['Warehousing_Cost'].tolist()
+    revenues = data['Revenue'].tolist()
+    scrap_metal_usage = data['Scrap_Metal_Used'].tolist()
+
+    # --- Decision Variables ---
+    production_volume = model.addVars(num_months, vtype=GRB.INTEGER, name="ProductionVolume", lb=0)  # Ensure non-negative production
+    inventory_level = model.addVars(num_months, vtype=GRB.CONTINUOUS, name="InventoryLevel", lb=0) #Ensure non-negative inventory
+    raw_material_inventory = model.addVars(num_months, vtype=GRB.CONTINUOUS, name="RawMaterialInventory", lb=0)
+
+    # --- Objective Function ---
+    # Maximize total profit (Revenue - Costs)
+    objective = gp.quicksum(revenues[i] - (raw_material_costs[i] + labor_costs[i] + electricity_costs[i] +
+                                             transportation_costs[i] + commission_costs[i] + warehousing_costs[i])
+                            for i in range(num_months))
+
+    model.setObjective(objective, GRB.MAXIMIZE)
+
+    # --- Constraints ---
+
+    # Inventory Balance Constraints
+    # Initial Inventory
+    model.addConstr(inventory_level[0] == initial_inventory + production_volume[0] - (revenues[0] / data['Revenue'][0] * data['Production_Volume'][0]), name="InventoryBalance_0") # Assuming demand = Revenue/unit_price
+
+    for i in range(1, num_months):
+         model.addConstr(inventory_level[i] == inventory_level[i-1] + production_volume[i] - (revenues[i] / data['Revenue'][i] * data['Production_Volume'][i]), name=f"InventoryBalance_{i}")
+
+    # Raw Material Inventory Balance Constraints
+    #Initial Raw Material
+    model.addConstr(raw_material_inventory[0] == initial_raw_material - scrap_metal_usage[0] , name="RawMaterialBalance_0") #assuming scrap_metal_usage is the raw material use
+    for i in range(1,num_months):
+        model.addConstr(raw_material_inventory[i] == raw_material_inventory[i-1] - scrap_metal_usage[i] , name=f"RawMaterialBalance_{i}")
+
+    # Storage Capacity Constraints
+    for i in range(num_months):
+        model.addConstr(inventory_level[i] <= max_storage, name=f"StorageCapacity_{i}")
+        model.addConstr(raw_material_inventory[i] <= max_raw_material, name = f"RawMaterialCapacity_{i}")
+
+    # Production Change Constraints (Limit fluctuation in production)
+    for i in range(1, num_months):
+        model.addConstr(production_volume[i] - production_volume[i-1] <= max_production_change, name=f"ProductionIncrease_{i}")
+        model.addConstr(production_volume[i-1] - production_volume[i] <= max_production_change, name=f"ProductionDecrease_{i}")
+
+    # Resource Availability Constraint (Example: total raw material usage)
+    # Assuming a budget constraint for total cost over the time horizon.  Using the data, creating a constant
+    #model.addConstr(gp.quicksum(raw_material_costs[i] + labor_costs[i] + electricity_costs[i] + transportation_costs[i] + commission_costs[i] + warehousing_costs[i] for i in range(num_months)) <= 1000000, "BudgetConstraint") #10 Lakhs INR
+
+    variables = {
+        "production_volume": production_volume,
+        "inventory_level": inventory_level,
+        "raw_material_inventory": raw_material_inventory,
+    }
+    return model, variables
+
+
+def _column(data, name):
+    return data[name].to_numpy(dtype=float)
+
+
+def period_profits(data: pd.DataFrame):
+    """Revenue minus all cost columns for each period (the model's objective terms)."""
+    revenues = _column(data, 'Revenue')
+    costs = (_column(data, 'Raw_Material_Cost') + _column(data, 'Labour_Cost') + _column(data, 'Electricity_Cost') +
+             _column(data, 'Transportation_Cost') + _column(data, 'Commission_Cost') + _column(data, 'Warehousing_Cost'))
+    return revenues - costs
+
+
+def production_demand(data: pd.DataFrame):
+    revenues = _column(data, 'Revenue')
+    return revenues / revenues * _column(data, 'Production_Volume')  # Assuming demand = Revenue/unit_price
+
+
+def build_production_model_matrix(data: pd.DataFrame, max_storage: float = 500, initial_inventory: float = 100, max_raw_material: float = 200, initial_raw_material: float = 50, max_production_change: float = 50, env=None, previous_production: float = None):
+    """
+    Builds the same production planning model as build_production_model_loops
+    with gurobipy's matrix API: one MVar per variable family and one sparse
+    matrix constraint per constraint family, so build time grows with NumPy
+    and SciPy operations instead of per-period Python calls.
+
+    Args:
+        env (gp.Env): Optional Gurobi environment for the model (e.g. one with logging disabled).
+        previous_production (float): Production volume of the period before the first row,
+                                     which the first period's change limit then applies to
+                                     (used when solving a horizon window by window).
+
+    Returns:
+        tuple: (model, variables) where variables maps 'production_volume',
+               'inventory_level' and 'raw_material_inventory' to MVars and
+               'constraints' to the MConstr of each constraint family.
+    """
+    model = gp.Model("ProductionOptimization", env=env)
+
+    # --- Data Preparation ---
+    num_months = len(data)
+    scrap_metal_usage = _column(data, 'Scrap_Metal_Used')
+    demand = production_demand(data)
+
+    # --- Decision Variables ---
+    production_volume = model.addMVar(num_months, vtype=GRB.INTEGER, lb=0, name="ProductionVolume")
+    inventory_level = model.addMVar(num_months, vtype=GRB.CONTINUOUS, lb=0, name="InventoryLevel")
+    raw_material_inventory = model.addMVar(num_months, vtype=GRB.CONTINUOUS, lb=0, name="RawMaterialInventory")
+
+    # --- Objective Function ---
+    # Maximize total profit (Revenue - Costs)
+    model.setObjective(gp.LinExpr(float(period_profits(data).sum())), GRB.MAXIMIZE)
+
+    # --- Constraints ---
+    # difference[i] = x[i] - x[i-1] (and x[0] for the first period)
+    difference = sp.diags([np.ones(num_months), -np.ones(num_months - 1)], [0, -1], format="csr")
+
+    # Inventory Balance: inventory[i] - inventory[i-1] - production[i] = -demand[i]
+    inventory_rhs = -demand
+    inventory_rhs[0] += initial_inventory
+    inventory_balance = model.addConstr(difference @ inventory_level - production_volume == inventory_rhs, name="InventoryBalance")
+
+    # Raw Material Inventory Balance: raw[i] - raw[i-1] = -scrap_metal_usage[i]
+    raw_material_rhs = -scrap_metal_usage
+    raw_material_rhs[0] += initial_raw_material
+    raw_material_balance = model.addConstr(difference @ raw_material_inventory == raw_material_rhs, name="RawMaterialBalance")
+
+    # Storage Capacity Constraints
+    storage_capacity = model.addConstr(inventory_level <= np.full(num_months, float(max_storage)), name="StorageCapacity")
+    raw_material_capacity = model.addConstr(raw_material_inventory <= np.full(num_months, float(max_raw_material)), name="RawMaterialCapacity")
+
+    constraints = {
+        "inventory_balance": inventory_balance,
+        "raw_material_balance": raw_material_balance,
+        "storage_capacity": storage_capacity,
+        "raw_material_capacity": raw_material_capacity,
+    }
+
+    # Production Change Constraints (Limit fluctuation in production)
+    if num_months > 1:
+        change = difference[1:]
+        change_limit = np.full(num_months - 1, float(max_production_change))
+        constraints["production_increase"] = model.addConstr(change @ production_volume <= change_limit, name="ProductionIncrease")
+        constraints["production_decrease"] = model.addConstr(-change @ production_volume <= change_limit, name="ProductionDecrease")
+    if previous_production is not None and num_months > 0:
+        first_change = production_volume[0] - float(previous_production)
+        constraints["initial_production_increase"] = model.addConstr(first_change <= float(max_production_change), name="InitialProductionIncrease")
+        constraints["initial_production_decrease"] = model.addConstr(-first_change <= float(max_production_change), name="InitialProductionDecrease")
+
+    variables = {
+        "production_volume": production_volume,
+        "inventory_level": inventory_level,
+        "raw_material_inventory": raw_material_inventory,
+        "constraints": constraints,
+        "parameters": {
+            "max_storage": float(max_storage),
+            "initial_inventory": float(initial_inventory),
+            "max_raw_material": float(max_raw_material),
+            "initial_raw_material": float(initial_raw_material),
+            "max_production_change": float(max_production_change),
+        },
+    }
+    return model, variables
+
+
+def _solution_values(model, variables):
+    """Solution values of an MVar or a tupledict as a NumPy array, read in one bulk call."""
+    if isinstance(variables, gp.MVar):
+        return variables.X
+    return np.asarray(model.getAttr(GRB.Attr.X, list(variables.values())), dtype=float)
+
+
+def extract_production_results(model, variables, data: pd.DataFrame):
+    """
+    Builds the result dictionary of solve_production_optimization from a solved model.
+
+    A solve stopped by its time limit (or interrupted) still returns its best
+    solution; 'status' then says why it stopped and 'mip_gap' how far from
+    proven optimal the solution may be.
+    """
+    if model.SolCount > 0:
+        months = data['Month'].tolist()
+        production_volumes = dict(zip(months, _solution_values(model, variables["production_volume"]).tolist()))
+        inventory_levels = dict(zip(months, _solution_values(model, variables["inventory_level"]).tolist()))
+        raw_material_levels = dict(zip(months, data['Scrap_Metal_Used'].tolist())) #These are the used levels not the inventory
+        raw_material_inventory_levels = dict(zip(months, _solution_values(model, variables["raw_material_inventory"]).tolist()))
+
+        return {
+            "objective_value": model.objVal,
+            "production_volumes": production_volumes,
+            "inventory_levels": inventory_levels,
+            "raw_material_used": raw_material_levels,
+            "raw_material_inventory": raw_material_inventory_levels,
+            "status": status_name(model),
+            "mip_gap": model.MIPGap if model.IsMIP else 0.0
+        }
+    return {
+        "objective_value": None,
+        "production_volumes": None,
+        "inventory_levels": None,
+        "raw_material_used": None,
+        "raw_material_inventory": None,
+        "status": status_name(model)
+    }
+
+
+def model_statistics(model):
+    """Runtime, MIP gap, node count and size of a solved model."""
+    stats = {
+        "runtime": model.Runtime,
+        "num_variables": model.NumVars,
+        "num_constraints": model.NumConstrs,
+        "num_nonzeros": model.NumNZs,
+    }
+    if model.IsMIP:
+        stats["node_count"] = model.NodeCount
+        stats["mip_gap"] = model.MIPGap if model.SolCount > 0 else None
+    return stats
+
+
+def update_production_model(model, variables, **changes):
+    """
+    Applies parameter changes to a model from build_production_model_matrix in place.
+
+    Only right-hand sides change, so the next optimize() can start from the
+    previous solution instead of rebuilding the model. The current solution of
+    the production variables is passed as a MIP start.
+
+    Args:
+        changes: New values for any of max_storage, initial_inventory,
+                 max_raw_material, initial_raw_material, max_production_change.
+    """
+    parameters = variables["parameters"]
+    constraints = variables["constraints"]
+    unknown = set(changes) - set(parameters)
+    if unknown:
+        raise ValueError(f"Unknown model parameters: {', '.join(sorted(unknown))}")
+
+    if model.SolCount > 0:
+        variables["production_volume"].Start = variables["production_volume"].X
+
+    for name, value in changes.items():
+        value = float(value)
+        if value == parameters[name]:
+            continue
+        if name == "max_storage":
+            constraints["storage_capacity"].RHS = np.full(constraints["storage_capacity"].shape, value)
+        elif name == "max_raw_material":
+            constraints["raw_material_capacity"].RHS = np.full(constraints["raw_material_capacity"].shape, value)
+        elif name == "max_production_change":
+            for key in ("production_increase", "production_decrease"):
+                if key in constraints:
+                    constraints[key].RHS = np.full(constraints[key].shape, value)
+            for key in ("initial_production_increase", "initial_production_decrease"):
+                if key in constraints:
+                    # RHS is the limit plus or minus the previous production
+                    constraints[key].RHS = constraints[key].RHS + (value - parameters[name])
+        elif name in ("initial_inventory", "initial_raw_material"):
+            # The initial level only enters the first period's balance constraint
+            constr = constraints["inventory_balance" if name == "initial_inventory" else "raw_material_balance"]
+            rhs = constr.RHS
+            rhs[0] += value - parameters[name]
+            constr.RHS = rhs
+        parameters[name] = value
+
+
+def solve_production_optimization(data: pd.DataFrame, max_storage: float = 500, initial_inventory: float = 100, max_raw_material: float = 200, initial_raw_material: float = 50, max_production_change: float = 50, vectorized: bool = True, controller: SolveController = None):
     """
     Solves a production planning optimization problem to maximize profit
     given production costs, storage constraints, and resource availability.
@@ -18,6 +307,10 @@ def solve_production_optimization(data: pd.DataFrame, max_storage: float = 500,
         max_raw_material (float): Maximum storage capacity for raw materials (Scrap Metal).
         initial_raw_material (float): Initial raw material inventory.
         max_production_change (float): Maximum change in production volume between months.
+        vectorized (bool): Build the model with the matrix API (build_production_model_matrix)
+                           instead of the per-month loops (build_production_model_loops).
+        controller (SolveController): Time/gap budget and incumbent callback of the solve;
+                           defaults to the standard tier (see solve_control.SOLVE_TIERS).
 
     Returns:
         dict: A dictionary containing the optimization results, including:
@@ -26,100 +319,25 @@ def solve_production_optimization(data: pd.DataFrame, max_storage: float = 500,
               - 'inventory_levels': A dictionary mapping month to the optimal inventory level.
               - 'raw_material_used': A dictionary mapping month to the optimal raw material used.
               - 'raw_material_inventory': A dictionary mapping month to the optimal raw material inventory level
-              - 'status': Optimization status (e.g., 'OPTIMAL', 'INFEASIBLE').
+              - 'status': Optimization status (e.g., 'OPTIMAL', 'TIME_LIMIT', 'INFEASIBLE').
+              - 'mip_gap': Relative gap of the returned solution (0 when proven optimal).
+              - 'incumbents': Improving solutions found during the solve (objective, bound, gap, runtime).
+              - 'solver_stats': Runtime, node count and size of the model (see model_statistics).
     """
 
     try:
-        # Create a Gurobi model
-        model = gp.Model("ProductionOptimization")
-
-        # --- Data Preparation ---
-        months = data['Month'].tolist()
-        num_months = len(months)
-
-        # Extract cost and revenue data from the DataFrame
-        raw_material_costs = data['Raw_Material_Cost'].tolist()
-        labor_costs = data['Labour_Cost'].tolist()
-        electricity_costs = data['Electricity_Cost'].tolist()
-        transportation_costs = data['Transportation_Cost'].tolist()
-        commission_costs = data['Commission_Cost'].tolist()
-        warehousing_costs = data['Warehousing_Cost'].tolist()
-        revenues = data['Revenue'].tolist()
-        scrap_metal_usage = data['Scrap_Metal_Used'].tolist()
-
-        # --- Decision Variables ---
-        production_volume = model.addVars(num_months, vtype=GRB.INTEGER, name="ProductionVolume", lb=0)  # Ensure non-negative production
-        inventory_level = model.addVars(num_months, vtype=GRB.CONTINUOUS, name="InventoryLevel", lb=0) #Ensure non-negative inventory
-        raw_material_inventory = model.addVars(num_months, vtype=GRB.CONTINUOUS, name="RawMaterialInventory", lb=0)
-
-        # --- Objective Function ---
-        # Maximize total profit (Revenue - Costs)
-        objective = gp.quicksum(revenues[i] - (raw_material_costs[i] + labor_costs[i] + electricity_costs[i] +
-                                                 transportation_costs[i] + commission_costs[i] + warehousing_costs[i])
-                                for i in range(num_months))
-
-        model.setObjective(objective, GRB.MAXIMIZE)
-
-        # --- Constraints ---
-
-        # Inventory Balance Constraints
-        # Initial Inventory
-        model.addConstr(inventory_level[0] == initial_inventory + production_volume[0] - (revenues[0] / data['Revenue'][0] * data['Production_Volume'][0]), name="InventoryBalance_0") # Assuming demand = Revenue/unit_price
-
-        for i in range(1, num_months):
-             model.addConstr(inventory_level[i] == inventory_level[i-1] + production_volume[i] - (revenues[i] / data['Revenue'][i] * data['Production_Volume'][i]), name=f"InventoryBalance_{i}")
-
-        # Raw Material Inventory Balance Constraints
-        #Initial Raw Material
-        model.addConstr(raw_material_inventory[0] == initial_raw_material - scrap_metal_usage[0] , name="RawMaterialBalance_0") #assuming scrap_metal_usage is the raw material use
-        for i in range(1,num_months):
-            model.addConstr(raw_material_inventory[i] == raw_material_inventory[i-1] - scrap_metal_usage[i] , name=f"RawMaterialBalance_{i}")
-
-        # Storage Capacity Constraints
-        for i in range(num_months):
-            model.addConstr(inventory_level[i] <= max_storage, name=f"StorageCapacity_{i}")
-            model.addConstr(raw_material_inventory[i] <= max_raw_material, name = f"RawMaterialCapacity_{i}")
-
-        # Production Change Constraints (Limit fluctuation in production)
-        for i in range(1, num_months):
-            model.addConstr(production_volume[i] - production_volume[i-1] <= max_production_change, name=f"ProductionIncrease_{i}")
-            model.addConstr(production_volume[i-1] - production_volume[i] <= max_production_change, name=f"ProductionDecrease_{i}")
-
-        # Resource Availability Constraint (Example: total raw material usage)
-        # Assuming a budget constraint for total cost over the time horizon.  Using the data, creating a constant
-        #model.addConstr(gp.quicksum(raw_material_costs[i] + labor_costs[i] + electricity_costs[i] + transportation_costs[i] + commission_costs[i] + warehousing_costs[i] for i in range(num_months)) <= 1000000, "BudgetConstraint") #10 Lakhs INR
-
-
+        build_model = build_production_model_matrix if vectorized else build_production_model_loops
+        model, variables = build_model(data, max_storage, initial_inventory, max_raw_material,
+                                       initial_raw_material, max_production_change)
 
         # --- Solve the Model ---
-        model.optimize()
-
-        # --- Extract Results ---
-        if model.status == GRB.OPTIMAL:
-            production_volumes = {months[i]: production_volume[i].x for i in range(num_months)}
-            inventory_levels = {months[i]: inventory_level[i].x for i in range(num_months)}
-            raw_material_levels = {months[i]: scrap_metal_usage[i] for i in range(num_months)} #These are the used levels not the inventory
-            raw_material_inventory_levels = {months[i]: raw_material_inventory[i].x for i in range(num_months)}
-
-            result_dict = {
-                "objective_value": model.objVal,
-                "production_volumes": production_volumes,
-                "inventory_levels": inventory_levels,
-                "raw_material_used": raw_material_levels,
-                "raw_material_inventory": raw_material_inventory_levels,
-                "status": "OPTIMAL"
-            }
-        else:
-            result_dict = {
-                "objective_value": None,
-                "production_volumes": None,
-                "inventory_levels": None,
-                "raw_material_used": None,
-                "raw_material_inventory": None,
-                "status": "INFEASIBLE" if model.status == GRB.INFEASIBLE else "OTHER"
-            }
-
-        return result_dict
+        controller = controller or SolveController.for_tier()
+        controller.optimize(model)
+
+        result = extract_production_results(model, variables, data)
+        result["incumbents"] = controller.incumbents
+        result["solver_stats"] = model_statistics(model)
+        return result
 
     except gp.GurobiError as e:
         print(f"Gurobi error: {e}")
@@ -0,0 +1,251 @@
+import ast
+import hashlib
+import inspect
+import io
+import multiprocessing
+import queue
+import sys
+import threading
+import traceback
+from collections import OrderedDict
+
+from datasets import StoredDataset
+from code_repair import find_entry_point, precheck
+
+# --- Sandboxed Code Execution ---
+# LLM-generated Gurobi code is executed in a pool of pre-warmed worker
+# processes instead of the server process. Each worker imports gurobipy,
+# pandas and numpy once at startup, runs one job at a time with its own
+# stdout/stderr capture, and is killed and replaced when a job exceeds its
+# wall-clock limit or dies (e.g. by hitting the memory limit). Compiled code
+# objects and precheck verdicts are cached per process by source hash, so
+# re-running the same generated code (what-ifs, sweeps, cached code) skips
+# parsing, checking and compiling.
+
+COMPILED_CACHE_SIZE = 64
+SOLVE_TIMEOUT_GRACE = 60  # seconds beyond a solve's time limit before the job counts as hung
+_compiled = OrderedDict()  # {sha256 of source: (code object or None, entry function name, precheck verdict)}
+_compiled_lock = threading.Lock()
+
+
+def _limit_memory(memory_limit_mb):
+    if not memory_limit_mb:
+        return
+    try:
+        import resource
+    except ImportError:  # Not available on Windows
+        return
+    limit = int(memory_limit_mb) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _build_namespace(data):
+    import numpy as np
+    import pandas as pd
+    try:
+        import gurobipy as gp
+        from gurobipy import GRB, quicksum, Model
+    except ImportError:
+        gp = GRB = quicksum = Model = None
+    return {
+        'gurobipy': gp,
+        'gp': gp,
+        'Model': Model,
+        'GRB': GRB,
+        'quicksum': quicksum,
+        'pd': pd,
+        'np': np,
+        'data': data,
+    }
+
+
+def _analyze(code_string):
+    key = hashlib.sha256(code_string.encode("utf-8")).hexdigest()
+    with _compiled_lock:
+        if key in _compiled:
+            _compiled.move_to_end(key)
+            return _compiled[key]
+    try:
+        tree = ast.parse(code_string)
+    except SyntaxError:
+        entry = (None, None, precheck(code_string))
+    else:
+        entry = (compile(tree, "<generated>", "exec"), find_entry_point(tree), precheck(code_string, tree))
+    with _compiled_lock:
+        _compiled[key] = entry
+        while len(_compiled) > COMPILED_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return entry
+
+
+def compile_generated(code_string):
+    """Returns ``(code object, entry function name)`` for generated code; raises SyntaxError."""
+    compiled, func_name, _ = _analyze(code_string)
+    if compiled is None:
+        ast.parse(code_string)  # raises the SyntaxError again
+    return compiled, func_name
+
+
+def precheck_generated(code_string):
+    """precheck() of generated code, cached with its compiled code so re-runs skip parsing."""
+    return _analyze(code_string)[2]
+
+
+def accepted_parameters(func, parameters):
+    """The subset of ``parameters`` that ``func`` accepts as keyword arguments."""
+    signature = inspect.signature(func)
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in signature.parameters.values()):
+        return dict(parameters)
+    return {name: value for name, value in parameters.items() if name in signature.parameters}
+
+
+def _apply_solve_budget(gp, budget):
+    # Models the generated code creates on the default environment inherit its
+    # parameters, so the time limit and gap apply without changing the code.
+    gp.resetParams()
+    for parameter, key in (("TimeLimit", "time_limit"), ("MIPGap", "mip_gap")):
+        if (budget or {}).get(key) is not None:
+            gp.setParam(parameter, budget[key])
+
+
+def run_code(code_string, data, kwargs=None, budget=None):
+    """Executes generated code and calls its solve function with ``data``.
+
+    ``kwargs`` (e.g. scenario parameters) are passed on to the function; a
+    parameter its signature does not accept is an error. ``budget``
+    ({"time_limit", "mip_gap"}, see solve_control) sets the Gurobi parameters
+    of the default environment.
+
+    Returns a tuple ``(result, error, stdout, stderr)``. Output of the code is
+    captured per call; this is only safe in a process running one job at a time.
+    """
+    if isinstance(data, StoredDataset):
+        # Memory-map the uploaded dataset here rather than pickling a DataFrame across processes
+        data = data.to_pandas()
+    namespace = _build_namespace(data)
+    if namespace['gurobipy'] is None:
+        return None, "Gurobipy is not installed or configured correctly on the server.", "", ""
+
+    redirected_output = io.StringIO()
+    redirected_error = io.StringIO()
+    old_stdout, old_stderr = sys.stdout, sys.stderr
+    try:
+        sys.stdout = redirected_output
+        sys.stderr = redirected_error
+        _apply_solve_budget(namespace['gurobipy'], budget)
+
+        # Define the functions of the generated code and find its entry point
+        compiled, func_name = compile_generated(code_string)
+        if func_name is None:
+            return None, "No function definition found in generated code.", redirected_output.getvalue(), redirected_error.getvalue()
+        exec(compiled, namespace)
+        if func_name not in namespace or not callable(namespace[func_name]):
+            return None, f"Function '{func_name}' not found or not callable after execution.", redirected_output.getvalue(), redirected_error.getvalue()
+        func = namespace[func_name]
+        accepted = accepted_parameters(func, kwargs or {})
+        ignored = [name for name in (kwargs or {}) if name not in accepted]
+        if ignored:
+            # Running without them would silently solve the base case
+            return None, f"The generated function does not accept the parameter(s): {', '.join(ignored)}.", redirected_output.getvalue(), redirected_error.getvalue()
+        result = func(data, **accepted)
+        return result, None, redirected_output.getvalue(), redirected_error.getvalue()
+    except MemoryError:
+        return None, "Error executing code: memory limit exceeded.", redirected_output.getvalue(), redirected_error.getvalue()
+    except Exception as e:
+        traceback.print_exc(file=redirected_error)
+        return None, f"Error executing code: {str(e)}", redirected_output.getvalue(), redirected_error.getvalue()
+    finally:
+        sys.stdout, sys.stderr = old_stdout, old_stderr
+
+
+def _worker_main(conn, memory_limit_mb):
+    # Pre-warm: pay the import cost once per worker, not once per job.
+    _build_namespace(None)
+    _limit_memory(memory_limit_mb)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        code_string, data, kwargs, budget = job
+        result, error, stdout, stderr = run_code(code_string, data, kwargs, budget)
+        try:
+            conn.send((result, error, stdout, stderr))
+        except Exception as e:
+            # The generated code returned something that cannot be pickled (e.g. Gurobi objects)
+            conn.send((None, f"Error returning results: {str(e)}", stdout, stderr))
+
+
+class _Worker:
+    def __init__(self, mp_context, memory_limit_mb):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(1)
+        finally:
+            self.conn.close()
+
+
+class SandboxPool:
+    def __init__(self, workers=2, timeout=300, memory_limit_mb=2048):
+        self.size = workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.started = False
+
+    def _start(self):
+        with self.lock:
+            if self.started:
+                return
+            for _ in range(self.size):
+                self.idle.put(_Worker(self.mp_context, self.memory_limit_mb))
+            self.started = True
+
+    def run(self, code_string, data, timeout=None, kwargs=None, budget=None):
+        """Runs generated code in a worker process.
+
+        Returns ``(result, error, output)`` where ``output`` holds the captured
+        ``stdout`` and ``stderr`` of the job.
+        """
+        self._start()
+        timeout = timeout or self.timeout
+        if budget and budget.get("time_limit"):
+            # Leave the solver time to stop at its limit and return the incumbent
+            timeout = max(timeout, budget["time_limit"] + SOLVE_TIMEOUT_GRACE)
+        worker = self.idle.get()
+        try:
+            worker.conn.send((code_string, data, kwargs, budget))
+            if not worker.conn.poll(timeout):
+                worker.kill()
+                worker = _Worker(self.mp_context, self.memory_limit_mb)
+                return None, f"Execution timed out after {timeout} seconds.", {"stdout": "", "stderr": ""}
+            result, error, stdout, stderr = worker.conn.recv()
+            return result, error, {"stdout": stdout, "stderr": stderr}
+        except (EOFError, OSError, BrokenPipeError):
+            # The worker died mid-job, most likely by exceeding its memory limit.
+            worker.kill()
+            worker = _Worker(self.mp_context, self.memory_limit_mb)
+            return None, "Execution process crashed (possibly out of memory).", {"stdout": "", "stderr": ""}
+        finally:
+            self.idle.put(worker)
+
+    def shutdown(self):
+        with self.lock:
+            while not self.idle.empty():
+                worker = self.idle.get_nowait()
+                try:
+                    worker.conn.send(None)
+                except (OSError, BrokenPipeError):
+                    pass
+                worker.kill()
+            self.started = False
@@ -0,0 +1,184 @@
+import contextlib
+import itertools
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# --- Scenario Sweeps ---
+# A parameter grid (e.g. max_storage x max_raw_material x max_production_change)
+# is expanded into scenarios and solved in parallel. The built-in production
+# model is split into contiguous chunks of scenarios, a few per worker process;
+# each worker builds the model once and re-solves it incrementally for the rest
+# of its chunk. Generated code is fanned out over the sandbox process pool.
+# Every chunk (or generated-code run) holds a solve slot while it runs, so a
+# sweep shares the server's concurrent-solve limit with other jobs, and the
+# job's cancellation is checked before each one starts.
+
+MAX_SCENARIOS = 500
+CHUNKS_PER_WORKER = 4  # smaller chunks give cancellation and other jobs a chance sooner
+
+
+def expand_grid(grid, max_scenarios=MAX_SCENARIOS):
+    """Expands {"param": [values, ...]} into a list of {"param": value} scenarios."""
+    if not isinstance(grid, dict) or not grid:
+        raise ValueError("The parameter grid must map parameter names to lists of values.")
+    names = list(grid)
+    values = []
+    for name in names:
+        options = grid[name] if isinstance(grid[name], (list, tuple)) else [grid[name]]
+        if not options:
+            raise ValueError(f"No values given for '{name}'.")
+        values.append([float(v) for v in options])
+    total = 1
+    for options in values:
+        total *= len(options)
+    if total > max_scenarios:
+        raise ValueError(f"The grid has {total} scenarios; the limit is {max_scenarios}.")
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def summarize_production_result(result):
+    """Compact row of key decisions from a solve_production_optimization result."""
+    row = {"status": result["status"], "objective_value": result["objective_value"]}
+    if result.get("mip_gap") is not None:
+        row["mip_gap"] = result["mip_gap"]
+    if result.get("production_volumes"):
+        production = list(result["production_volumes"].values())
+        inventory = list(result["inventory_levels"].values())
+        row.update({
+            "total_production": sum(production),
+            "peak_production": max(production),
+            "peak_inventory": max(inventory),
+            "ending_inventory": inventory[-1],
+        })
+    return row
+
+
+_worker_data = {}  # {dataset path: DataFrame}, one entry per worker process
+
+
+def _load(dataset):
+    if dataset.path not in _worker_data:
+        _worker_data.clear()
+        _worker_data[dataset.path] = dataset.to_pandas()
+    return _worker_data[dataset.path]
+
+
+def _solve_production_chunk(dataset, scenarios, budget=None):
+    import gurobipy as gp
+    from samplegurobi import build_production_model_matrix, extract_production_results, update_production_model
+    from solve_control import SolveController
+
+    data = _load(dataset)
+    env = gp.Env(empty=True)
+    env.setParam("OutputFlag", 0)
+    env.start()
+    controller = SolveController(**budget) if budget else SolveController.for_tier()
+    model = variables = None
+    rows = []
+    try:
+        for scenario in scenarios:
+            try:
+                if model is None:
+                    model, variables = build_production_model_matrix(data, env=env, **scenario)
+                else:
+                    update_production_model(model, variables, **scenario)
+                controller.optimize(model)
+                rows.append(summarize_production_result(extract_production_results(model, variables, data)))
+            except gp.GurobiError as e:
+                rows.append({"status": "ERROR", "objective_value": None, "error_message": str(e)})
+    finally:
+        if model is not None:
+            model.dispose()
+        env.dispose()
+    return rows
+
+
+def _chunks(items, count):
+    size, extra = divmod(len(items), count)
+    start = 0
+    for i in range(count):
+        end = start + size + (1 if i < extra else 0)
+        if end > start:
+            yield items[start:end]
+        start = end
+
+
+def _guarded(run, slot=None, check_cancelled=None):
+    """``run`` holding ``slot``, checking for cancellation before waiting for the slot and again once it is taken."""
+    def guarded(item):
+        if check_cancelled:
+            check_cancelled()
+        with slot or contextlib.nullcontext():
+            if check_cancelled:
+                check_cancelled()
+            return run(item)
+    return guarded
+
+
+class ScenarioRunner:
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.executor = None
+
+    def _executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def run_production(self, dataset, scenarios, budget=None, slot=None, check_cancelled=None):
+        """Solves the built-in production model for every scenario. Returns a list of result rows.
+
+        ``budget`` ({"time_limit", "mip_gap"}, see solve_control) applies to each scenario's solve.
+        ``slot`` is held while a chunk is solved (e.g. JobContext.solve_slot()) and
+        ``check_cancelled`` is called before each chunk starts.
+        """
+        executor = self._executor()
+
+        def run(chunk):
+            return executor.submit(_solve_production_chunk, dataset, chunk, budget).result()
+
+        chunks = list(_chunks(scenarios, self.workers * CHUNKS_PER_WORKER))
+        with ThreadPoolExecutor(max_workers=self.workers) as threads:
+            return [row for rows in threads.map(_guarded(run, slot, check_cancelled), chunks) for row in rows]
+
+    def run_generated(self, sandbox_pool, code_string, dataset, scenarios, budget=None, slot=None, check_cancelled=None):
+        """Runs generated code once per scenario on the sandbox pool; scenarios with parameters the entry function does not accept fail.
+
+        ``slot`` and ``check_cancelled`` are used per scenario as in run_production.
+        """
+        def run(scenario):
+            result, error, _ = sandbox_pool.run(code_string, dataset, kwargs=scenario, budget=budget)
+            if error:
+                return {"status": "ERROR", "objective_value": None, "error_message": error}
+            if isinstance(result, dict):
+                row = {"status": result.get("status", "UNKNOWN"), "objective_value": result.get("objective_value")}
+                if result.get("mip_gap") is not None:
+                    row["mip_gap"] = result["mip_gap"]
+                return row
+            return {"status": "UNKNOWN", "objective_value": None}
+
+        with ThreadPoolExecutor(max_workers=max(1, sandbox_pool.size)) as threads:
+            return list(threads.map(_guarded(run, slot, check_cancelled), scenarios))
+
+    def run(self, scenarios, solve):
+        """Runs ``solve(scenarios)`` and wraps the rows into a compact table."""
+        start = time.perf_counter()
+        rows = solve(scenarios)
+        elapsed = time.perf_counter() - start
+        parameters = list(scenarios[0]) if scenarios else []
+        table = [dict(scenario, **row) for scenario, row in zip(scenarios, rows)]
+        feasible = [row for row in table if row["objective_value"] is not None]
+        best = max(feasible, key=lambda row: row["objective_value"]) if feasible else None
+        return {
+            "parameters": parameters,
+            "scenarios": table,
+            "best_scenario": best,
+            "elapsed_seconds": elapsed,
+            "scenarios_per_second": len(scenarios) / elapsed if elapsed > 0 else None,
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
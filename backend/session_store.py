@@ -0,0 +1,153 @@
+import logging
+import pickle
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import pandas as pd
+
+from signing import PayloadSigner, SignatureError
+
+# --- Session Stores ---
+# Per-user state (answers, uploaded DataFrame, results, chat history) lives
+# behind a small get/set/delete interface so it can be bounded in memory or
+# moved to Redis and shared between several server processes.
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_session_size(data):
+    """Rough size in bytes of a session dict, dominated by DataFrames and long strings."""
+    total = 0
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(deep=True).sum())
+        elif isinstance(value, dict):
+            total += sys.getsizeof(value)
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            total += sys.getsizeof(value)
+            stack.extend(value)
+        else:
+            total += sys.getsizeof(value)
+    return total
+
+
+class MemorySessionStore:
+    """In-process store with LRU eviction, an idle TTL and a total memory budget."""
+
+    def __init__(self, max_sessions=1000, ttl=3600, memory_budget_mb=1024):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.memory_budget = memory_budget_mb * 1024 * 1024 if memory_budget_mb else None
+        self.sessions = OrderedDict()  # {session_id: (data, last_access, size)}
+        self.total_size = 0
+        self.lock = threading.Lock()
+
+    def get(self, session_id):
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return None
+            data, last_access, size = entry
+            if self.ttl and time.time() - last_access > self.ttl:
+                self._remove(session_id)
+                return None
+            self.sessions[session_id] = (data, time.time(), size)
+            self.sessions.move_to_end(session_id)
+            return data
+
+    def set(self, session_id, data):
+        size = estimate_session_size(data)
+        with self.lock:
+            self._remove(session_id)
+            self.sessions[session_id] = (data, time.time(), size)
+            self.total_size += size
+            self._evict(keep=session_id)
+
+    def delete(self, session_id):
+        with self.lock:
+            self._remove(session_id)
+
+    def _remove(self, session_id):
+        entry = self.sessions.pop(session_id, None)
+        if entry is not None:
+            self.total_size -= entry[2]
+
+    def _evict(self, keep):
+        now = time.time()
+        if self.ttl:
+            for session_id in [sid for sid, (_, last_access, _) in self.sessions.items() if now - last_access > self.ttl]:
+                self._remove(session_id)
+        # Least recently used sessions go first; the session being written is always kept
+        while self.sessions and (
+            len(self.sessions) > self.max_sessions
+            or (self.memory_budget and self.total_size > self.memory_budget)
+        ):
+            oldest = next(iter(self.sessions))
+            if oldest == keep:
+                break
+            self._remove(oldest)
+
+    def stats(self):
+        with self.lock:
+            return {"backend": "memory", "sessions": len(self.sessions), "bytes": self.total_size}
+
+
+class RedisSessionStore:
+    """Stores each session as one compressed, signed pickle under ``prefix + session_id`` with a sliding TTL.
+
+    ``client`` can be any Redis-compatible client exposing get/set/delete/expire
+    (redis-py, fakeredis, ...). DataFrames are pickled with protocol 5, which
+    keeps their column buffers as raw bytes, and the whole blob is zlib-compressed
+    and signed with ``signing_key`` (see signing.py). A session whose signature
+    does not match is treated as missing.
+    """
+
+    def __init__(self, client, signing_key, ttl=3600, prefix="inventory:session:"):
+        self.client = client
+        self.signer = PayloadSigner(signing_key)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _key(self, session_id):
+        return f"{self.prefix}{session_id}"
+
+    def get(self, session_id):
+        blob = self.client.get(self._key(session_id))
+        if blob is None:
+            return None
+        try:
+            payload = self.signer.verify(blob)
+        except SignatureError:
+            logger.warning("Ignoring session %s with an invalid signature", session_id)
+            return None
+        if self.ttl:
+            self.client.expire(self._key(session_id), self.ttl)
+        return pickle.loads(zlib.decompress(payload))
+
+    def set(self, session_id, data):
+        blob = self.signer.sign(zlib.compress(pickle.dumps(data, protocol=5), 1))
+        self.client.set(self._key(session_id), blob, ex=self.ttl or None)
+
+    def delete(self, session_id):
+        self.client.delete(self._key(session_id))
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+def create_session_store(backend="memory", redis_url=None, ttl=3600, max_sessions=1000, memory_budget_mb=1024, signing_key=None):
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package.")
+        if not signing_key:
+            raise RuntimeError("SESSION_BACKEND=redis requires REDIS_SIGNING_KEY to be set.")
+        return RedisSessionStore(redis.Redis.from_url(redis_url or "redis://localhost:6379/0"), signing_key, ttl=ttl)
+    return MemorySessionStore(max_sessions=max_sessions, ttl=ttl, memory_budget_mb=memory_budget_mb)
@@ -0,0 +1,36 @@
+import hashlib
+import hmac
+
+# --- Signed Payloads ---
+# Sessions and job records are stored in Redis as pickles, which can hold the
+# objects they contain (datasets, result frames, chat histories) as they are.
+# Unpickling runs code chosen by whoever wrote the bytes, so every payload is
+# signed with HMAC-SHA256 under a key only the server processes know
+# (REDIS_SIGNING_KEY) and is only unpickled when its signature checks out.
+# Anyone who can write to Redis but does not have the key can at most delete
+# or corrupt state, not run code in the app; anyone with the key is trusted
+# like the app itself.
+
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+class SignatureError(ValueError):
+    """A stored payload is not signed with this server's key."""
+
+
+class PayloadSigner:
+    def __init__(self, key):
+        if not key:
+            raise ValueError("A signing key is required.")
+        self.key = key.encode("utf-8") if isinstance(key, str) else bytes(key)
+
+    def sign(self, payload):
+        """``payload`` prefixed with its signature."""
+        return hmac.new(self.key, payload, hashlib.sha256).digest() + payload
+
+    def verify(self, signed):
+        """The payload of ``signed``; raises SignatureError if the signature does not match."""
+        signature, payload = signed[:DIGEST_SIZE], signed[DIGEST_SIZE:]
+        if not hmac.compare_digest(signature, hmac.new(self.key, payload, hashlib.sha256).digest()):
+            raise SignatureError("Stored payload has an invalid signature.")
+        return payload
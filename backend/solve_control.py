@@ -0,0 +1,168 @@
+import math
+import time
+
+try:
+    import gurobipy as gp
+    from gurobipy import GRB
+except ImportError:  # the tiers and solve_budget are also used by a server without Gurobi
+    gp = GRB = None
+
+# --- Solve Budgets and Incumbents ---
+# Every solve runs with a time limit and a relative MIP gap taken from a
+# request tier (interactive, standard, batch). A MIP callback records each
+# improving incumbent and can publish it while the solve is still running;
+# when the budget runs out, the best solution found is returned together with
+# its gap instead of being discarded.
+
+SOLVE_TIERS = {
+    "interactive": {"time_limit": 10, "mip_gap": 0.01},
+    "standard": {"time_limit": 60, "mip_gap": 0.001},
+    "batch": {"time_limit": 600, "mip_gap": 0.0001},
+}
+DEFAULT_TIER = "standard"
+MAX_INCUMBENTS = 50  # incumbents kept per solve; the earliest and latest ones are most telling
+
+STATUS_NAMES = {} if GRB is None else {
+    GRB.LOADED: "LOADED",
+    GRB.OPTIMAL: "OPTIMAL",
+    GRB.INFEASIBLE: "INFEASIBLE",
+    GRB.INF_OR_UNBD: "INF_OR_UNBD",
+    GRB.UNBOUNDED: "UNBOUNDED",
+    GRB.CUTOFF: "CUTOFF",
+    GRB.ITERATION_LIMIT: "ITERATION_LIMIT",
+    GRB.NODE_LIMIT: "NODE_LIMIT",
+    GRB.TIME_LIMIT: "TIME_LIMIT",
+    GRB.SOLUTION_LIMIT: "SOLUTION_LIMIT",
+    GRB.INTERRUPTED: "INTERRUPTED",
+    GRB.NUMERIC: "NUMERIC",
+    GRB.SUBOPTIMAL: "SUBOPTIMAL",
+    GRB.INPROGRESS: "INPROGRESS",
+    GRB.USER_OBJ_LIMIT: "USER_OBJ_LIMIT",
+    GRB.WORK_LIMIT: "WORK_LIMIT",
+    GRB.MEM_LIMIT: "MEM_LIMIT",
+}
+
+
+def status_name(model):
+    return STATUS_NAMES.get(model.Status, "OTHER")
+
+
+def relative_gap(objective, bound):
+    """Gurobi's relative MIP gap |bound - objective| / |objective|, or None where it is infinite."""
+    if objective is None or bound is None or abs(objective) >= GRB.INFINITY or abs(bound) >= GRB.INFINITY:
+        return None
+    if objective == bound:
+        return 0.0
+    if objective == 0:
+        return None
+    return abs(bound - objective) / abs(objective)
+
+
+def solve_budget(tier=None, tiers=SOLVE_TIERS):
+    """Time limit and MIP gap of a tier; raises ValueError for unknown tiers."""
+    tier = tier or DEFAULT_TIER
+    if tier not in tiers:
+        raise ValueError(f"Unknown solve tier '{tier}'. Use one of: {', '.join(tiers)}")
+    return dict(tiers[tier])
+
+
+def apply_budget(params, budget):
+    """Sets TimeLimit and MIPGap on ``params`` (model.Params, or an Env via setParam)."""
+    for parameter, key in (("TimeLimit", "time_limit"), ("MIPGap", "mip_gap")):
+        value = (budget or {}).get(key)
+        if value is not None:
+            if isinstance(params, gp.Env):
+                params.setParam(parameter, value)
+            else:
+                setattr(params, parameter, value)
+
+
+class SolveController:
+    """
+    Runs model.optimize() within a time and gap budget and tracks incumbents.
+
+    Args:
+        time_limit: Seconds before Gurobi stops with the best solution found.
+        mip_gap: Relative gap at which a MIP counts as solved.
+        on_incumbent: Called with each improving incumbent (a dict with
+            objective, bound, gap, runtime and solution_count) from inside the
+            solve. Exceptions it raises stop the solve and are re-raised from
+            optimize(), so e.g. a cancelled job can abort a running solve.
+        should_stop: Polled during the solve; returning True terminates it
+            with the current incumbent.
+        min_interval: Minimum seconds between on_incumbent calls; the final
+            incumbent is always in ``incumbents``.
+    """
+
+    def __init__(self, time_limit=None, mip_gap=None, on_incumbent=None, should_stop=None, min_interval=0.0):
+        self.time_limit = time_limit
+        self.mip_gap = mip_gap
+        self.on_incumbent = on_incumbent
+        self.should_stop = should_stop
+        self.min_interval = min_interval
+        self.incumbents = []
+        self._error = None
+        self._sense = 1
+        self._last_published = -math.inf
+
+    @classmethod
+    def for_tier(cls, tier=None, tiers=SOLVE_TIERS, **kwargs):
+        return cls(**solve_budget(tier, tiers), **kwargs)
+
+    @property
+    def budget(self):
+        return {"time_limit": self.time_limit, "mip_gap": self.mip_gap}
+
+    def optimize(self, model):
+        model.update()  # IsMIP and ModelSense only reflect pending changes after an update
+        apply_budget(model.Params, self.budget)
+        self.incumbents = []
+        self._error = None
+        self._sense = model.ModelSense  # 1 minimize, -1 maximize
+        if model.IsMIP:
+            model.optimize(self._callback)
+        else:
+            model.optimize()
+        if self._error is not None:
+            raise self._error
+        return model
+
+    def _callback(self, model, where):
+        try:
+            if where == GRB.Callback.MIPSOL:
+                objective = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+                if self.incumbents and (objective - self.incumbents[-1]["objective"]) * self._sense >= 0:
+                    return  # heuristics also report solutions that do not improve on the incumbent
+                bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+                incumbent = {
+                    "objective": objective,
+                    "bound": bound,
+                    "gap": relative_gap(objective, bound),
+                    "runtime": model.cbGet(GRB.Callback.RUNTIME),
+                    "solution_count": model.cbGet(GRB.Callback.MIPSOL_SOLCNT) + 1,
+                }
+                self.incumbents.append(incumbent)
+                if len(self.incumbents) > MAX_INCUMBENTS:
+                    del self.incumbents[1]
+                now = time.monotonic()
+                if self.on_incumbent and now - self._last_published >= self.min_interval:
+                    self._last_published = now
+                    self.on_incumbent(incumbent)
+            elif where == GRB.Callback.MIP and self.should_stop and self.should_stop():
+                model.terminate()
+        except Exception as e:
+            self._error = e
+            model.terminate()
+
+    def summary(self, model):
+        """Status, gap and incumbent history of the last solve, for result dicts."""
+        summary = {
+            "status": status_name(model),
+            "time_limit": self.time_limit,
+            "mip_gap_limit": self.mip_gap,
+            "incumbents": list(self.incumbents),
+        }
+        if model.IsMIP and model.SolCount > 0:
+            summary["mip_gap"] = model.MIPGap
+            summary["objective_bound"] = model.ObjBound
+        return summary
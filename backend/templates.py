@@ -0,0 +1,199 @@
+import re
+import threading
+
+from samplegurobi import REQUIRED_COLUMNS, solve_production_optimization
+from multisku import VALUE_COLUMNS, solve_multi_sku_optimization
+from rolling_horizon import solve_production_rolling_horizon
+
+# --- Built-in Model Templates ---
+# Datasets whose schema matches a model this server already has (e.g. the
+# production planning columns of samplegurobi.py) are solved with that model
+# directly, without asking the LLM to identify the problem and write code.
+# Matching works on a profile of the dataset (normalized column names, kinds,
+# cardinalities and the detected time column) built from the statistics
+# gathered at upload. Only the distinct values of time columns are read from
+# the stored file, when the upload statistics do not have them (they are
+# counted for text columns only).
+
+TIME_COLUMN_HINTS = ("month", "date", "period", "week", "year", "day", "quarter", "time")
+SKU_COLUMN_HINTS = ("sku", "product", "item", "article")
+SITE_COLUMN_HINTS = ("site", "location", "warehouse", "plant", "store", "facility")
+ROLLING_HORIZON_PERIODS = 300  # longer production plans are solved window by window (rolling_horizon.py)
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_column(name):
+    """'Raw Material Cost' and 'raw_material-cost' both become 'raw_material_cost'."""
+    return _NON_WORD.sub("_", str(name).lower()).strip("_")
+
+
+def _column_kind(dtype):
+    dtype = str(dtype)
+    if dtype.startswith(("int", "uint", "float", "Int", "UInt", "Float")):
+        return "numeric"
+    if dtype.startswith("datetime"):
+        return "datetime"
+    if dtype in ("bool", "boolean"):
+        return "bool"
+    return "text"
+
+
+def _has_hint(normalized, hints):
+    # Whole words only, so "Yearly_Revenue" is not a time column; plurals count ("Products")
+    return any(word in hints or word.rstrip("s") in hints for word in normalized.split("_"))
+
+
+def profile_dataset(dataset):
+    """
+    Schema profile of a StoredDataset used for template matching.
+
+    Returns a dict with num_rows, per-column {normalized name, kind,
+    null_count, distinct_count (None when unknown)} and time_column, the first
+    column that looks like a time index (by name or datetime type). Distinct
+    counts are always known for columns that look like a time index.
+    """
+    columns = {}
+    for column in dataset.columns:
+        stats = dataset.stats.get(column, {})
+        columns[column] = {
+            "normalized": normalize_column(column),
+            "kind": _column_kind(stats.get("dtype", dataset.dtypes.get(column))),
+            "null_count": stats.get("null_count", 0),
+            "distinct_count": stats.get("distinct_count"),
+        }
+    for column, info in columns.items():
+        if info["distinct_count"] is None and (info["kind"] == "datetime" or _has_hint(info["normalized"], TIME_COLUMN_HINTS)):
+            info["distinct_count"] = dataset.distinct_count(column)
+    time_column = next((c for c, info in columns.items() if info["kind"] == "datetime"), None)
+    if time_column is None:
+        time_column = next((c for c, info in columns.items() if _has_hint(info["normalized"], TIME_COLUMN_HINTS)), None)
+    return {"num_rows": dataset.num_rows, "columns": columns, "time_column": time_column}
+
+
+def _find_columns(profile, names):
+    """{canonical name: dataset column} for every name in ``names``, or None if one is missing."""
+    by_normalized = {info["normalized"]: column for column, info in profile["columns"].items()}
+    mapping = {}
+    for name in names:
+        column = by_normalized.get(normalize_column(name))
+        if column is None:
+            return None
+        mapping[name] = column
+    return mapping
+
+
+def _find_hinted(profile, hints, exclude=(), kinds=("text",)):
+    for column, info in profile["columns"].items():
+        if column not in exclude and info["kind"] in kinds and _has_hint(info["normalized"], hints):
+            return column
+    return None
+
+
+def _usable(profile, mapping, numeric):
+    """Required columns are complete and the value columns numeric."""
+    columns = profile["columns"]
+    return (all(columns[c]["null_count"] == 0 for c in mapping.values())
+            and all(columns[mapping[name]]["kind"] == "numeric" for name in numeric))
+
+
+class Template:
+    """A built-in model with the schema it accepts.
+
+    ``match(profile)`` returns the keyword arguments for ``solve`` (column
+    mapping and key columns) or None; ``solve(data, controller, **match)``
+    returns a result dict like generated code does.
+    """
+
+    def __init__(self, name, problem_type, match, solve):
+        self.name = name
+        self.problem_type = problem_type
+        self.match = match
+        self.solve = solve
+
+
+def _match_production(profile):
+    mapping = _find_columns(profile, REQUIRED_COLUMNS)
+    if mapping is None or not _usable(profile, mapping, [c for c in REQUIRED_COLUMNS if c != "Month"]):
+        return None
+    # One row per period; repeated periods mean several products or sites
+    distinct = profile["columns"][mapping["Month"]]["distinct_count"]
+    if distinct is None:
+        # Unknown count: a column that looks like a SKU or site key means a panel
+        if _find_hinted(profile, SKU_COLUMN_HINTS + SITE_COLUMN_HINTS, exclude=[mapping["Month"]], kinds=("text", "numeric")):
+            return None
+    elif distinct != profile["num_rows"]:
+        return None
+    return {"columns": mapping, "rolling_horizon": profile["num_rows"] > ROLLING_HORIZON_PERIODS}
+
+
+def _solve_production(data, controller, columns, rolling_horizon=False):
+    data = data.rename(columns={column: name for name, column in columns.items()})
+    if rolling_horizon:
+        return solve_production_rolling_horizon(data, controller=controller)
+    return solve_production_optimization(data, controller=controller)
+
+
+def _match_multi_sku(profile):
+    mapping = _find_columns(profile, VALUE_COLUMNS)
+    period_column = profile["time_column"]
+    if mapping is None or period_column is None or not _usable(profile, mapping, VALUE_COLUMNS):
+        return None
+    sku_column = _find_hinted(profile, SKU_COLUMN_HINTS, exclude=[period_column])
+    if sku_column is None:
+        return None
+    site_column = _find_hinted(profile, SITE_COLUMN_HINTS, exclude=[period_column, sku_column])
+    return {"columns": mapping, "sku_column": sku_column, "site_column": site_column, "period_column": period_column}
+
+
+def _solve_multi_sku(data, controller, columns, sku_column, site_column, period_column):
+    data = data.rename(columns={column: name for name, column in columns.items()})
+    return solve_multi_sku_optimization(data, sku_column=sku_column, site_column=site_column or "Site",
+                                        period_column=period_column, controller=controller)
+
+
+# In order of preference: one product per period first, then SKU/site panels
+TEMPLATES = [
+    Template("production_planning", "Production Planning", _match_production, _solve_production),
+    Template("multi_sku_production", "Multi-SKU Production Planning", _match_multi_sku, _solve_multi_sku),
+]
+
+
+class TemplateRouter:
+    """Picks the template for a dataset profile and counts how often the LLM is skipped."""
+
+    def __init__(self, templates=TEMPLATES):
+        self.templates = list(templates)
+        self.lock = threading.Lock()
+        self.hits = {template.name: 0 for template in self.templates}
+        self.misses = 0
+        self.fallbacks = 0
+
+    def route(self, profile):
+        """(template, solve arguments) for the first matching template, or (None, None)."""
+        for template in self.templates:
+            arguments = template.match(profile)
+            if arguments is not None:
+                with self.lock:
+                    self.hits[template.name] += 1
+                return template, arguments
+        with self.lock:
+            self.misses += 1
+        return None, None
+
+    def record_fallback(self):
+        """A matched template failed to solve and the request went to the LLM after all."""
+        with self.lock:
+            self.fallbacks += 1
+
+    def stats(self):
+        with self.lock:
+            hits = sum(self.hits.values()) - self.fallbacks
+            total = sum(self.hits.values()) + self.misses
+            return {
+                "hits": dict(self.hits),
+                "misses": self.misses,
+                "fallbacks": self.fallbacks,
+                "llm_skipped": hits,
+                "hit_rate": hits / total if total else 0.0,
+            }
@@ -0,0 +1,107 @@
+"""Chat history cursors and compaction.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import unittest
+
+from chat_history import SUMMARY_MAX_LINES, ChatHistory
+
+
+def history(count, **kwargs):
+    chat = ChatHistory(**{"max_chars": None, "keep_recent": 2, **kwargs})
+    for i in range(1, count + 1):
+        chat.append({"role": "user" if i % 2 else "bot", "content": f"message {i}"})
+    return chat
+
+
+def contents(messages):
+    return [m["content"] for m in messages]
+
+
+class SinceTest(unittest.TestCase):
+    def test_no_cursor_gets_the_whole_log(self):
+        messages, reset = history(3).since(None)
+        self.assertTrue(reset)
+        self.assertEqual(contents(messages), ["message 1", "message 2", "message 3"])
+
+    def test_cursor_gets_only_newer_messages(self):
+        chat = history(2)
+        cursor = chat.cursor
+        chat.append({"role": "bot", "content": "message 3"})
+        messages, reset = chat.since(cursor)
+        self.assertFalse(reset)
+        self.assertEqual(messages, [{"role": "bot", "content": "message 3", "seq": 3}])
+        self.assertEqual(chat.since(chat.cursor), ([], False))
+
+    def test_unknown_cursor_resets(self):
+        # e.g. a cursor of a session that expired and was recreated
+        messages, reset = history(2).since(10)
+        self.assertTrue(reset)
+        self.assertEqual(len(messages), 2)
+
+    def test_added_since_drops_sequence_numbers(self):
+        chat = history(3)
+        self.assertEqual(chat.added_since(1), [{"role": "bot", "content": "message 2"}, {"role": "user", "content": "message 3"}])
+        self.assertEqual(chat.added_since(chat.cursor), [])
+
+
+class CompactTest(unittest.TestCase):
+    def test_compact_keeps_recent_messages_and_sequence_numbers(self):
+        chat = history(6)
+        chat.compact()
+        summary, *recent = chat.messages
+        self.assertTrue(summary["summary"])
+        self.assertEqual(summary["seq"], 4)
+        self.assertIn("- You: message 1", summary["content"])
+        self.assertIn("- Assistant: message 4", summary["content"])
+        self.assertEqual(contents(recent), ["message 5", "message 6"])
+        self.assertEqual(chat.cursor, 6)
+        self.assertEqual(chat.append({"role": "bot", "content": "message 7"})["seq"], 7)
+
+    def test_cursor_taken_before_compaction(self):
+        chat = history(6)
+        stale, current = 2, chat.cursor
+        chat.compact()
+
+        messages, reset = chat.since(stale)
+        self.assertTrue(reset)
+        self.assertEqual(contents(messages)[1:], ["message 5", "message 6"])
+        self.assertTrue(messages[0]["summary"])
+        self.assertEqual(chat.since(current), ([], False))
+        # Messages that were compacted are not returned as additions again
+        self.assertEqual(contents(chat.added_since(stale)), ["message 5", "message 6"])
+
+    def test_cursor_at_the_compaction_boundary_does_not_reset(self):
+        chat = history(6)
+        chat.compact()
+        messages, reset = chat.since(4)
+        self.assertFalse(reset)
+        self.assertEqual(contents(messages), ["message 5", "message 6"])
+
+    def test_repeated_compaction_extends_one_summary(self):
+        chat = history(4)
+        chat.compact()
+        for i in range(5, 9):
+            chat.append({"role": "bot", "content": f"message {i}"})
+        chat.compact()
+        self.assertEqual(sum(1 for m in chat if m.get("summary")), 1)
+        self.assertEqual(chat.messages[0]["seq"], 6)
+        self.assertEqual(chat.messages[0]["content"].count("\n- "), 6)
+        self.assertEqual(contents(chat.messages[1:]), ["message 7", "message 8"])
+
+    def test_size_budget_triggers_compaction(self):
+        chat = history(10, max_chars=50, keep_recent=3)
+        self.assertLessEqual(len(chat), 4)
+        self.assertTrue(chat.messages[0]["summary"])
+        self.assertEqual(contents(chat.messages[-3:]), ["message 8", "message 9", "message 10"])
+
+    def test_summary_is_capped(self):
+        chat = history(SUMMARY_MAX_LINES + 12)
+        chat.compact()
+        lines = chat.messages[0]["content"].splitlines()
+        self.assertIn("- … 10 earlier messages", lines)
+        self.assertEqual(len([line for line in lines if line.startswith("- You") or line.startswith("- Assistant")]), SUMMARY_MAX_LINES)
+
+
+if __name__ == "__main__":
+    unittest.main()
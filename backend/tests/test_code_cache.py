@@ -0,0 +1,105 @@
+"""Generated code cache: hits, expiry, LRU eviction and repairs.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from code_cache import CodeCache, make_cache_key
+
+
+class CodeCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "cache.sqlite3")
+        self.now = 1_000_000.0
+        clock = mock.patch("code_cache.time.time", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def cache(self, **kwargs):
+        return CodeCache(self.path, **kwargs)
+
+    def test_hit_and_miss(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get("k"))
+        cache.put("k", "def solve(data): ...", "Production Planning", "response")
+        self.assertEqual(cache.get("k"), {"code": "def solve(data): ...", "problem_type": "Production Planning", "response_content": "response"})
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+    def test_entries_persist_across_instances(self):
+        self.cache().put("k", "code", "Scheduling")
+        self.assertEqual(self.cache().get("k")["code"], "code")
+
+    def test_expired_entries_miss(self):
+        cache = self.cache(ttl=60)
+        cache.put("k", "code", "Scheduling")
+        self.now += 30
+        self.assertTrue(cache.contains("k"))
+        self.now += 31
+        self.assertFalse(cache.contains("k"))
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = self.cache(max_entries=2)
+        cache.put("a", "code a", None)
+        self.now += 1
+        cache.put("b", "code b", None)
+        self.now += 1
+        cache.get("a")
+        self.now += 1
+        cache.put("c", "code c", None)
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_repairs(self):
+        cache = self.cache()
+        self.assertIsNone(cache.get_repair("broken", "KeyError: 'Demand'"))
+        cache.put_repair("broken", "KeyError: 'Demand'", "fixed")
+        self.assertEqual(cache.get_repair("broken", "KeyError: 'Demand'"), "fixed")
+        self.assertIsNone(cache.get_repair("broken", "ZeroDivisionError"))
+        self.assertEqual(cache.stats()["repair_hits"], 1)
+
+    def test_connections_are_closed(self):
+        connections = []
+        sqlite_connect = sqlite3.connect
+
+        def connect(*args, **kwargs):
+            connections.append(sqlite_connect(*args, **kwargs))
+            return connections[-1]
+
+        with mock.patch("code_cache.sqlite3.connect", side_effect=connect):
+            cache = self.cache()
+            cache.put("k", "code", None)
+            cache.get("k")
+            cache.stats()
+        self.assertEqual(len(connections), 4)
+        for conn in connections:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+class CacheKeyTest(unittest.TestCase):
+    def test_key_ignores_formatting_and_storage_widths(self):
+        narrow = pd.DataFrame({"Month": pd.Series([1, 2], dtype="int8"), "Demand": [1.0, 2.0]})
+        wide = pd.DataFrame({"Month": pd.Series([1, 2], dtype="int64"), "Demand": [1.0, 2.0]})
+        self.assertEqual(make_cache_key({"business_type": "  Bakery "}, narrow), make_cache_key({"business_type": "bakery"}, wide))
+
+    def test_key_depends_on_profile_and_columns(self):
+        data = pd.DataFrame({"Month": [1, 2]})
+        key = make_cache_key({"business_type": "bakery"}, data)
+        self.assertNotEqual(key, make_cache_key({"business_type": "brewery"}, data))
+        self.assertNotEqual(key, make_cache_key({"business_type": "bakery"}, data.rename(columns={"Month": "Week"})))
+
+
+if __name__ == "__main__":
+    unittest.main()
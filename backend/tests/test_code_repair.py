@@ -0,0 +1,120 @@
+"""Sanitizing generated code and finding its entry function.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import ast
+import textwrap
+import unittest
+
+from code_repair import find_entry_point, precheck, sanitize_code
+
+
+def code(source):
+    return textwrap.dedent(source).strip()
+
+
+def entry_point(source):
+    return find_entry_point(ast.parse(code(source)))
+
+
+class SanitizeCodeTest(unittest.TestCase):
+    def test_main_block_and_prints_are_removed(self):
+        sanitized = sanitize_code(code("""
+            import pandas as pd
+
+            def solve(data):
+                # Build the model
+                print("building", (len(data), {"rows": [1, 2]}))
+                total = data["Demand"].sum()
+                print(
+                    f"total: {total}",
+                    "done",
+                )
+                return {"objective_value": total}
+
+            if __name__ == "__main__":
+                print(solve(pd.read_csv("data.csv")))
+        """))
+        self.assertEqual(sanitized, code("""
+            import pandas as pd
+
+            def solve(data):
+                # Build the model
+                total = data["Demand"].sum()
+                return {"objective_value": total}
+        """))
+
+    def test_block_of_only_prints_becomes_pass(self):
+        sanitized = sanitize_code(code("""
+            def solve(data):
+                if data.empty:
+                    print("no data")
+                    print("really")
+                return {}
+        """))
+        self.assertEqual(sanitized, code("""
+            def solve(data):
+                if data.empty:
+                    pass
+                return {}
+        """))
+        ast.parse(sanitized)
+
+    def test_print_sharing_a_line_falls_back_to_unparsing(self):
+        sanitized = sanitize_code("def solve(data):\n    x = 1; print(x)\n    return {'x': x}\n")
+        self.assertNotIn("print", sanitized)
+        self.assertEqual(find_entry_point(ast.parse(sanitized)), "solve")
+
+    def test_non_ascii_text_keeps_offsets(self):
+        sanitized = sanitize_code('def solve(data):\n    label = "Überstunden €"\n    print(label)\n    return {"label": label}\n')
+        self.assertEqual(sanitized, 'def solve(data):\n    label = "Überstunden €"\n    return {"label": label}')
+
+    def test_code_without_prints_is_unchanged(self):
+        source = "def solve(data):\n    return {}\n"
+        self.assertIs(sanitize_code(source), source)
+
+    def test_syntax_errors_are_left_to_precheck(self):
+        source = "def solve(data)\n    print('x')\n"
+        self.assertEqual(sanitize_code(source), source)
+        self.assertIn("Syntax error", precheck(source))
+
+
+class FindEntryPointTest(unittest.TestCase):
+    def test_solve_name_wins(self):
+        self.assertEqual(entry_point("""
+            def load(data):
+                return data
+            def optimize_inventory(data):
+                return {}
+            def report(data):
+                return {}
+        """), "optimize_inventory")
+
+    def test_helpers_called_by_other_functions_are_skipped(self):
+        self.assertEqual(entry_point("""
+            def solve_month(data, month):
+                return month
+            def run(data):
+                return [solve_month(data, m) for m in range(3)]
+        """), "run")
+
+    def test_last_candidate_without_hints(self):
+        self.assertEqual(entry_point("""
+            def first(data):
+                return {}
+            def second(data):
+                return {}
+        """), "second")
+
+    def test_functions_without_arguments_are_not_candidates(self):
+        self.assertEqual(entry_point("""
+            def solve():
+                return {}
+            def plan(data):
+                return {}
+        """), "plan")
+        self.assertIsNone(entry_point("def solve():\n    return {}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
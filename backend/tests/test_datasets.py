@@ -0,0 +1,42 @@
+"""Uploaded datasets read back into pandas the way pd.read_csv would return them.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import pyarrow as pa
+
+from datasets import ingest_csv
+
+CSV = "SKU,Site,Month,Demand\n" + "".join(f"{sku},{site},{month},{month * 10}\n"
+                                          for sku in ("A", "B") for site in ("North", "South") for month in (1, 2, 3))
+
+
+class StoredDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        path = os.path.join(self.tmp.name, "data.csv")
+        with open(path, "w") as f:
+            f.write(CSV)
+        self.dataset = ingest_csv(path, self.tmp.name)
+        self.expected = pd.read_csv(path)
+
+    def test_text_columns_are_stored_as_dictionaries(self):
+        self.assertTrue(pa.types.is_dictionary(self.dataset.to_arrow().schema.field("SKU").type))
+
+    def test_to_pandas_decodes_text_columns(self):
+        data = self.dataset.to_pandas()
+        pd.testing.assert_frame_equal(data, self.expected)
+        self.assertEqual(self.dataset.dtypes["SKU"], str(self.expected["SKU"].dtype))
+        self.assertEqual(sorted(data.groupby("SKU")["Demand"].sum().index), ["A", "B"])
+
+    def test_head_decodes_text_columns(self):
+        pd.testing.assert_frame_equal(self.dataset.head(4), self.expected.head(4))
+
+
+if __name__ == "__main__":
+    unittest.main()
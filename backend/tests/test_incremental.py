@@ -0,0 +1,45 @@
+"""Warm (cached model) and cold (rebuilt model) what-if solves.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import unittest
+
+try:
+    import gurobipy as gp
+    from incremental import ProductionModelCache
+    from solve_control import SolveController
+    from benchmarks.synthetic import make_production_data
+except ImportError:
+    gp = None
+
+
+@unittest.skipIf(gp is None, "needs gurobipy")
+class WarmColdWhatIfTest(unittest.TestCase):
+    def setUp(self):
+        self.data = make_production_data(24, seed=3)
+        self.cache = ProductionModelCache()
+        self.addCleanup(self.cache.discard, "session")
+
+    def solve(self, **parameters):
+        return self.cache.solve("session", "data", lambda: self.data, controller=SolveController(time_limit=30, mip_gap=0), **parameters)
+
+    def test_earlier_what_if_values_do_not_carry_over(self):
+        self.solve(initial_inventory=400)
+        warm = self.solve(max_storage=450)
+        self.assertTrue(warm["warm_start"])
+
+        self.cache.discard("session")  # as after eviction, a restart or on another worker
+        cold = self.solve(max_storage=450)
+        self.assertFalse(cold["warm_start"])
+
+        self.assertEqual(warm["parameters"], cold["parameters"])
+        self.assertAlmostEqual(warm["objective_value"], cold["objective_value"], places=4)
+        self.assertEqual(warm["production_volumes"], cold["production_volumes"])
+
+    def test_unknown_parameter_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.solve(lead_time=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+"""LLM HTTP client retries, rate limits and SSE parsing, against a local stub server.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import asyncio
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from llm_client import AsyncLLMClient, LLMClient, httpx
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers each path with the next scripted response of the server; the last one repeats."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with server.lock:
+            server.requests.append((self.path, time.monotonic()))
+            script = server.scripts[self.path]
+            status, headers, body = script.pop(0) if len(script) > 1 else script[0]
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            time.sleep(server.delay)
+            body = body.encode("utf-8")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def ok(payload):
+    return 200, {"Content-Type": "application/json"}, json.dumps(payload)
+
+
+def sse(*events):
+    return 200, {"Content-Type": "text/event-stream"}, "".join(f"{event}\n\n" for event in events)
+
+
+class StubServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.scripts = {}
+        self.server.delay = 0
+        self.server.active = self.server.peak = 0
+        thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def script(self, path, *responses):
+        self.server.scripts[path] = list(responses)
+        return self.url(path)
+
+    def client(self, **kwargs):
+        # A large backoff base shows whether Retry-After was used instead
+        client = LLMClient(**{"backoff_base": 5, "timeout": 5, **kwargs})
+        self.addCleanup(client.close)
+        return client
+
+    def request_times(self, path):
+        return [at for requested, at in self.server.requests if requested == path]
+
+
+class LLMClientTest(StubServerTest):
+    def test_retry_after_is_honored(self):
+        url = self.script("/generate", (503, {"Retry-After": "0.2"}, "busy"), ok({"text": "done"}))
+        self.assertEqual(self.client().post_json("stub", url, {"prompt": "hi"}), {"text": "done"})
+        first, second = self.request_times("/generate")
+        self.assertGreaterEqual(second - first, 0.2)
+        self.assertLess(second - first, 2)
+
+    def test_error_is_raised_once_retries_are_exhausted(self):
+        url = self.script("/generate", (500, {"Retry-After": "0"}, "failed"))
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            self.client(max_retries=2).post_json("stub", url, {})
+        self.assertEqual(raised.exception.response.status_code, 500)
+        self.assertEqual(len(self.request_times("/generate")), 3)
+
+    def test_client_errors_are_not_retried(self):
+        url = self.script("/generate", (400, {}, "bad request"), ok({}))
+        with self.assertRaises(requests.exceptions.HTTPError):
+            self.client().post_json("stub", url, {})
+        self.assertEqual(len(self.request_times("/generate")), 1)
+
+    def test_rate_limit_spaces_requests(self):
+        url = self.script("/generate", ok({}))
+        client = self.client(providers={"stub": {"rate": 10, "burst": 1}})
+        for _ in range(4):
+            client.post_json("stub", url, {})
+        times = self.request_times("/generate")
+        self.assertGreaterEqual(times[-1] - times[0], 0.25)
+
+    def test_concurrency_cap(self):
+        url = self.script("/generate", ok({}))
+        self.server.delay = 0.05
+        client = self.client(providers={"stub": {"max_concurrency": 2}})
+        threads = [threading.Thread(target=client.post_json, args=("stub", url, {})) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.request_times("/generate")), 6)
+        self.assertLessEqual(self.server.peak, 2)
+
+    def test_sse_events_are_parsed_until_done(self):
+        url = self.script("/stream", (503, {"Retry-After": "0"}, "busy"),
+                          sse('data: {"text": "Hel"}', ": keep-alive", 'event: delta\ndata: {"text": "lo"}',
+                              "data: [DONE]", 'data: {"text": "ignored"}'))
+        events = list(self.client().stream_sse("stub", url, {}))
+        self.assertEqual(events, [{"text": "Hel"}, {"text": "lo"}])
+        self.assertEqual(len(self.request_times("/stream")), 2)
+
+
+@unittest.skipIf(httpx is None, "needs httpx")
+class AsyncLLMClientTest(StubServerTest):
+    def post(self, url, **kwargs):
+        async def run():
+            client = AsyncLLMClient(**{"backoff_base": 5, "timeout": 5, **kwargs})
+            try:
+                return await client.apost_json("stub", url, {})
+            finally:
+                await client.aclose()
+        return asyncio.run(run())
+
+    def test_retry_after_is_honored(self):
+        url = self.script("/generate", (429, {"Retry-After": "0.2"}, "slow down"), ok({"text": "done"}))
+        self.assertEqual(self.post(url), {"text": "done"})
+        first, second = self.request_times("/generate")
+        self.assertGreaterEqual(second - first, 0.2)
+        self.assertLess(second - first, 2)
+
+    def test_errors_are_raised_as_requests_exceptions(self):
+        url = self.script("/generate", (502, {"Retry-After": "0"}, "bad gateway"))
+        with self.assertRaises(requests.exceptions.HTTPError) as raised:
+            self.post(url, max_retries=1)
+        self.assertEqual(raised.exception.response.status_code, 502)
+        self.assertEqual(len(self.request_times("/generate")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""Period chaining of the multi-SKU model.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import unittest
+
+import numpy as np
+import pandas as pd
+
+try:
+    import gurobipy as gp
+    from multisku import _period_positions, build_multi_sku_model, solve_multi_sku_optimization
+except ImportError:
+    gp = None
+
+INITIAL_INVENTORY = 100
+
+
+def panel(rows):
+    """Production rows for (sku, period) pairs with a demand of 10 and no raw material use."""
+    return pd.DataFrame({
+        "SKU": [sku for sku, _ in rows],
+        "Month": [period for _, period in rows],
+        "Raw_Material_Cost": 1.0, "Labour_Cost": 1.0, "Electricity_Cost": 1.0, "Transportation_Cost": 1.0,
+        "Commission_Cost": 1.0, "Warehousing_Cost": 1.0,
+        "Revenue": 100.0, "Scrap_Metal_Used": 0.0, "Production_Volume": 10.0,
+    })
+
+
+@unittest.skipIf(gp is None, "needs gurobipy")
+class StaggeredPanelTest(unittest.TestCase):
+    """SKU A starts in month 2, SKU B in month 1; A comes first in the file."""
+
+    def setUp(self):
+        gp.setParam("OutputFlag", 0)
+
+    def assert_chained_in_time_order(self, data, time_order):
+        result = solve_multi_sku_optimization(data, initial_inventory=INITIAL_INVENTORY)
+        self.assertEqual(result["status"], "OPTIMAL", result.get("error_message"))
+        for sku, periods in data.groupby("SKU", sort=False)["Month"]:
+            previous = INITIAL_INVENTORY
+            for period in sorted(periods, key=time_order.index):
+                label = f"{sku}|default|{period}"
+                expected = previous + result["production_volumes"][label] - 10.0
+                self.assertAlmostEqual(result["inventory_levels"][label], expected, places=6, msg=label)
+                previous = result["inventory_levels"][label]
+
+    def test_numeric_periods(self):
+        data = panel([("A", 2), ("A", 3), ("B", 1), ("B", 2), ("B", 3)])
+        _, _, index = build_multi_sku_model(data)
+        positions = _period_positions(index["Month"], index.groupby("SKU", sort=False).ngroup().to_numpy())
+        np.testing.assert_array_equal(positions, [1, 2, 0, 1, 2])
+        self.assert_chained_in_time_order(data, [1, 2, 3])
+
+    def test_numeric_text_and_date_periods(self):
+        self.assert_chained_in_time_order(panel([("A", "10"), ("A", "11"), ("B", "9"), ("B", "10"), ("B", "11")]), ["9", "10", "11"])
+        self.assert_chained_in_time_order(panel([("A", "Feb"), ("A", "Mar"), ("B", "Jan"), ("B", "Feb"), ("B", "Mar")]), ["Jan", "Feb", "Mar"])
+
+    def test_label_periods_follow_row_order(self):
+        data = panel([("A", "P2"), ("A", "P3"), ("B", "P1"), ("B", "P2"), ("B", "P3")])
+        self.assert_chained_in_time_order(data, ["P1", "P2", "P3"])
+
+    def test_conflicting_label_orders_fail(self):
+        result = solve_multi_sku_optimization(panel([("A", "P1"), ("A", "P2"), ("B", "P2"), ("B", "P1")]))
+        self.assertEqual(result["status"], "ERROR")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+"""ResultFrame fingerprints, which key the cached explanations and follow-up answers.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import unittest
+
+from results import ResultFrame
+
+
+def result(**fields):
+    return {"objective_value": 100.0, "production_volumes": {1: 10.0, 2: 20.0}, "status": "OPTIMAL", "mip_gap": 0.0, **fields}
+
+
+class FingerprintTest(unittest.TestCase):
+    def fingerprint(self, **fields):
+        return ResultFrame.from_result(result(**fields)).fingerprint()
+
+    def test_solve_statistics_do_not_change_the_key(self):
+        self.assertEqual(self.fingerprint(solve_time=0.1, solver_stats={"runtime": 0.1}),
+                         self.fingerprint(solve_time=2.5, solver_stats={"runtime": 2.4}))
+
+    def test_status_and_gap_are_part_of_the_key(self):
+        optimal = self.fingerprint()
+        self.assertNotEqual(optimal, self.fingerprint(status="TIME_LIMIT", mip_gap=0.0))
+        self.assertNotEqual(optimal, self.fingerprint(mip_gap=0.05))
+
+    def test_solution_values_are_part_of_the_key(self):
+        self.assertNotEqual(self.fingerprint(), self.fingerprint(production_volumes={1: 10.0, 2: 21.0}))
+
+
+if __name__ == "__main__":
+    unittest.main()
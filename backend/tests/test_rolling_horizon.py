@@ -0,0 +1,85 @@
+"""Rolling-horizon windows: recovering from myopic commits and sharing one deadline.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import unittest
+from unittest import mock
+
+import numpy as np
+
+try:
+    import gurobipy as gp
+    import rolling_horizon
+    from rolling_horizon import solve_production_rolling_horizon
+    from samplegurobi import production_demand, solve_production_optimization
+    from solve_control import SolveController
+    from benchmarks.synthetic import make_production_data
+except ImportError:
+    gp = None
+
+PARAMETERS = {"max_production_change": 5, "max_storage": 600}
+
+
+def spike_data(size):
+    """120 flat periods with a four-period demand spike that production has to build up to early."""
+    data = make_production_data(120, seed=0)
+    data["Production_Volume"] = 100.0
+    data.loc[79:82, "Production_Volume"] = 100.0 + size
+    return data
+
+
+@unittest.skipIf(gp is None, "needs gurobipy")
+class DemandSpikeTest(unittest.TestCase):
+    def test_feasible_spike_is_solved(self):
+        data = spike_data(200)
+        self.assertEqual(solve_production_optimization(data, **PARAMETERS)["status"], "OPTIMAL")
+
+        result = solve_production_rolling_horizon(data, **PARAMETERS)
+        self.assertEqual(result["status"], "OPTIMAL")
+        production = np.array(list(result["production_volumes"].values()))
+        inventory = np.array(list(result["inventory_levels"].values()))
+        self.assertLessEqual(np.abs(np.diff(production)).max(), PARAMETERS["max_production_change"] + 1e-6)
+        self.assertGreaterEqual(inventory.min(), -1e-6)
+        previous = np.concatenate([[100.0], inventory[:-1]])
+        np.testing.assert_allclose(previous + production - production_demand(data), inventory, atol=1e-6)
+
+    def test_infeasible_spike_is_reported_as_infeasible(self):
+        data = spike_data(300)
+        self.assertEqual(solve_production_optimization(data, **PARAMETERS)["status"], "INFEASIBLE")
+        self.assertEqual(solve_production_rolling_horizon(data, **PARAMETERS)["status"], "INFEASIBLE")
+
+    def test_windows_that_cannot_recover_are_an_error(self):
+        # Without room to retry with more lookahead, the window's infeasibility says nothing about the horizon
+        data = spike_data(200)
+        with mock.patch.object(rolling_horizon, "_solve_sequential",
+                               lambda *args, **kwargs: (rolling_horizon._roll(*args[:4], 18, 0, None, kwargs.get("deadline")), args[3])):
+            result = solve_production_rolling_horizon(data, **PARAMETERS)
+        self.assertEqual(result["status"], "ERROR")
+
+
+@unittest.skipIf(gp is None, "needs gurobipy")
+class DeadlineTest(unittest.TestCase):
+    def test_windows_share_one_time_limit(self):
+        limits = []
+        solve_window = rolling_horizon._solve_window
+
+        def recording(*args, time_limit=None, **kwargs):
+            limits.append(time_limit)
+            return solve_window(*args, time_limit=time_limit, **kwargs)
+
+        with mock.patch.object(rolling_horizon, "_solve_window", recording):
+            result = solve_production_rolling_horizon(make_production_data(120), controller=SolveController(time_limit=4, mip_gap=0.01))
+        self.assertEqual(result["status"], "OPTIMAL")
+        # Each window gets its share of the time left, never the whole budget
+        self.assertGreater(len(limits), 1)
+        self.assertLessEqual(limits[0], 4 / len(limits) + 1e-9)
+        self.assertTrue(all(limit < 4 for limit in limits))
+
+    def test_exhausted_deadline_stops_the_windows(self):
+        result = solve_production_rolling_horizon(make_production_data(120), controller=SolveController(time_limit=0, mip_gap=0.01))
+        self.assertEqual(result["status"], "TIME_LIMIT")
+        self.assertIsNone(result["production_volumes"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+"""Session and job stores shared by several server processes, against a local Redis fake.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import time
+import unittest
+
+import pickle
+
+import pandas as pd
+
+from chat_history import ChatHistory
+from jobs import JobManager, RedisJobStore, JOB_CANCELLED, JOB_COMPLETED
+from session_store import RedisSessionStore
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+SIGNING_KEY = "test-signing-key"
+
+
+def wait_for(manager, job_id, states, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.status(job_id)
+        if job is not None and job["status"] in states:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not reach {states}")
+
+
+@unittest.skipIf(fakeredis is None, "needs fakeredis")
+class RedisSessionStoreTest(unittest.TestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        # Two stores on separate connections stand in for two worker processes
+        self.worker_a = RedisSessionStore(fakeredis.FakeRedis(server=server), SIGNING_KEY, ttl=60)
+        self.worker_b = RedisSessionStore(fakeredis.FakeRedis(server=server), SIGNING_KEY, ttl=60)
+
+    def test_session_round_trips_between_workers(self):
+        chat = ChatHistory(messages=[{"role": "bot", "content": "Hello"}])
+        frame = pd.DataFrame({"Month": [1, 2, 3], "Demand": [10.5, 20.0, 30.25]})
+        self.worker_a.set("s1", {"user_data": {"business_type": "bakery"}, "frame": frame, "chat_history": chat})
+
+        session = self.worker_b.get("s1")
+        self.assertEqual(session["user_data"], {"business_type": "bakery"})
+        pd.testing.assert_frame_equal(session["frame"], frame)
+        self.assertEqual(session["chat_history"].cursor, 1)
+        self.assertEqual([m["content"] for m in session["chat_history"]], ["Hello"])
+
+    def test_delete_and_missing(self):
+        self.worker_a.set("s1", {"user_data": {}})
+        self.worker_b.delete("s1")
+        self.assertIsNone(self.worker_a.get("s1"))
+
+    def test_get_refreshes_ttl(self):
+        self.worker_a.set("s1", {"user_data": {}})
+        self.worker_a.client.expire("inventory:session:s1", 5)
+        self.worker_b.get("s1")
+        self.assertGreater(self.worker_a.client.ttl("inventory:session:s1"), 5)
+
+    def test_unsigned_or_foreign_payloads_are_not_unpickled(self):
+        # Anything that would run code when unpickled must never reach pickle.loads
+        self.worker_a.client.set("inventory:session:s1", pickle.dumps({"user_data": {}}))
+        self.assertIsNone(self.worker_b.get("s1"))
+        foreign = RedisSessionStore(self.worker_a.client, "another-key", ttl=60)
+        foreign.set("s2", {"user_data": {}})
+        self.assertIsNone(self.worker_b.get("s2"))
+
+
+@unittest.skipIf(fakeredis is None, "needs fakeredis")
+class RedisJobStoreTest(unittest.TestCase):
+    def setUp(self):
+        server = fakeredis.FakeServer()
+        self.worker_a = JobManager(max_workers=2, store=RedisJobStore(fakeredis.FakeRedis(server=server), SIGNING_KEY, ttl=60))
+        self.worker_b = JobManager(max_workers=2, store=RedisJobStore(fakeredis.FakeRedis(server=server), SIGNING_KEY, ttl=60))
+
+    def test_job_submitted_on_one_worker_is_polled_on_another(self):
+        job_id = self.worker_a.submit(lambda job: {"status": "success", "rows": [1, 2, 3]}, session_id="s1")
+        job = wait_for(self.worker_b, job_id, (JOB_COMPLETED,))
+        self.assertEqual(job["session_id"], "s1")
+        self.assertNotIn("result", job)
+        self.assertEqual(self.worker_b.result(job_id)["result"], {"status": "success", "rows": [1, 2, 3]})
+
+    def test_cancel_from_another_worker(self):
+        def run(job):
+            while True:
+                job.check_cancelled()
+                time.sleep(0.01)
+
+        job_id = self.worker_a.submit(run)
+        wait_for(self.worker_b, job_id, ("running",))
+        self.assertTrue(self.worker_b.cancel(job_id))
+        wait_for(self.worker_b, job_id, (JOB_CANCELLED,))
+        self.assertFalse(self.worker_b.cancel(job_id))
+
+    def test_unknown_job(self):
+        self.assertIsNone(self.worker_b.status("missing"))
+        self.assertFalse(self.worker_b.cancel("missing"))
+
+    def test_tampered_job_is_ignored(self):
+        job_id = self.worker_a.submit(lambda job: {"status": "success"})
+        wait_for(self.worker_b, job_id, (JOB_COMPLETED,))
+        self.worker_a.store.client.hset(f"inventory:job:{job_id}", "result", pickle.dumps({"status": "forged"}))
+        self.assertIsNone(self.worker_b.status(job_id))
+
+
+@unittest.skipIf(fakeredis is None, "needs fakeredis")
+class RouteSessionMergeTest(unittest.TestCase):
+    """A request that waits (e.g. on the LLM) keeps what a background job saved meanwhile."""
+
+    def setUp(self):
+        import app
+        self.app = app
+        server = fakeredis.FakeServer()
+        self.request_worker = RedisSessionStore(fakeredis.FakeRedis(server=server), SIGNING_KEY, ttl=60)
+        self.job_worker = RedisSessionStore(fakeredis.FakeRedis(server=server), SIGNING_KEY, ttl=60)
+        original = app.session_store
+        app.session_store = self.request_worker
+        self.addCleanup(setattr, app, "session_store", original)
+
+    def test_changed_keys_and_messages_are_merged(self):
+        app = self.app
+        app.session_store.set("s1", app.new_session_data())
+        with app.app.test_request_context():
+            session = app.get_session_data("s1")
+            app.mark_session_changed("s1", app.EXPLANATION_KEYS)
+            session["ai_explanation"] = "Storage is the bottleneck."
+            session["chat_history"].append({"role": "bot", "content": "Explanation"})
+
+            # Meanwhile a job on another worker stores new results
+            stored = self.job_worker.get("s1")
+            stored["optimization_results"] = {"objective_value": 42.0}
+            stored["chat_history"].append({"role": "bot", "content": "Job done"})
+            self.job_worker.set("s1", stored)
+
+            app.save_changed_sessions(app.app.response_class())
+
+        merged = self.job_worker.get("s1")
+        self.assertEqual(merged["optimization_results"], {"objective_value": 42.0})
+        self.assertEqual(merged["ai_explanation"], "Storage is the bottleneck.")
+        self.assertEqual([m["content"] for m in merged["chat_history"]][-2:], ["Job done", "Explanation"])
+
+
+if __name__ == "__main__":
+    unittest.main()
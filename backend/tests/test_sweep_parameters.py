@@ -0,0 +1,94 @@
+"""Scenario parameters the generated entry function does not accept, and the solve slots and cancellation of sweeps.
+
+Run from backend/:  python -m unittest discover tests
+"""
+import threading
+import time
+import unittest
+
+from code_repair import unaccepted_parameters
+from jobs import JobCancelled
+from scenarios import ScenarioRunner
+
+try:
+    import gurobipy as gp
+    from sandbox import run_code
+except ImportError:
+    gp = None
+
+CODE = """
+def solve_model(data, max_storage=500, *, demand_scale=1.0):
+    return {"status": "OPTIMAL", "objective_value": max_storage * demand_scale}
+"""
+
+
+class UnacceptedParametersTest(unittest.TestCase):
+    def test_named_and_keyword_only_parameters_are_accepted(self):
+        self.assertEqual(unaccepted_parameters(CODE, ["max_storage", "demand_scale"]), [])
+
+    def test_unknown_parameters_are_reported(self):
+        self.assertEqual(unaccepted_parameters(CODE, ["max_storage", "lead_time"]), ["lead_time"])
+
+    def test_data_argument_is_not_a_parameter(self):
+        self.assertEqual(unaccepted_parameters(CODE, ["data"]), ["data"])
+
+    def test_var_keyword_accepts_everything(self):
+        self.assertEqual(unaccepted_parameters("def solve(data, **kwargs):\n    return {}\n", ["lead_time"]), [])
+
+
+@unittest.skipIf(gp is None, "needs gurobipy")
+class RunCodeParametersTest(unittest.TestCase):
+    def test_accepted_parameters_are_passed(self):
+        result, error, _, _ = run_code(CODE, None, kwargs={"max_storage": 10, "demand_scale": 2.0})
+        self.assertIsNone(error)
+        self.assertEqual(result["objective_value"], 20.0)
+
+    def test_unaccepted_parameter_fails_the_run(self):
+        result, error, _, _ = run_code(CODE, None, kwargs={"lead_time": 3})
+        self.assertIsNone(result)
+        self.assertIn("lead_time", error)
+
+
+class FakeSandboxPool:
+    """Records how many runs overlap instead of starting processes."""
+
+    size = 4
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = self.peak = self.runs = 0
+
+    def run(self, code_string, data, kwargs=None, budget=None):
+        with self.lock:
+            self.running += 1
+            self.runs += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return {"status": "OPTIMAL", "objective_value": kwargs["max_storage"]}, None, {}
+
+
+class SweepSlotsTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = FakeSandboxPool()
+        self.scenarios = [{"max_storage": float(i)} for i in range(12)]
+
+    def test_runs_are_limited_to_the_solve_slots(self):
+        rows = ScenarioRunner().run_generated(self.pool, CODE, None, self.scenarios, slot=threading.BoundedSemaphore(2))
+        self.assertEqual([row["objective_value"] for row in rows], [float(i) for i in range(12)])
+        self.assertEqual(self.pool.peak, 2)
+
+    def test_cancellation_stops_the_remaining_runs(self):
+        def check_cancelled():
+            if self.pool.runs >= 3:
+                raise JobCancelled()
+
+        with self.assertRaises(JobCancelled):
+            ScenarioRunner().run_generated(self.pool, CODE, None, self.scenarios,
+                                           slot=threading.BoundedSemaphore(1), check_cancelled=check_cancelled)
+        self.assertEqual(self.pool.runs, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
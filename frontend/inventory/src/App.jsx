@@ -1,5 +1,5 @@
 // frontend/src/App.jsx
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 import "./App.css"; // Or your index.css
 import ChatContainer from "./components/chatcontainer";
 import QuestionForm from "./components/questionform";
@@ -110,9 +110,42 @@ function App() {
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
   const [followUpQuestion, setFollowUpQuestion] = useState("");
+  // Sequence number of the latest chat message received; the backend only sends newer ones
+  const chatCursor = useRef(null);
 
   const BACKEND_URL = "http://localhost:5000/api";
 
+  const applyChatUpdate = (data) => {
+    if (!data.chat_history) return;
+    // Background job results carry the messages since the cursor of their
+    // request, which later requests may already have delivered
+    chatCursor.current = data.chat_reset
+      ? data.chat_cursor
+      : Math.max(chatCursor.current ?? data.chat_cursor, data.chat_cursor);
+    setChatHistory((prev) => {
+      if (data.chat_reset) return data.chat_history;
+      const received = new Set(prev.map((m) => m.seq));
+      // Messages added locally (without seq) are replaced by the server's copies
+      return [
+        ...prev.filter((m) => m.seq !== undefined),
+        ...data.chat_history.filter((m) => !received.has(m.seq)),
+      ];
+    });
+  };
+
+  // Polls a background job (/api/optimization_jobs/<id>) until it finishes and returns its result body
+  const waitForJob = async (jobId, intervalMs = 1000) => {
+    for (;;) {
+      const response = await fetch(`${BACKEND_URL}/optimization_jobs/${jobId}`);
+      const data = await response.json();
+      if (data.status !== "success") return data;
+      if (!["queued", "running"].includes(data.job.status)) break;
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
+    const response = await fetch(`${BACKEND_URL}/optimization_jobs/${jobId}/result`);
+    return response.json();
+  };
+
   // Initialize session when component mounts
   useEffect(() => {
     const initSession = async () => {
@@ -122,7 +155,7 @@ function App() {
         const data = await response.json();
         if (data.session_id) {
           setSessionId(data.session_id);
-          setChatHistory(data.chat_history);
+          applyChatUpdate(data);
         } else {
           setError("Failed to initialize session.");
         }
@@ -170,11 +203,12 @@ function App() {
           user_answer: answer,
           current_question_index: currentQuestionIndex,
           total_questions: INITIAL_QUESTIONS.length,
+          chat_cursor: chatCursor.current,
         }),
       });
       const data = await response.json();
       if (data.status === "success") {
-        setChatHistory(data.chat_history); // Update chat history from backend
+        applyChatUpdate(data); // Update chat history from backend
         if (data.questions_completed) {
           setQuestionsCompleted(true);
         } else {
@@ -201,6 +235,7 @@ function App() {
     const formData = new FormData();
     formData.append("file", file);
     formData.append("session_id", sessionId);
+    if (chatCursor.current !== null) formData.append("chat_cursor", chatCursor.current);
 
     setLoading(true);
     try {
@@ -215,7 +250,7 @@ function App() {
           shape: data.data_shape,
           columns: data.data_columns,
         });
-        setChatHistory(data.chat_history);
+        applyChatUpdate(data);
         // Trigger an AI analysis message from the bot here if desired
       } else {
         setError(data.message);
@@ -228,6 +263,42 @@ function App() {
     }
   };
 
+  const handlePdfUpload = async (file) => {
+    setError(null);
+    if (!file) return;
+
+    const formData = new FormData();
+    formData.append("file", file);
+    formData.append("session_id", sessionId);
+    if (chatCursor.current !== null) formData.append("chat_cursor", chatCursor.current);
+
+    setLoading(true);
+    try {
+      // The PDF is indexed in a background job; the response only has its id
+      const response = await fetch(`${BACKEND_URL}/upload_pdf`, {
+        method: "POST",
+        body: formData,
+      });
+      const submitted = await response.json();
+      if (submitted.status !== "success") {
+        setError(submitted.message);
+        return;
+      }
+      applyChatUpdate(submitted);
+      const data = await waitForJob(submitted.job_id);
+      if (data.status === "success") {
+        applyChatUpdate(data); // includes the "PDF processed" message
+      } else {
+        setError(data.message);
+      }
+    } catch (err) {
+      setError("Error uploading PDF.");
+      console.error("Error uploading PDF:", err);
+    } finally {
+      setLoading(false);
+    }
+  };
+
   const handleStartOptimization = async () => {
     setError(null);
     setOptimizationResults(null); // Clear previous results
@@ -239,18 +310,18 @@ function App() {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         credentials: "include",
-        body: JSON.stringify({ session_id: sessionId }),
+        body: JSON.stringify({ session_id: sessionId, chat_cursor: chatCursor.current }),
       });
       const data = await response.json();
       if (data.status === "success") {
         setOptimizationResults(data.optimization_results);
         setProblemType(data.problem_type);
-        setChatHistory(data.chat_history);
+        applyChatUpdate(data);
         // Now trigger AI explanation
         await fetchAIExplanation(data.optimization_results, data.problem_type);
       } else {
         setError(data.message);
-        setChatHistory(data.chat_history);
+        applyChatUpdate(data);
       }
     } catch (err) {
       setError("Error starting optimization.");
@@ -271,12 +342,13 @@ function App() {
           session_id: sessionId,
           results: results,
           problem_type: type,
+          chat_cursor: chatCursor.current,
         }),
       });
       const data = await response.json();
       if (data.status === "success") {
         setAiExplanation(data.ai_explanation);
-        setChatHistory(data.chat_history);
+        applyChatUpdate(data);
       } else {
         setError(data.message);
       }
@@ -306,11 +378,12 @@ function App() {
         body: JSON.stringify({
           session_id: sessionId,
           user_question: followUpQuestion,
+          chat_cursor: chatCursor.current,
         }),
       });
       const data = await response.json();
       if (data.status === "success") {
-        setChatHistory(data.chat_history);
+        applyChatUpdate(data);
       } else {
         setError(data.message);
       }
@@ -334,6 +407,7 @@ function App() {
       // Reset all local state
       setSessionId(null);
       setChatHistory([]);
+      chatCursor.current = null;
       setUserAnswers({});
       setCurrentQuestionIndex(0);
       setQuestionsCompleted(false);
@@ -347,7 +421,7 @@ function App() {
       const data = await response.json();
       if (data.session_id) {
         setSessionId(data.session_id);
-        setChatHistory(data.chat_history);
+        applyChatUpdate(data);
       } else {
         setError("Failed to re-initialize session after reset.");
       }
@@ -401,6 +475,13 @@ function App() {
                   onChange={(e) => handleFileUpload(e.target.files[0])}
                 />
                 <p>Upload a CSV file containing your optimization data.</p>
+                <input
+                  type="file"
+                  accept=".pdf"
+                  onChange={(e) => handlePdfUpload(e.target.files[0])}
+                  disabled={loading}
+                />
+                <p>Optionally, add a PDF with business context for the AI.</p>
               </div>
             )}
 